@@ -20,6 +20,10 @@ def has_flag(compiler, flagname):
     p.communicate("")
     return True if p.returncode == 0 else False
 
+# Extensions using OpenMP threads (prange), if supported by the compiler
+openmp_extensions = ("shenfun.optimization.cython.contract",
+                     "shenfun.optimization.cython.evaluate")
+
 class build_ext_subclass(build_ext):
     def build_extensions(self):
         extra_compile_args = ['-g0']
@@ -35,6 +39,9 @@ class build_ext_subclass(build_ext):
         for e in self.extensions:
             e.extra_compile_args += extra_compile_args
             e.include_dirs.extend([get_include()])
+            if e.name in openmp_extensions and has_flag(self.compiler, '-fopenmp'):
+                e.extra_compile_args.append('-fopenmp')
+                e.extra_link_args.append('-fopenmp')
         build_ext.build_extensions(self)
 
 def get_extensions():
@@ -50,7 +57,7 @@ def get_extensions():
                          sources=[os.path.join(cwd, "shenfun", "legendre", "fastgl", "fastgl_wrap.pyx")]))
     [e.extra_link_args.extend(["-std=c++11"]) for e in ext]
     #[e.extra_link_args.extend(["-std=c++11", "-fopenmp"]) for e in ext]
-    for s in ("Cheb", "convolve", "outer", "applymask", "cross"):
+    for s in ("Cheb", "convolve", "outer", "applymask", "cross", "contract"):
         ext.append(Extension("shenfun.optimization.cython.{0}".format(s),
                              libraries=['m'],
                              sources=[os.path.join(cdir, '{0}.pyx'.format(s))]))
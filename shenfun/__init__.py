@@ -27,32 +27,97 @@ routines to `Cython <https://cython.org/>`_ or
 coordinates, like polar or spherical coordinates.
 
 """
-#pylint: disable=wildcard-import,no-name-in-module
+#pylint: disable=undefined-all-variable
 
 __version__ = '4.1.4'
 __author__ = 'Mikael Mortensen'
 
+from importlib import import_module as _import_module
 import numpy as np
 from mpi4py import MPI
 from .config import config, dumpconfig
-from . import chebyshev
-from . import chebyshevu
-from . import legendre
-from . import laguerre
-from . import hermite
-from . import fourier
-from . import jacobi
-from . import ultraspherical
-from . import matrixbase
-from . import la
-from .coordinates import Coordinates
-from .fourier import energy_fourier
-from .io import *
-from .matrixbase import *
-from .spectralbase import inner_product, MixedFunctionSpace, BoundaryConditions
-from .forms import *
-from .tensorproductspace import *
-from .utilities import *
-from .utilities.lagrangian_particles import *
-from .utilities.integrators import *
+
 comm = MPI.COMM_WORLD
+
+# Submodules and public names are imported on first access (PEP 562), such
+# that ``import shenfun`` does not pay for sympy, scipy and the matrices of
+# all the families up front. Note that ``from shenfun import *`` still
+# imports everything. The names of modules with an ``__all__`` must equal
+# their ``__all__``, which is checked by the tests.
+
+_submodules = (
+    'chebyshev',
+    'chebyshevu',
+    'legendre',
+    'laguerre',
+    'hermite',
+    'fourier',
+    'jacobi',
+    'ultraspherical',
+    'matrixbase',
+    'la',
+    'io',
+    'forms',
+    'tensorproductspace',
+    'utilities',
+    'spectralbase',
+    'coordinates',
+    'optimization'
+)
+
+# Submodules of submodules that are available from shenfun
+_aliases = {
+    'arguments': 'forms.arguments',
+    'operators': 'forms.operators'
+}
+
+_exports = {
+    'coordinates': ('Coordinates',),
+    'fourier': ('energy_fourier',),
+    'io': ('HDF5File', 'NCFile', 'ShenfunFile', 'Checkpoint', 'generate_xdmf',
+           'read_refined'),
+    'matrixbase': ('SparseMatrix', 'SpectralMatrix', 'extract_diagonal_matrix',
+                   'extract_bc_matrices', 'check_sanity', 'assemble_sympy',
+                   'TPMatrix', 'BlockMatrix', 'BlockMatrices', 'Identity',
+                   'get_simplified_tpmatrices', 'ScipyMatrix', 'SpectralMatDict',
+                   'FusedMatvec'),
+    'spectralbase': ('inner_product', 'MixedFunctionSpace', 'BoundaryConditions'),
+    'forms.inner': ('inner', 'Inner'),
+    'forms.project': ('project', 'Project'),
+    'forms.operators': ('div', 'grad', 'Dx', 'curl'),
+    'forms.arguments': ('Expr', 'BasisFunction', 'TestFunction', 'TrialFunction',
+                        'Function', 'Array', 'FunctionSpace', 'Probe'),
+    'tensorproductspace': ('TensorProductSpace', 'VectorSpace', 'TensorSpace',
+                           'CompositeSpace', 'EnsembleSpace', 'Convolve'),
+    'utilities': ('dx', 'clenshaw_curtis1D', 'CachedArrayDict', 'surf3D',
+                  'wrap_periodic', 'outer', 'dot', 'apply_mask', 'integrate_sympy',
+                  'mayavi_show', 'quiver3D', 'get_bc_basis', 'get_stencil_matrix',
+                  'scalar_product', 'n', 'cross', 'reset_profile', 'Lambda',
+                  'get_contraction', 'fused_product'),
+    'utilities.lagrangian_particles': ('LagrangianParticles', 'DistributedParticles'),
+    'utilities.integrators': ('IRK3', 'BackwardEuler', 'RK4', 'ETDRK4', 'ETD',
+                              'IMEXRK3', 'IMEXRK111', 'IMEXRK222', 'IMEXRK443',
+                              'IMEXARK324L2SA', 'CNAB2', 'SBDF2', 'SBDF3',
+                              'SBDF4', 'PIController', 'error_norm'),
+    'utilities.statistics': ('Moments', 'Spectrum', 'Statistics'),
+    'utilities.timers': ('timers', 'timed', 'Timers')
+}
+
+_lazy = {name: mod for mod, names in _exports.items() for name in names}
+
+__all__ = (['np', 'MPI', 'config', 'dumpconfig', 'comm'] + list(_submodules)
+           + list(_aliases) + list(_lazy))
+
+def __getattr__(name):
+    if name in _submodules:
+        return _import_module('.'+name, __name__)
+    if name in _aliases:
+        return _import_module('.'+_aliases[name], __name__)
+    if name in _lazy:
+        value = getattr(_import_module('.'+_lazy[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
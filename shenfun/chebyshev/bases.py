@@ -51,6 +51,7 @@ from shenfun.spectralbase import SpectralBase, Transform, FuncWrap, \
 from shenfun.matrixbase import SparseMatrix
 from shenfun.optimization import optimizer
 from shenfun.config import config
+from shenfun.utilities import work
 from shenfun.jacobi.recursions import half, cn
 from shenfun.jacobi import JacobiBase
 from shenfun.utilities import n
@@ -388,18 +389,25 @@ class Orthogonal(JacobiBase):
                  fftw.flag_dict[opts['overwrite_input']])
         threads = opts['threads']
 
-        U = fftw.aligned(shape, dtype=float)
+        # Arrays internal to the transforms are shared through the work pool
+        padded = self.padding_factor != 1
+        wrapped = np.dtype(dtype) is np.dtype('complex')
+        if wrapped:
+            U = work.aligned(shape, float, 0)
+        else:
+            U = fftw.aligned(shape, dtype=float)
+        V = work.aligned(shape, float, 1) if wrapped or padded else None
 
-        xfftn_fwd = plan_fwd(U, axes=(axis,), threads=threads, flags=flags)
+        xfftn_fwd = plan_fwd(U, axes=(axis,), threads=threads, flags=flags, output_array=V)
         V = xfftn_fwd.output_array
         xfftn_bck = plan_bck(V, axes=(axis,), threads=threads, flags=flags, output_array=U)
         V.fill(0)
         U.fill(0)
 
-        if np.dtype(dtype) is np.dtype('complex'):
+        if wrapped:
             # dct only works on real data, so need to wrap it
             U = fftw.aligned(shape, dtype=complex)
-            V = fftw.aligned(shape, dtype=complex)
+            V = work.aligned(shape, complex, 1) if padded else fftw.aligned(shape, dtype=complex)
             U.fill(0)
             V.fill(0)
             xfftn_fwd = DCTWrap(xfftn_fwd, U, V)
@@ -63,7 +63,7 @@ from __future__ import division
 
 import numpy as np
 import scipy
-from shenfun.optimization import cython, numba
+from shenfun.optimization import get_numba, get_kernel_module, kernel_mode
 from shenfun.matrixbase import SpectralMatrix, SpectralMatDict
 from shenfun.spectralbase import get_norm_sq
 from shenfun.la import TDMA as generic_TDMA
@@ -233,7 +233,7 @@ class BSDSDmat(SpectralMatrix):
         assert isinstance(test[0], SD)
         assert isinstance(trial[0], SD)
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -249,7 +249,7 @@ class BSDSDmat(SpectralMatrix):
         return generic_TDMA
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         N, M = self.shape
         c.fill(0)
         # Cython implementation only handles square matrix
@@ -258,8 +258,8 @@ class BSDSDmat(SpectralMatrix):
 
         d0 = np.array(self[0]).astype(float)
         ld = np.array(self[-2]).astype(float)*np.ones(M-2)
-        if format == 'cython':
-            cython.Matvec.Tridiagonal_matvec(v, c, axis, ld, d0, ld)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).Tridiagonal_matvec(v, c, axis, ld, d0, ld)
             self.scale_array(c, self.scale)
         elif format == 'self':
             if axis > 0:
@@ -275,7 +275,7 @@ class BSDSDmat(SpectralMatrix):
             self.scale_array(c, self.scale)
 
         else:
-            format = None if format in ('cython', 'self') else format
+            format = None if format in ('cython', 'numba', 'self') else format
             c = super(BSDSDmat, self).matvec(v, c, format=format, axis=axis)
 
         return c
@@ -323,7 +323,7 @@ class BSDSNmat(SpectralMatrix):
         assert isinstance(test[0], SD)
         assert isinstance(trial[0], SN)
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -339,13 +339,13 @@ class BSDSNmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
         N, M = self.shape
         if not M == N:
             format = 'csr'
-        if format == 'cython' and v.ndim == 3:
-            cython.Matvec.BDN_matvec(v, c, axis, self[-2], self[0], self[2])
+        if format in ('cython', 'numba') and v.ndim == 3:
+            get_kernel_module('Matvec', format).BDN_matvec(v, c, axis, self[-2], self[0], self[2])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -510,7 +510,7 @@ class BSBSBmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -531,7 +531,7 @@ class BSBSBmat(SpectralMatrix):
         return generic_PDMA
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
         N, M = self.shape
         if not M == N:
@@ -554,8 +554,8 @@ class BSBSBmat(SpectralMatrix):
                 c = np.moveaxis(c, 0, axis)
             self.scale_array(c, self.scale)
 
-        elif format == 'cython' and v.ndim == 3:
-            cython.Matvec.Pentadiagonal_matvec(v, c, axis, self[-4], self[-2], self[0],
+        elif format in ('cython', 'numba') and v.ndim == 3:
+            get_kernel_module('Matvec', format).Pentadiagonal_matvec(v, c, axis, self[-4], self[-2], self[0],
                                                self[2], self[4])
             self.scale_array(c, self.scale)
         else:
@@ -578,7 +578,7 @@ class BSBSDmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -600,7 +600,7 @@ class BSBSDmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
         N = self.shape[0]
         if format == 'self':
@@ -618,8 +618,8 @@ class BSBSDmat(SpectralMatrix):
                 v = np.moveaxis(v, 0, axis)
             self.scale_array(c, self.scale)
 
-        elif format == 'cython':
-            cython.Matvec.BBD_matvec(v, c, axis, self[-2], self[0], self[2], self[4])
+        elif format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).BBD_matvec(v, c, axis, self[-2], self[0], self[2], self[4])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -665,7 +665,7 @@ class CSDSNmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -678,10 +678,10 @@ class CSDSNmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            c = cython.Matvec.CDN_matvec(v, c, axis, self[-1], self[1])
+        if format in ('cython', 'numba'):
+            c = get_kernel_module('Matvec', format).CDN_matvec(v, c, axis, self[-1], self[1])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -702,7 +702,7 @@ class CSDSDmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -715,7 +715,7 @@ class CSDSDmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         N = self.shape[0]
         c.fill(0)
         if format == 'self':
@@ -730,8 +730,8 @@ class CSDSDmat(SpectralMatrix):
                 v = np.moveaxis(v, 0, axis)
                 c = np.moveaxis(c, 0, axis)
             self.scale_array(c, self.scale)
-        elif format == 'cython':
-            c = cython.Matvec.CDD_matvec(v, c, axis, self[-1], self[1])
+        elif format in ('cython', 'numba'):
+            c = get_kernel_module('Matvec', format).CDD_matvec(v, c, axis, self[-1], self[1])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -795,10 +795,10 @@ class CTSDmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            cython.Matvec.CTSD_matvec(v, c, axis)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).CTSD_matvec(v, c, axis)
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -860,7 +860,7 @@ class CTTmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -875,10 +875,10 @@ class CTTmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            cython.Matvec.CTT_matvec(v, c, axis)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).CTT_matvec(v, c, axis)
             self.scale_array(c, self.scale*self._keyscale)
         else:
             format = None if format in self._matvec_methods else format
@@ -899,7 +899,7 @@ class CSBSDmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -913,7 +913,7 @@ class CSBSDmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         N, M = self.shape
         c.fill(0)
         if format == 'self':
@@ -928,8 +928,8 @@ class CSBSDmat(SpectralMatrix):
                 c = np.moveaxis(c, 0, axis)
                 v = np.moveaxis(v, 0, axis)
             self.scale_array(c, self.scale)
-        elif format == 'cython':
-            cython.Matvec.CBD_matvec(v, c, axis, self[-1], self[1], self[3])
+        elif format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).CBD_matvec(v, c, axis, self[-1], self[1], self[3])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -950,7 +950,7 @@ class CSDSBmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -964,7 +964,7 @@ class CSDSBmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         N, M = self.shape
         c.fill(0)
         if format == 'self':
@@ -981,8 +981,8 @@ class CSDSBmat(SpectralMatrix):
                 v = np.moveaxis(v, 0, axis)
             self.scale_array(c, self.scale)
 
-        elif format == 'cython':
-            cython.Matvec.CDB_matvec(v, c, axis, self[-3], self[-1], self[1])
+        elif format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).CDB_matvec(v, c, axis, self[-3], self[-1], self[1])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -1003,7 +1003,7 @@ class ASBSBmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -1017,7 +1017,7 @@ class ASBSBmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         N = self.shape[0]
         c.fill(0)
         if format == 'self':
@@ -1034,8 +1034,8 @@ class ASBSBmat(SpectralMatrix):
                 v = np.moveaxis(v, 0, axis)
             self.scale_array(c, self.scale)
 
-        elif format == 'cython':
-            cython.Matvec.Tridiagonal_matvec(v, c, axis, self[-2], self[0], self[2])
+        elif format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).Tridiagonal_matvec(v, c, axis, self[-2], self[0], self[2])
             self.scale_array(c, self.scale)
         else:
             format = None if format in self._matvec_methods else format
@@ -1056,7 +1056,7 @@ class ASDSDmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -1082,10 +1082,10 @@ class ASDSDmat(SpectralMatrix):
         return ADDSolver
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            cython.Matvec.ADD_matvec(v, c, axis, self[0]/self._keyscale)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).ADD_matvec(v, c, axis, self[0]/self._keyscale)
             self.scale_array(c, self.scale*self._keyscale)
         else:
             format = None if format in self._matvec_methods else format
@@ -1127,7 +1127,7 @@ class ASNSNmat(SpectralMatrix):
     def matvec(self, v, c, format=None, axis=0):
         if format == 'numba':
             try:
-                c = numba.helmholtz.ANN_matvec(v, c, self, axis)
+                c = get_numba().helmholtz.ANN_matvec(v, c, self, axis)
                 return c
             except:
                 pass
@@ -1200,7 +1200,7 @@ class ATTmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -1215,10 +1215,10 @@ class ATTmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            cython.Matvec.ATT_matvec(v, c, axis)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).ATT_matvec(v, c, axis)
             self.scale_array(c, self.scale*self._keyscale)
         else:
             format = None if format in self._matvec_methods else format
@@ -1439,7 +1439,7 @@ class SSBSBmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython']
+        self._matvec_methods += ['cython', 'numba']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -1459,10 +1459,10 @@ class SSBSBmat(SpectralMatrix):
         return d
 
     def matvec(self, v, c, format=None, axis=0):
-        format = 'cython' if format is None else format
+        format = kernel_mode() if format is None else format
         c.fill(0)
-        if format == 'cython':
-            cython.Matvec.SBB_matvec(v, c, axis, self[0]/self._keyscale)
+        if format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).SBB_matvec(v, c, axis, self[0]/self._keyscale)
             self.scale_array(c, self.scale*self._keyscale)
         else:
             format = None if format in self._matvec_methods else format
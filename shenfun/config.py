@@ -11,6 +11,15 @@ config = {
     {
         'mode': 'cython',
         'verbose': False,
+        'num_threads': 1,
+    },
+    'profiling':
+    {
+        'timers': False,
+    },
+    'memory':
+    {
+        'work_maxbytes': None,
     },
     'basisvectors': 'normal',
     'transforms':
@@ -25,6 +34,12 @@ config = {
             'hermite': 'vandermonde',
             'laguerre': 'vandermonde',
             'jacobi': 'recursive'
+        },
+        'resample':
+        {
+            'method': 'vandermonde',
+            'padding_factor': 2,
+            'order': 12
         }
     },
     'matrix':
@@ -42,6 +57,8 @@ config = {
             'assemble': 'csc',
             'use_scipy': True,
             'permc_spec': 'COLAMD',
+            'reuse_ordering': True,
+            'lu_maxbytes': None,
         }
     },
     'bases':
@@ -5,13 +5,14 @@ import copy
 from scipy.special import sph_harm, erf, airy, jn, gammaln
 import numpy as np
 import sympy as sp
+from mpi4py import MPI
 from shenfun.config import config
-from shenfun.optimization.cython import evaluate
+from shenfun.optimization import get_kernel_module
 from shenfun.spectralbase import BoundaryConditions
 from mpi4py_fft import DistArray
 
 __all__ = ('Expr', 'BasisFunction', 'TestFunction', 'TrialFunction', 'Function',
-           'Array', 'FunctionSpace')
+           'Array', 'FunctionSpace', 'Probe')
 
 # Define some special functions required for spherical harmonics
 cot = lambda x: 1/np.tan(x)
@@ -724,6 +725,10 @@ class Expr:
         x : float or array of floats
             Array must be of shape (D, N), for  N points in D dimensions
 
+        Note
+        ----
+        Use :class:`.Probe` to evaluate the same expression repeatedly at
+        the same points.
         """
         from shenfun import CompositeSpace
         from shenfun.fourier.bases import R2C
@@ -774,11 +779,9 @@ class Expr:
                 if len(x) == 1:
                     work = np.dot(P, bv)
 
-                elif len(x) == 2:
-                    work = evaluate.evaluate_2D(work, bv, M, r2c, last_conj_index, sl)
-
-                elif len(x) == 3:
-                    work = evaluate.evaluate_3D(work, bv, M, r2c, last_conj_index, sl)
+                else:
+                    evaluate = getattr(get_kernel_module('evaluate'), 'evaluate_%dD' % len(x))
+                    work = evaluate(work, bv, M, r2c, last_conj_index, sl, config['optimization']['num_threads'])
 
                 sc = self.scales()[vec][base_j]
                 if not hasattr(sc, 'free_symbols'):
@@ -1055,6 +1058,140 @@ class Expr:
                 scs[i][j] = scj.subs(a, b)
 
 
+class Probe:
+    """Evaluate an expression repeatedly at fixed points
+
+    The basis functions of all axes, and their derivatives, are evaluated
+    at the points once, when the Probe is created. A call only performs
+    the contractions with the current expansion coefficients, which makes
+    the Probe suitable for sampling, e.g., ``grad(u)`` or ``curl(u)`` at
+    the same sensor locations every few time steps.
+
+    Parameters
+    ----------
+    x : array
+        Points of shape (D, N), for N points in D dimensions
+    expr : :class:`.Expr` or :class:`.Function`
+        The expression to evaluate
+
+    Note
+    ----
+    The terms of a tensor component that use the same coefficients, and
+    the same derivatives along all but the first axis, are fused into one
+    contraction by adding up their scaled basis matrices of the first
+    axis.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> import sympy as sp
+    >>> from shenfun import FunctionSpace, TensorProductSpace, Function, grad, comm, Probe
+    >>> x, y = sp.symbols('x,y', real=True)
+    >>> T = TensorProductSpace(comm, (FunctionSpace(12, 'C'), FunctionSpace(12, 'F', dtype='d')))
+    >>> u = Function(T, buffer=x*sp.sin(y))
+    >>> probe = Probe(np.array([[0.5], [0.5]]), grad(u))
+    >>> np.round(probe(), 4)
+    array([[0.4794],
+           [0.4388]])
+    """
+    def __init__(self, x, expr):
+        from shenfun import CompositeSpace
+        from shenfun.fourier.bases import R2C
+        if not isinstance(expr, Expr):
+            expr = Expr(expr)
+        x = np.atleast_2d(x)
+        V = expr.function_space()
+        assert V.dimensions == len(x)
+        self.x = x
+        self.expr = expr
+        self._comm = None
+        self._components = []
+        P = {}
+        for terms, scales, indices in zip(expr.terms(), expr.scales(), expr.indices()):
+            groups = {}
+            for term, sc, ind in zip(terms, scales, indices):
+                test_sp = V.flatten()[ind] if isinstance(V, CompositeSpace) else V
+                self._comm = getattr(test_sp, 'comm', None)
+                r2c, M, start = -1, -1, -1
+                Pi = []
+                for axis, k in enumerate(term):
+                    base = test_sp[axis]
+                    if (ind, axis, k) not in P:
+                        xx = np.atleast_1d(base.map_reference_domain(np.squeeze(x[axis])))
+                        D = base.evaluate_basis_derivative_all(xx, k=k)
+                        if not base.domain_factor() == 1:
+                            D *= base.domain_factor()**k
+                        if len(x) > 1:
+                            D = D[..., test_sp.local_slice()[axis]]
+                        P[(ind, axis, k)] = D
+                    Pi.append(P[(ind, axis, k)])
+                    if isinstance(base, R2C):
+                        r2c = axis
+                        M = base.N//2 if base.N % 2 == 0 else base.N//2+1
+                        start = test_sp.local_slice()[axis].start if len(x) > 1 else 0
+                key = (ind,) + tuple(term[1:])
+                P0 = self._scale(sc)*Pi[0]
+                if key in groups:
+                    groups[key][1][0] = groups[key][1][0] + P0
+                else:
+                    groups[key] = [ind, [P0]+Pi[1:], r2c, M, start]
+            if len(x) == 1:
+                for group in groups.values():
+                    if group[2] == 0:
+                        # Hermitian symmetry, see the evaluate kernels
+                        ii = np.arange(group[1][0].shape[1])
+                        group[1][0] = group[1][0]*(1 + ((ii > 0) & (ii < group[3])))
+            self._components.append(list(groups.values()))
+
+    def _scale(self, sc):
+        # Scale evaluated at the points, as a column to multiply the rows of P
+        if not hasattr(sc, 'free_symbols'):
+            return float(sc)
+        sym0 = tuple(sc.free_symbols)
+        m = [self.x['xyzrs'.index(str(sym))] for sym in sym0]
+        return np.atleast_1d(sp.lambdify(sym0, sc)(*m))[:, None]
+
+    def __call__(self, u=None, output_array=None):
+        """Return expression evaluated at the points
+
+        Parameters
+        ----------
+        u : :class:`.Function`, optional
+            Expansion coefficients of the same space as the Function of
+            the expression. If None, then use the Function of the
+            expression.
+        output_array : array, optional
+            Return array of shape (N,) for a scalar expression, or
+            (num_components, N) otherwise
+
+        Returns
+        -------
+        output_array
+        """
+        u = self.expr.basis() if u is None else u
+        N = self.x.shape[1]
+        if output_array is None:
+            V = self.expr.function_space()
+            shape = (N,) if len(self._components) == 1 else (len(self._components), N)
+            output_array = np.zeros(shape, dtype=V.forward.input_array.dtype)
+        out = output_array.reshape((len(self._components), N))
+        out[:] = 0
+        kernels = get_kernel_module('evaluate')
+        num_threads = config['optimization']['num_threads']
+        for outi, groups in zip(out, self._components):
+            for ind, P, r2c, M, start in groups:
+                ui = u if u.tensor_rank == 0 else u[ind]
+                if len(P) == 1:
+                    w = np.dot(P[0], ui)
+                    outi += w.real if r2c == 0 else w
+                else:
+                    evaluate = getattr(kernels, 'evaluate_%dD' % len(P))
+                    evaluate(outi, ui, P, r2c, M, start, num_threads)
+        if self._comm is not None and self._comm.Get_size() > 1:
+            self._comm.Allreduce(MPI.IN_PLACE, out)
+        return output_array
+
+
 class BasisFunction:
     """Base class for arguments to shenfun's :class:`.Expr`
 
@@ -2,10 +2,11 @@ from numbers import Number
 import sympy as sp
 import numpy as np
 from shenfun.spectralbase import inner_product, SpectralBase, MixedFunctionSpace
-from shenfun.matrixbase import TPMatrix
-from shenfun.tensorproductspace import TensorProductSpace, CompositeSpace
-from shenfun.utilities import dx, split, scalar_product, CachedArrayDict
+from shenfun.matrixbase import TPMatrix, FusedMatvec
+from shenfun import tensorproductspace
+from shenfun.utilities import dx, split, scalar_product, work
 from shenfun.config import config
+from shenfun.utilities.timers import timed
 from .arguments import Expr, Function, BasisFunction, Array, TestFunction
 
 __all__ = ('inner', 'Inner')
@@ -13,6 +14,7 @@ __all__ = ('inner', 'Inner')
 #pylint: disable=line-too-long,inconsistent-return-statements,too-many-return-statements
 
 
+@timed()
 def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resolution=None, return_matrices=False):
     r"""
     Return (weighted or unweighted) discrete inner product
@@ -185,7 +187,7 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
         else:
             assert isinstance(expr1, (Array, Function))
             space = expr1.function_space()
-            if isinstance(space, (TensorProductSpace, CompositeSpace)):
+            if isinstance(space, (tensorproductspace.TensorProductSpace, tensorproductspace.CompositeSpace)):
                 df = np.prod(np.array([float(base.domain_factor()) for base in space.bases]))
             elif isinstance(space, SpectralBase):
                 df = float(space.domain_factor())
@@ -203,7 +205,7 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
         else:
             assert isinstance(expr0, (Array, Function))
             space = expr0.function_space()
-            if isinstance(space, (TensorProductSpace, CompositeSpace)):
+            if isinstance(space, (tensorproductspace.TensorProductSpace, tensorproductspace.CompositeSpace)):
                 df = np.prod(np.array([float(base.domain_factor()) for base in space.bases]))
             elif isinstance(space, SpectralBase):
                 df = float(space.domain_factor())
@@ -218,7 +220,7 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
     if isinstance(expr0, tuple):
         assert isinstance(expr1, (Array, Function))
         space = expr1.function_space()
-        assert isinstance(space, CompositeSpace)
+        assert isinstance(space, tensorproductspace.CompositeSpace)
         assert len(expr0) == len(space)
         result = 0.0
         for e0i, e1i in zip(expr0, expr1):
@@ -228,7 +230,7 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
     if isinstance(expr1, tuple):
         assert isinstance(expr0, (Array, Function))
         space = expr0.function_space()
-        assert isinstance(space, CompositeSpace)
+        assert isinstance(space, tensorproductspace.CompositeSpace)
         assert len(expr1) == len(space)
         result = 0.0
         for e0i, e1i in zip(expr0, expr1):
@@ -393,10 +395,10 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
 
                     assert len(b0) == len(b1)
                     trial_sp = trialspace
-                    if isinstance(trialspace, (CompositeSpace, MixedFunctionSpace)): # could operate on a vector, e.g., div(u), where u is vector
+                    if isinstance(trialspace, (tensorproductspace.CompositeSpace, MixedFunctionSpace)): # could operate on a vector, e.g., div(u), where u is vector
                         trial_sp = trialspace.flatten()[trial_ind[trial_j]]
                     test_sp = testspace
-                    if isinstance(testspace, (CompositeSpace, MixedFunctionSpace)):
+                    if isinstance(testspace, (tensorproductspace.CompositeSpace, MixedFunctionSpace)):
                         test_sp = testspace.flatten()[test_ind[test_j]]
                     has_bcs = False
                     # Check if scale is zero
@@ -500,7 +502,6 @@ def inner(expr0, expr1, output_array=None, assemble=None, kind=None, fixed_resol
         wh.fill(0)
     return output_array
 
-work = CachedArrayDict()
 
 class Inner:
     """Return an instance of a class that can perform the inner product
@@ -518,6 +519,10 @@ class Inner:
     This is an optimization only for linear forms, not bilinear.
     There is no need to use this class for regular scalar products, where `uh`
     is simply an Array.
+
+    All terms of the linear form are computed with one :class:`.FusedMatvec`,
+    such that terms sharing the same non-diagonal matrix axis and operand are
+    applied in one sweep, with a single accumulation into the output.
     """
     def __init__(self, v, uh):
         from shenfun.matrixbase import get_simplified_tpmatrices
@@ -532,27 +537,23 @@ class Inner:
             A = [A]
         self.A = [A]
         self.output_array = Function(v.function_space())
+        self._fused = None
 
+    @timed()
     def __call__(self):
-        wh = work[(self.output_array, 0, True)]
+        if self._fused is None:
+            self._fused = [FusedMatvec([b for b in A if not isinstance(b, Function)])
+                           for A in self.A]
         self.output_array.fill(0)
-        for uh, A in zip(self.uh, self.A):
+        for uh, A, fused in zip(self.uh, self.A, self._fused):
             uh = uh.base if uh.base is not None else uh
             for b in A:
                 if isinstance(b, Function) and isinstance(uh, Array):
+                    wh = work[(self.output_array, 0, True)]
                     V = b.function_space()
                     wh = V.scalar_product(uh, wh)
                     self.output_array += wh
-                elif uh.function_space().is_composite_space and wh.ndim == b.dimensions:
-                    wh = b.matvec(uh.v[b.global_index[1]], wh)
-                    self.output_array += wh
-                elif uh.function_space().is_composite_space and wh.ndim > b.dimensions:
-                    wh[b.global_index[0]] = b.matvec(uh.v[b.global_index[1]], wh[b.global_index[0]])
-                    self.output_array.v[b.global_index[0]] += wh[b.global_index[0]]
-                else:
-                    wh = b.matvec(uh, wh)
-                    self.output_array += wh
-                wh.fill(0)
+            fused(uh, self.output_array)
         return self.output_array
 
     def __add__(self, c):
@@ -560,4 +561,5 @@ class Inner:
         assert c.output_array.function_space() == self.output_array.function_space()
         self.A += c.A
         self.uh += c.uh
+        self._fused = None
         return self
@@ -1,17 +1,15 @@
 import types
 import numpy as np
 from shenfun import la
-from shenfun.utilities import CachedArrayDict
-from shenfun.tensorproductspace import TensorProductSpace
+from shenfun import tensorproductspace
 from shenfun.matrixbase import TPMatrix, BlockMatrix, SpectralMatrix, \
-    Identity
+    Identity, FusedMatvec
 from .arguments import Expr, TestFunction, TrialFunction, BasisFunction, \
     Function, Array
 from .inner import inner
 
 __all__ = ('project', 'Project')
 
-work = CachedArrayDict()
 
 def project(uh, T, output_array=None, fill=True, use_to_ortho=True, use_assign=True):
     r"""
@@ -129,7 +127,7 @@ def project(uh, T, output_array=None, fill=True, use_to_ortho=True, use_assign=T
     output_array = inner(v, uh, output_array=output_array)
     B = inner(v, u)
 
-    if isinstance(T, TensorProductSpace):
+    if isinstance(T, tensorproductspace.TensorProductSpace):
         if len(T.get_nonperiodic_axes()) > 2:
             raise NotImplementedError
 
@@ -228,6 +226,8 @@ class Project:
                         self.sol = la.SolverGeneric1ND([self.B])
                 elif len(self.B.naxes) == 2:
                     self.sol = la.SolverGeneric2ND([self.B])
+                elif la.SolverFastDiagonalization.is_separable([self.B]):
+                    self.sol = la.SolverFastDiagonalization([self.B])
                 else:
                     self.sol = la.SolverND([self.B])
             elif T.coors.is_orthogonal and (len(self.output_array) == len(self.B)):
@@ -242,6 +242,8 @@ class Project:
                                 self.solvers.append(la.SolverGeneric1ND([b]))
                             elif len(b.naxes) == 2:
                                 self.solvers.append(la.SolverGeneric2ND([b]))
+                            elif la.SolverFastDiagonalization.is_separable([b]):
+                                self.solvers.append(la.SolverFastDiagonalization([b]))
                             else:
                                 self.solvers.append(la.SolverND([b]))
                     def __call__(self, u, c):
@@ -251,21 +253,10 @@ class Project:
                 self.sol = sol(self.B)
             else:
                 self.sol = la.BlockMatrixSolver(BlockMatrix(self.B))
+        self._fused = FusedMatvec(self.A if isinstance(self.A, list) else [self.A])
 
     def __call__(self):
-        wh = work[(self.output_array, 0, True)]
-        uh = self.uh.base
         self.output_array.fill(0)
-        for b in self.A:
-            if uh.function_space().is_composite_space and wh.ndim == b.dimensions:
-                wh = b.matvec(uh.v[b.global_index[1]], wh)
-                self.output_array += wh
-            elif uh.function_space().is_composite_space and wh.ndim > b.dimensions:
-                wh[b.global_index[0]] = b.matvec(uh.v[b.global_index[1]], wh[b.global_index[0]])
-                self.output_array.v[b.global_index[0]] += wh[b.global_index[0]]
-            else:
-                wh = b.matvec(uh, wh)
-                self.output_array += wh
-            wh.fill(0)
+        self._fused(self.uh.base, self.output_array)
         out = self.sol(self.output_array, self.output_array)
         return out
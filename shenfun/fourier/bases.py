@@ -40,8 +40,9 @@ import sympy as sp
 import numpy as np
 from mpi4py_fft import fftw
 from shenfun.spectralbase import SpectralBase, Transform, islicedict, slicedict
-from shenfun.optimization.cython import convolve
+from shenfun.optimization import get_kernel_module
 from shenfun.config import config
+from shenfun.utilities import work
 
 bases = ['R2C', 'C2C']
 bcbases = []
@@ -247,7 +248,14 @@ class FourierBase(SpectralBase):
                  fftw.flag_dict[opts['overwrite_input']])
 
         U = fftw.aligned(shape, dtype=dtype)
-        xfftn_fwd = plan_fwd(U, s=s, axes=axis, threads=threads, flags=flags)
+        V = None
+        if self.padding_factor > 1.+1e-8:
+            # The padded V is internal to the transforms and shared through the work pool
+            Vshape = list(shape)
+            if np.issubdtype(dtype, np.floating):
+                Vshape[axis[-1]] = Vshape[axis[-1]]//2+1
+            V = work.aligned(Vshape, np.result_type(dtype, np.complex64), 1)
+        xfftn_fwd = plan_fwd(U, s=s, axes=axis, threads=threads, flags=flags, output_array=V)
         V = xfftn_fwd.output_array
 
         opts = plan_bck.opts
@@ -470,7 +478,7 @@ class R2C(FourierBase):
                 uv = np.zeros(N+1, dtype=u.dtype)
             Np = N if not N % 2 == 0 else N+1
             k1 = np.fft.fftfreq(Np, 1./Np).astype(int)
-            convolve.convolve_real_1D(u, v, uv, k1)
+            get_kernel_module('convolve').convolve_real_1D(u, v, uv, k1)
 
         return uv
 
@@ -636,6 +644,6 @@ class C2C(FourierBase):
 
             Np = N if not N % 2 == 0 else N+1
             k = np.fft.fftfreq(Np, 1./Np).astype(int)
-            convolve.convolve_1D(u, v, uv, k)
+            get_kernel_module('convolve').convolve_1D(u, v, uv, k)
 
         return uv
@@ -1,11 +1,13 @@
 import sys
 import os
+import itertools
 import numpy as np
 from mpi4py import MPI
 from mpi4py_fft.io import NCFile, HDF5File
 from .generate_xdmf import generate_xdmf
 
-__all__ = ['HDF5File', 'NCFile', 'ShenfunFile', 'Checkpoint', 'generate_xdmf']
+__all__ = ['HDF5File', 'NCFile', 'ShenfunFile', 'Checkpoint', 'generate_xdmf',
+           'read_refined']
 
 comm = MPI.COMM_WORLD
 
@@ -57,6 +59,10 @@ class Checkpoint:
     The current timestep is 0, previous is 1 and so on if more is needed by the
     integrator. Note that checkpoint is storing results from spectral space.
 
+    A checkpoint may be read into a space of a different resolution, and
+    with a different number of processors. The stored coefficients are
+    then padded or truncated, see :func:`.read_refined`.
+
     """
     def __init__(self, filename, checkevery=10, data={}):
         self.f = None
@@ -97,15 +103,21 @@ class Checkpoint:
             self.f.require_group(name)
             for u in val:
                 s = u.local_slice()
-                self.f[name].require_dataset(str(step), shape=u.global_shape, dtype=u.dtype)
-                self.f["/".join((name, str(step)))][s] = u
+                dset = self.f[name].require_dataset(str(step), shape=u.global_shape, dtype=u.dtype)
+                T = u.function_space()
+                T = T.flatten()[0] if hasattr(T, 'flatten') else T
+                dset.attrs['N'] = [base.N for base in T.bases]
+                dset[s] = u
 
     def read(self, u, name, **kw):
         step = kw.get('step', 0)
         self.open()
-        s = u.local_slice()
-        dset = "/".join((name, str(step)))
-        u[:] = self.f[dset][s]
+        dset = self.f["/".join((name, str(step)))]
+        if dset.shape == u.global_shape:
+            s = u.local_slice()
+            u[:] = dset[s]
+        else:
+            read_refined(dset, u, N=dset.attrs.get('N', None))
         self.close()
 
     @staticmethod
@@ -122,3 +134,108 @@ class Checkpoint:
             return True
         else:
             return False
+
+def read_refined(dset, u, N=None):
+    """Read expansion coefficients of a different resolution into u
+
+    The stored coefficients are padded with zeros, or truncated, along
+    each axis, like in :meth:`.Function.refine`. Each rank reads only the
+    parts of dset that map to its own part of u, such that the data may
+    be stored with any number of processors and no rank ever holds the
+    full array.
+
+    Parameters
+    ----------
+    dset : array-like
+        Global array of stored expansion coefficients that supports reading
+        with slices, like a h5py Dataset
+    u : :class:`.Function`
+        The Function to read into
+    N : sequence of ints, optional
+        Number of quadrature points along each axis of the stored data. Only
+        used for Fourier R2C axes, where an even number is assumed if None.
+
+    Note
+    ----
+    The stored data must be for the same kind of bases as u, only the
+    number of quadrature points may differ.
+    """
+    space = u.function_space()
+    spaces = space.flatten() if hasattr(space, 'flatten') else [space]
+    ncomp = len(u.global_shape) - spaces[0].dimensions
+    s = u.local_slice()[ncomp:]
+    for c, T in zip(np.ndindex(u.global_shape[:ncomp]), spaces):
+        uc = u[c] if ncomp > 0 else u
+        uc[:] = 0
+        pieces = []
+        for axis, base in enumerate(T.bases):
+            n = dset.shape[ncomp+axis]
+            No = N[axis] if N is not None else _quadrature_size(base, n)
+            pieces.append(_local_pieces(_refined_pieces(base, No), s[axis]))
+        for piece in itertools.product(*pieces):
+            old = tuple(p[0] for p in piece)
+            new = tuple(p[1] for p in piece)
+            uc[new] += np.prod([p[2] for p in piece])*dset[c+old]
+        for axis, base in enumerate(T.bases):
+            No = N[axis] if N is not None else _quadrature_size(base, dset.shape[ncomp+axis])
+            _fix_nyquist(base, No, uc, s[axis])
+    return u
+
+def _quadrature_size(base, n):
+    # Number of quadrature points of base for n stored coefficients
+    from shenfun.fourier.bases import R2C
+    return 2*(n-1) if isinstance(base, R2C) else n
+
+def _refined_pieces(base, No):
+    """Return list of (old, new, factor), mapping slices of coefficients of
+    No quadrature points to slices of base, scaled by factor"""
+    from shenfun.fourier.bases import R2C, C2C
+    Nn = base.N
+    if isinstance(base, R2C):
+        M = min(No, Nn)//2+1
+        return [(slice(0, M), slice(0, M), 1)]
+    if No == Nn:
+        return [(slice(0, Nn), slice(0, Nn), 1)]
+    if isinstance(base, C2C):
+        M = min(No, Nn)
+        pieces = [(slice(0, M//2+1), slice(0, M//2+1), 1),
+                  (slice(No-M//2, No), slice(Nn-M//2, Nn), 1)]
+        if M == No and M % 2 == 0:
+            # Split the Nyquist mode of the padded array equally
+            pieces = [(slice(0, M//2), slice(0, M//2), 1),
+                      (slice(M//2, M//2+1), slice(M//2, M//2+1), 0.5),
+                      (slice(No-M//2, No-M//2+1), slice(Nn-M//2, Nn-M//2+1), 0.5),
+                      (slice(No-M//2+1, No), slice(Nn-M//2+1, Nn), 1)]
+        return pieces
+    nb = Nn - base.slice().stop
+    M = min(No, Nn) - nb
+    pieces = [(slice(0, M), slice(0, M), 1)]
+    if nb > 0:
+        # Boundary dofs are stored last
+        pieces.append((slice(No-nb, No), slice(Nn-nb, Nn), 1))
+    return pieces
+
+def _local_pieces(pieces, s):
+    # Return pieces restricted to the local slice s, and relative to s.start
+    local = []
+    for old, new, factor in pieces:
+        lo, hi = max(new.start, s.start), min(new.stop, s.stop)
+        if lo < hi:
+            d = old.start - new.start
+            local.append((slice(lo+d, hi+d), slice(lo-s.start, hi-s.start), factor))
+    return local
+
+def _fix_nyquist(base, No, u, s):
+    # Real Nyquist mode of R2C axis, as in R2C._padding_backward and
+    # R2C._truncation_forward
+    from shenfun.fourier.bases import R2C
+    Nn = base.N
+    if not isinstance(base, R2C) or No == Nn:
+        return
+    M = min(No, Nn)
+    if M % 2 == 1 or not s.start <= M//2 < s.stop:
+        return
+    sl = [slice(None)]*u.ndim
+    sl[base.axis] = M//2-s.start
+    sl = tuple(sl)
+    u[sl] = u[sl].real*(0.5 if No < Nn else 2)
@@ -2,14 +2,19 @@ r"""
 This module contains linear algebra solvers for SparseMatrices,
 TPMatrices and BlockMatrices.
 """
+import time
+import warnings
 from numbers import Number, Integral
+from collections import OrderedDict
 import numpy as np
-from scipy.sparse import spmatrix, kron
-from scipy.sparse.linalg import splu
+from scipy.sparse import spmatrix, kron, csc_matrix, identity
+from scipy.sparse.linalg import splu, LinearOperator, eigs as arpack_eigs
+import scipy.linalg
 from shenfun.config import config
 from shenfun.optimization import optimizer, runtimeoptimizer
+from shenfun.utilities.timers import timed, timers
 from shenfun.matrixbase import SparseMatrix, extract_bc_matrices, \
-    BlockMatrix, get_simplified_tpmatrices
+    BlockMatrix, TPMatrix, get_simplified_tpmatrices
 from shenfun.forms.arguments import Function
 from mpi4py import MPI
 comm = MPI.COMM_WORLD
@@ -209,6 +214,7 @@ class SparseMatrixSolver:
             u.real[s] = lu.solve(u.real[s])
             u.imag[s] = lu.solve(u.imag[s])
 
+    @timed()
     def __call__(self, b, u=None, axis=0, constraints=()):
         """Solve matrix problem Au = b along axis
 
@@ -960,6 +966,7 @@ class SolverGeneric2ND:
                 self._lu[i] = splu(self.mats2D[i], permc_spec=config['matrix']['sparse']['permc_spec'])
         return self._lu
 
+    @timed()
     def __call__(self, b, u=None, constraints=()):
         """Solve generic problem
 
@@ -1029,6 +1036,7 @@ class SolverDiagonal:
         assert len(tpmats) == 1
         self.mat = tpmats[0]
 
+    @timed()
     def __call__(self, b, u=None, constraints=()):
         """Solve problem with :class:`.TPMatrix` consisting only of diagonal
         matrices
@@ -1092,6 +1100,7 @@ class Solver2D:
             A = A.tocsc()
         return A, b
 
+    @timed()
     def __call__(self, b, u=None, constraints=()):
         """Solve generic problem for sum of :class:`TPMatrix` instances
 
@@ -1175,6 +1184,249 @@ class SolverND(Solver2D):
     def __init__(self, tpmats):
         Solver2D.__init__(self, tpmats)
 
+class SolverFastDiagonalization:
+    r"""Fast diagonalisation solver for separable tensorproduct matrices
+
+    The solver handles any number of non-diagonal directions, and any number
+    of diagonal (Fourier) directions, as long as all the matrices along one
+    non-diagonal axis are linear combinations of at most two matrices, P and
+    Q. This is the case for Poisson and Helmholtz problems in Cartesian
+    coordinates, where P is a mass matrix and Q a stiffness matrix. For each
+    such axis the generalized eigenvalue problem :math:`Q V = P V \Lambda`
+    is solved once, and the problem is then solved by applying dense
+    matrices along each non-diagonal axis, with the diagonal operator
+    inverted in between. The cost is :math:`O(N^{d+1})` operations and
+    :math:`O(N^d)` memory in d dimensions.
+
+    Parameters
+    ----------
+    tpmats : sequence
+        sequence of instances of :class:`.TPMatrix`
+
+    Note
+    ----
+    Along axes where all matrices are proportional to P, like for the mass
+    matrix of a projection, P is inverted with its own banded solver instead
+    of dense matrices.
+
+    Modes where the diagonalized operator is singular (e.g., a constant for
+    pure Neumann problems) are set to zero. A RuntimeWarning is issued if
+    the right hand side is not orthogonal to these modes, since the problem
+    then has no solution.
+
+    If there are boundary matrices in the list of mats, then these matrices
+    are used to modify the right hand side before solving.
+    """
+
+    def __init__(self, tpmats):
+        tpmats = get_simplified_tpmatrices(tpmats)
+        bc_mats = extract_bc_matrices([tpmats])
+        self.tpmats = tpmats
+        self.bc_mats = bc_mats
+        self.T = tpmats[0].space
+        self.naxes = self.T.get_nondiagonal_axes()
+        self._transfers = {}
+        decomp = self.decompose(tpmats)
+        assert decomp is not None, 'Matrices are not separable'
+        self.V = []
+        self.W = []
+        lmbda = []
+        scale = 1
+        for axis in self.naxes:
+            P, Q, coeffs = decomp[axis]
+            if Q is None:
+                # Invert P with the banded solver of a matrix M = a*P of one term
+                t = int(np.argmax([abs(c[0]) for c in coeffs]))
+                scale *= coeffs[t][0]
+                self.V.append(None)
+                self.W.append(tpmats[t].mats[axis])
+                lmbda.append(np.zeros(P.shape[0]))
+                continue
+            l, V, W = self.eig(P, Q)
+            self.V.append(V)
+            self.W.append(W)
+            lmbda.append(l)
+        self.Dinv = self.get_diagonal(lmbda, decomp)*scale
+
+    @staticmethod
+    def decompose(tpmats):
+        """Return separable decomposition of tpmats, or None if not separable
+
+        Parameters
+        ----------
+        tpmats : sequence of simplified instances of :class:`.TPMatrix`
+
+        Returns
+        -------
+        dict or None
+            For each non-diagonal axis a 3-tuple (P, Q, coeffs), where P and
+            Q are dense matrices and coeffs a list of 2-tuples (a, b) such
+            that the matrix of term t along this axis equals
+            coeffs[t][0]*P + coeffs[t][1]*Q. Q is None if all matrices are
+            proportional to P.
+        """
+        decomp = {}
+        for axis in tpmats[0].space.get_nondiagonal_axes():
+            mats = [m.mats[axis].diags('csr').toarray() for m in tpmats]
+            X = np.array([a.ravel() for a in mats])
+            norms = np.linalg.norm(X, axis=1)
+            # P is the matrix that most other matrices are proportional to
+            G = abs(np.conj(X) @ X.T)
+            prop = np.isclose(G, norms[:, None]*norms[None, :], rtol=1e-10)
+            i = np.argmax(prop.sum(axis=1))
+            P = mats[i]
+            Q = None
+            rest = np.nonzero(~prop[i])[0]
+            if len(rest) > 0:
+                Q = mats[rest[0]]
+                B = np.array([P.ravel(), Q.ravel()]).T
+            else:
+                B = P.ravel()[:, None]
+            c, _, _, _ = np.linalg.lstsq(B, X.T, rcond=None)
+            if np.linalg.norm(B @ c - X.T) > 1e-10*np.linalg.norm(X):
+                return None
+            if Q is None:
+                c = np.vstack((c, np.zeros_like(c)))
+            decomp[axis] = (P, Q, list(c.T))
+        return decomp
+
+    @staticmethod
+    def is_separable(tpmats):
+        """Return whether or not tpmats may be solved by this class
+
+        Parameters
+        ----------
+        tpmats : sequence of instances of :class:`.TPMatrix`
+        """
+        tpmats = get_simplified_tpmatrices(tpmats)
+        extract_bc_matrices([tpmats])
+        return SolverFastDiagonalization.decompose(tpmats) is not None
+
+    @staticmethod
+    def eig(P, Q):
+        """Return eigenvalues l, eigenvectors V and W = (P V)^{-1}
+
+        Parameters
+        ----------
+        P, Q : dense matrices
+            The generalized eigenvalue problem is Q V = P V diag(l). If Q is
+            None, then l is zero and V the identity.
+        """
+        if Q is None:
+            return np.zeros(P.shape[0]), np.eye(P.shape[0]), np.linalg.inv(P)
+        if np.allclose(P, P.conj().T) and np.allclose(Q, Q.conj().T):
+            try:
+                l, V = scipy.linalg.eigh(Q, P)
+                return l, V, V.conj().T
+            except np.linalg.LinAlgError: # P not positive definite
+                pass
+        l, V = scipy.linalg.eig(Q, P)
+        if not np.iscomplexobj(P+Q) and np.allclose(l.imag, 0) and np.allclose(V.imag, 0):
+            l, V = l.real, V.real
+        return l, V, np.linalg.inv(P @ V)
+
+    def get_diagonal(self, lmbda, decomp):
+        T = self.T
+        shape = T.shape(True)
+        ls = T.local_slice(True)
+        D = 0
+        for t, m in enumerate(self.tpmats):
+            d = m.scale
+            for i, axis in enumerate(self.naxes):
+                a, b = decomp[axis][2][t]
+                di = np.zeros(T.global_shape(True)[axis], dtype=np.result_type(lmbda[i], a, b))
+                di[:len(lmbda[i])] = a + b*lmbda[i]
+                d = d*T.bases[axis].broadcast_to_ndims(di[ls[axis]])
+            D = D + d
+        D = np.broadcast_to(D, shape)
+        Dinv = np.zeros(shape, dtype=D.dtype)
+        nz = abs(D) > 1e-12*abs(D).max()
+        Dinv[nz] = 1/D[nz]
+        self._singular = None if nz.all() else ~nz
+        return Dinv
+
+    def apply(self, A, x, axis):
+        """Apply dense matrix A along axis of x, in place
+
+        Parameters
+        ----------
+        A : dense matrix or :class:`.SparseMatrix`
+            If a :class:`.SparseMatrix`, then its inverse is applied using
+            the solver of A
+        x : array
+        axis : int
+        """
+        pencil = self.T.forward.output_pencil
+        if pencil.subcomm[axis].Get_size() > 1:
+            key = (axis, x.dtype.char)
+            if key not in self._transfers:
+                trans = pencil.transfer(pencil.pencil(axis), x.dtype.char)
+                self._transfers[key] = (trans, np.zeros(trans.subshapeB, dtype=x.dtype))
+            trans, xB = self._transfers[key]
+            trans.forward(x, xB)
+            self._apply_local(A, xB, axis)
+            trans.backward(xB, x)
+        else:
+            self._apply_local(A, x, axis)
+        return x
+
+    @staticmethod
+    def _apply_local(A, x, axis):
+        n = A.shape[0]
+        s = [slice(None)]*x.ndim
+        if isinstance(A, SparseMatrix):
+            x = A.solve(x, axis=axis)
+        else:
+            s[axis] = slice(0, n)
+            y = np.moveaxis(x[tuple(s)], axis, -1) @ A.T
+            x[tuple(s)] = np.moveaxis(y, -1, axis)
+        s[axis] = slice(n, None)
+        x[tuple(s)] = 0
+        return x
+
+    @timed()
+    def __call__(self, b, u=None, constraints=()):
+        """Solve problem with separable matrices
+
+        Parameters
+        ----------
+        b : array, right hand side
+        u : array, solution
+        constraints : tuple
+            Not supported by this solver
+        """
+        assert len(constraints) == 0
+        if u is None:
+            u = b
+
+        if len(self.bc_mats) > 0:
+            u.set_boundary_dofs()
+            w0 = Function(self.T).v
+            for bc_mat in self.bc_mats:
+                b -= bc_mat.matvec(u, w0)
+
+        dtype = np.result_type(b, self.Dinv, *[V for V in self.V if V is not None],
+                               *[W for W, V in zip(self.W, self.V) if V is not None])
+        x = b.v.astype(dtype) if hasattr(b, 'v') else b.astype(dtype)
+        for W, axis in zip(self.W, self.naxes):
+            x = self.apply(W, x, axis)
+        if self._singular is not None:
+            r = np.abs(x[self._singular]).max(initial=0)
+            if r > 1e-8*np.abs(x).max(initial=0):
+                warnings.warn('Right hand side has a component %2.4e in a singular mode '
+                              'that is set to zero' %r, RuntimeWarning)
+        x *= self.Dinv
+        for V, axis in zip(self.V, self.naxes):
+            if V is not None:
+                x = self.apply(V, x, axis)
+        u[:] = x if np.iscomplexobj(u) else x.real
+
+        # Boundary dofs are zero from apply, and only need to be set for
+        # nonhomogeneous boundary conditions
+        if np.any([base.has_nonhomogeneous_bcs for base in self.T.bases]):
+            u.set_boundary_dofs()
+        return u
+
 
 class SolverGeneric1ND:
     """Generic solver for tensorproduct matrices consisting of
@@ -1381,6 +1633,7 @@ class SolverGeneric1ND:
                     s0 = tuple(s)
                     sol.inner_solve(u[s0], sol._inner_arg)
 
+    @timed()
     def __call__(self, b, u=None, constraints=(), fast=True):
         """Solve problem with one non-diagonal direction
 
@@ -1427,11 +1680,62 @@ class SolverGeneric1ND:
             u.set_boundary_dofs()
         return u
 
+class SharedOrderingLU:
+    """Sparse LU factorisation with a given column ordering
+
+    Parameters
+    ----------
+    A : scipy sparse matrix
+        The matrix to factorise
+    perm_c : array of ints or None, optional
+        Column permutation. If None, then compute a fill-reducing ordering
+        according to ``config['matrix']['block']['permc_spec']``. The
+        ordering used is stored in attribute perm_c, such that it may be
+        reused for other matrices with the same sparsity pattern.
+    """
+    def __init__(self, A, perm_c=None):
+        if perm_c is None:
+            self.lu = splu(A, permc_spec=config['matrix']['block']['permc_spec'])
+            self.perm_c = self.lu.perm_c
+            self._q = None
+        else:
+            # SuperLU factorises A[:, argsort(perm_c)] for the ordering perm_c
+            self._q = np.argsort(perm_c)
+            self.lu = splu(A[:, self._q].tocsc(), permc_spec='NATURAL')
+            self.perm_c = perm_c
+        self.dtype = A.dtype
+        self.nbytes = self.lu.nnz*(A.dtype.itemsize+A.indices.dtype.itemsize)
+
+    def solve(self, b):
+        """Return solution x of A x = b"""
+        y = self.lu.solve(b)
+        if self._q is None:
+            return y
+        x = np.empty_like(y)
+        x[self._q] = y
+        return x
+
 class BlockMatrixSolver:
+    """Direct solver for :class:`.BlockMatrix` systems
+
+    The system is assembled into one scipy sparse matrix for each index
+    of the diagonal (Fourier) axes, and each of these matrices is factorised
+    with SuperLU. All matrices share the same sparsity pattern and, unless
+    ``config['matrix']['block']['reuse_ordering']`` is False, the
+    fill-reducing column ordering is computed only for the first and then
+    reused for the rest. The numeric factors are kept in a cache of at most
+    ``config['matrix']['block']['lu_maxbytes']`` bytes (None means no
+    bound), where the least recently used factors are dropped first.
+
+    Parameters
+    ----------
+    mats : :class:`.BlockMatrix` or list of :class:`.TPMatrix`
+    """
     def __init__(self, mats):
         assert isinstance(mats, (BlockMatrix, list))
         self.bc_mat = None
-        self._lu = None
+        self._lu = OrderedDict()
+        self._perm_c = None
         if isinstance(mats, BlockMatrix):
             mats = mats.get_mats()
         bc_mats = extract_bc_matrices([mats])
@@ -1459,16 +1763,53 @@ class BlockMatrixSolver:
         val = constraint[2]
         b[row] = val
         if A is not None:
-            A = A.tolil()
-            r = A.getrow(row).nonzero()
-            A[(row, r[1])] = 0
-            A[row, row] = 1
-            A = A.tocsc()
+            # Replace row with identity, without changing sparse format
+            A = A.tocsc(copy=True)
+            A.data[A.indices == row] = 0
+            A = A + csc_matrix(([1], ([row], [row])), shape=A.shape, dtype=A.dtype)
         return A, b
 
+    @property
+    def nbytes(self):
+        """Return number of bytes held by the cached LU factors"""
+        return sum(lu.nbytes for lu in self._lu.values())
+
+    def get_lu(self, key, A, constraints=(), offsets=None):
+        """Return (cached) LU factorisation of matrix for index key
+
+        Parameters
+        ----------
+        key : int or tuple of ints
+            Index of the diagonal axes
+        A : scipy sparse matrix
+            Matrix for index key
+        constraints : sequence of 3-tuples, optional
+            Constraints applied to A before factorising
+        offsets : sequence of ints, optional
+            Offsets for each constraint
+        """
+        if key in self._lu:
+            self._lu.move_to_end(key)
+            return self._lu[key]
+        for con, offset in zip(constraints, offsets):
+            A, _ = self.apply_constraint(A, np.zeros(A.shape[0], dtype=A.dtype), offset, key, con)
+        perm_c = self._perm_c if config['matrix']['block']['reuse_ordering'] else None
+        if perm_c is not None and perm_c.shape[0] != A.shape[1]:
+            perm_c = None
+        lu = SharedOrderingLU(A, perm_c)
+        self._perm_c = lu.perm_c
+        self._lu[key] = lu
+        maxbytes = config['matrix']['block']['lu_maxbytes']
+        if maxbytes is not None:
+            nbytes = self.nbytes
+            while nbytes > maxbytes and len(self._lu) > 1:
+                _, lu0 = self._lu.popitem(last=False)
+                nbytes -= lu0.nbytes
+        return lu
+
+    @timed()
     def __call__(self, b, u=None, constraints=()):
         from .forms.arguments import Function
-        import scipy.sparse as sp
         space = b.function_space()
         if u is None:
             u = Function(space)
@@ -1489,8 +1830,6 @@ class BlockMatrixSolver:
             assert isinstance(con[1], Integral)
             assert isinstance(con[2], Number)
         self.mat.assemble()
-        if self._lu is None:
-            self._lu = {}
 
         daxes = space.get_diagonal_axes()
         if len(daxes) == space.dimensions:
@@ -1498,35 +1837,24 @@ class BlockMatrixSolver:
             assert len(daxes) == space.dimensions
             Ai = self.mat._Ai[0]
             gi = b.flatten()
-            if isinstance(self._lu, dict):
-                for con in constraints:
-                    Ai, gi = self.apply_constraint(Ai, gi, np.sum(np.array(space.dims()[:con[0]])), 0, con)
-            else:
-                for con in constraints:
-                    _, gi = self.apply_constraint(None, gi, np.sum(np.array(space.dims()[:con[0]])), 0, con)
-            lu = sp.linalg.splu(Ai, permc_spec=config['matrix']['block']['permc_spec'])
-            self._lu = lu
+            offsets = [np.sum(np.array(space.dims()[:con[0]])) for con in constraints]
+            for con, offset in zip(constraints, offsets):
+                _, gi = self.apply_constraint(None, gi, offset, 0, con)
+            lu = self.get_lu(0, Ai, constraints, offsets)
             u[:] = lu.solve(gi).reshape(u.shape)
 
         else:
             sl, dims = space._get_ndiag_slices_and_dims()
             gi = np.zeros(dims[-1], dtype=b.dtype)
+            offsets = [dims[con[0]] for con in constraints]
             for key, Ai in self.mat._Ai.items():
                 if len(daxes) > 0:
                     sl.T[daxes+1] = key if isinstance(key, int) else np.array(key)[:, None]
                 gi = b.copy_to_flattened(gi, key, dims, sl)
-                if key in self._lu:
-                    lu = self._lu[key]
-                    for con in constraints:
-                        _, gi = self.apply_constraint(None, gi, dims[con[0]], key, con)
-                else:
-                    for con in constraints:
-                        Ai, gi = self.apply_constraint(Ai, gi, dims[con[0]], key, con)
-
-                    lu = sp.linalg.splu(Ai, permc_spec=config['matrix']['block']['permc_spec'])
-                    self._lu[key] = lu
-
-                if b.dtype.char in 'fdg' or lu.U.dtype.char in 'FDG':
+                for con, offset in zip(constraints, offsets):
+                    _, gi = self.apply_constraint(None, gi, offset, key, con)
+                lu = self.get_lu(key, Ai, constraints, offsets)
+                if b.dtype.char in 'fdg' or lu.dtype.char in 'FDG':
                     u = u.copy_from_flattened(lu.solve(gi), key, dims, sl)
                 else:
                     u.real = u.real.copy_from_flattened(lu.solve(gi.real), key, dims, sl)
@@ -1535,3 +1863,731 @@ class BlockMatrixSolver:
         u = u.reshape(u.shape[1:]) if nvars == 1 else u
         b = b.reshape(b.shape[1:]) if nvars == 1 else b
         return u
+
+class SchurComplementSolver:
+    r"""Solver for saddle point problems, like Stokes, through the Schur complement
+
+    The block system
+
+    .. math::
+
+        \begin{bmatrix}
+            A & G \\
+            D & C
+        \end{bmatrix}
+        \begin{bmatrix}
+            u \\
+            p
+        \end{bmatrix}
+        =
+        \begin{bmatrix}
+            f \\
+            h
+        \end{bmatrix}
+
+    is solved by eliminating the velocity u. The velocity block A must be
+    block-diagonal, with one block for each component, and each of these
+    must be solvable with the fast :class:`.SolverGeneric1ND`. The pressure
+    Schur complement :math:`S = C - D A^{-1} G` is a small dense matrix for
+    each Fourier wavenumber, which is assembled once, with one velocity solve
+    per pressure mode, and then inverted. A solve requires two velocity
+    solves, and one dense matrix-vector product per wavenumber.
+
+    Parameters
+    ----------
+    mats : :class:`.BlockMatrix` or list of :class:`.TPMatrix`
+        The block matrices of the system, where the last component of the
+        :class:`.CompositeSpace` is the pressure.
+
+    Example
+    -------
+    Stokes flow, periodic in x-direction
+
+    >>> from shenfun import FunctionSpace, TensorProductSpace, VectorSpace, \
+    ...     CompositeSpace, TrialFunction, TestFunction, Function, inner, \
+    ...     grad, div, la, comm
+    >>> N = 12
+    >>> K0 = FunctionSpace(N, 'F', dtype='d')
+    >>> SD = FunctionSpace(N, 'L', bc=(0, 0))
+    >>> ST = FunctionSpace(N, 'L')
+    >>> TD = TensorProductSpace(comm, (K0, SD), axes=(1, 0))
+    >>> Q = TensorProductSpace(comm, (K0, ST), axes=(1, 0))
+    >>> VQ = CompositeSpace([VectorSpace(TD), Q])
+    >>> u, p = TrialFunction(VQ)
+    >>> v, q = TestFunction(VQ)
+    >>> A = inner(grad(v), grad(u)) + inner(div(v), p) + inner(q, div(u))
+    >>> sol = la.SchurComplementSolver(A)
+    >>> up_hat = sol(Function(VQ), constraints=((2, 0, 0), (2, N-1, 0)))
+
+    """
+    def __init__(self, mats):
+        assert isinstance(mats, (BlockMatrix, list))
+        if isinstance(mats, BlockMatrix):
+            mats = mats.get_mats()
+        bc_mats = extract_bc_matrices([mats])
+        self.mat = BlockMatrix(mats)
+        self.bc_mat = BlockMatrix(bc_mats) if len(bc_mats) > 0 else None
+        M = self.mat.mats
+        self.nv = nv = len(M)-1
+        for i in range(nv):
+            for j in range(nv):
+                assert i == j or M[i][j] == 0, 'Velocity block must be block-diagonal'
+        self.solvers = [SolverGeneric1ND(M[i][i]) for i in range(nv)]
+        self.G = [M[i][nv] for i in range(nv)]
+        self.D = [M[nv][i] for i in range(nv)]
+        self.C = M[nv][nv]
+        self.pspace = self.mat.trialbase.flatten()[nv]
+        self.naxis = self.solvers[0].naxes
+        self._Sinv = None
+        self._S0 = None
+        self._constraints = ()
+
+    @staticmethod
+    def _matvec(mats, v, c, w):
+        c.fill(0)
+        if isinstance(mats, Number):
+            return c
+        for m in mats:
+            c += m.matvec(v, w)
+        return c
+
+    def _solve_velocity(self, f, u, w):
+        for i, sol in enumerate(self.solvers):
+            w[0] = f[i]
+            u[i] = sol(w[0], u[i])
+        return u
+
+    def _schur_matvec(self, p, s, z, w):
+        # s = C p - D A^{-1} G p
+        s = self._matvec(self.C, p, s, w[0])
+        for i in range(self.nv):
+            z[i] = self._matvec(self.G[i], p, z[i], w[0])
+        z = self._solve_velocity(z, z, w)
+        for i in range(self.nv):
+            s -= self._matvec(self.D[i], z[i], w[0], w[1])
+        return s
+
+    def _is_rank_zero(self):
+        ls = self.pspace.local_slice()
+        return np.all([ls[i].start == 0 for i in range(self.pspace.dimensions) if i != self.naxis])
+
+    def assemble(self, constraints=()):
+        """Assemble and invert the Schur complement for all wavenumbers
+
+        Parameters
+        ----------
+        constraints : tuple of 3-tuples
+            Each 3-tuple (component, row, value) constrains the pressure (with
+            component equal to the number of velocity components) for
+            Fourier wavenumber 0.
+        """
+        n = self.naxis
+        shape = self.pspace.shape(True)
+        m = self.pspace.bases[n].slice().stop
+        dtype = self.mat.testbase.forward.output_array.dtype
+        p = np.zeros(shape, dtype=dtype)
+        s = np.zeros(shape, dtype=dtype)
+        z = np.zeros((self.nv,)+shape, dtype=dtype)
+        w = np.zeros((2,)+shape, dtype=dtype)
+        S = np.zeros(np.take(shape, np.setxor1d(range(len(shape)), n)).tolist()+[m, m], dtype=dtype)
+        pm = np.moveaxis(p, n, -1)
+        for j in range(m):
+            pm[..., j] = 1
+            s = self._schur_matvec(p, s, z, w)
+            S[..., j] = np.moveaxis(s, n, -1)[..., :m]
+            pm[..., j] = 0
+        if self._is_rank_zero():
+            self._S0 = S[(0,)*(S.ndim-2)].copy()
+            self._constrain(S[(0,)*(S.ndim-2)], constraints)
+        self._Sinv = np.linalg.inv(S)
+        self._constraints = tuple((con[0], con[1]) for con in constraints)
+        return self._Sinv
+
+    def _constrain(self, S0, constraints):
+        # Replace rows of the Schur complement of wavenumber 0 with identity
+        for con in constraints:
+            assert con[0] == self.nv, 'Only pressure constraints are supported'
+            S0[con[1]] = 0
+            S0[con[1], con[1]] = 1
+        return S0
+
+    def _set_constraints(self, constraints):
+        # Apply new constraints and invert the Schur complement of
+        # wavenumber 0 again
+        if self._is_rank_zero():
+            S0 = self._constrain(self._S0.copy(), constraints)
+            self._Sinv[(0,)*(self._Sinv.ndim-2)] = np.linalg.inv(S0)
+        self._constraints = tuple((con[0], con[1]) for con in constraints)
+
+    @timed()
+    def __call__(self, b, u=None, constraints=()):
+        """Solve saddle point problem
+
+        Parameters
+        ----------
+        b : :class:`.Function`
+            Right hand side
+        u : :class:`.Function`, optional
+            The solution
+        constraints : tuple of 3-tuples
+            Each 3-tuple (component, row, value) constrains the pressure for
+            Fourier wavenumber 0. The Schur complement is assembled at the
+            first call, and the rows of the constraints are applied again
+            if they change between calls.
+        """
+        space = b.function_space()
+        if u is None:
+            u = Function(space)
+        if self.bc_mat is not None:
+            u.set_boundary_dofs()
+            w0 = np.zeros_like(b)
+            b = b - self.bc_mat.matvec(u, w0)
+        if self._Sinv is None:
+            self.assemble(constraints)
+        elif tuple((con[0], con[1]) for con in constraints) != self._constraints:
+            self._set_constraints(constraints)
+        n = self.naxis
+        nv = self.nv
+        m = self._Sinv.shape[-1]
+        f, h = b.v[:nv], b.v[nv]
+        uv, p = u.v[:nv], u.v[nv]
+        w = np.zeros((2,)+h.shape, dtype=b.dtype)
+        z = np.zeros_like(f)
+        r = np.zeros_like(h)
+        # r = h - D A^{-1} f
+        z = self._solve_velocity(f, z, w)
+        r[:] = h
+        for i in range(nv):
+            r -= self._matvec(self.D[i], z[i], w[0], w[1])
+        rm = np.moveaxis(r, n, -1)
+        if self._is_rank_zero():
+            for con in constraints:
+                rm[(0,)*(rm.ndim-1)+(con[1],)] = con[2]
+        pm = np.moveaxis(p, n, -1)
+        pm[...] = 0
+        pm[..., :m] = np.einsum('...ij,...j->...i', self._Sinv, rm[..., :m])
+        # u = A^{-1}(f - G p)
+        for i in range(nv):
+            z[i] = f[i]
+            z[i] -= self._matvec(self.G[i], p, w[0], w[1])
+        uv = self._solve_velocity(z, uv, w)
+        if hasattr(u, 'set_boundary_dofs'):
+            u.set_boundary_dofs()
+        return u
+
+class KrylovSolver:
+    """Base class for matrix-free Krylov solvers
+
+    The system of equations is applied through the matvec methods of the
+    matrices, such that no global (scipy) matrix is ever assembled. Works
+    for :class:`.SparseMatrix`, :class:`.TPMatrix` and :class:`.BlockMatrix`
+    systems, with any number of non-diagonal directions.
+
+    Parameters
+    ----------
+    mats : :class:`.BlockMatrix` or list of :class:`.TPMatrix` or :class:`.SparseMatrix`
+        The matrices of the system. If there are boundary matrices in the
+        list, then these are used to modify the right hand side, like for the
+        direct solvers.
+    M : callable, optional
+        Preconditioner, called as ``M(r, z)``, that should return an
+        approximation z to the solution of A z = r, without modifying r.
+        Any of the solvers in this module, created from a simpler (e.g.,
+        one-dimensional, or block-diagonal) approximation of the system, may
+        be used. See also :class:`.BlockDiagonalPreconditioner`.
+    tol : float, optional
+        Relative tolerance. Stop when the norm of the residual is less than
+        tol times the norm of the right hand side.
+    atol : float, optional
+        Absolute tolerance for the norm of the residual
+    maxiter : int, optional
+        Maximum number of iterations
+
+    Note
+    ----
+    After a solve the number of iterations, the history of residual norms,
+    the time used and whether or not the solver converged are stored in the
+    attributes ``niter``, ``residuals``, ``time`` and ``converged``. The
+    iterations are also added to the counter with the name of the class in
+    :data:`.timers`.
+
+    Example
+    -------
+    >>> from shenfun import FunctionSpace, TensorProductSpace, TestFunction, \\
+    ...     TrialFunction, inner, div, grad, Array, la, comm
+    >>> D = FunctionSpace(12, 'L', bc=(0, 0))
+    >>> T = TensorProductSpace(comm, (D, D))
+    >>> u = TrialFunction(T)
+    >>> v = TestFunction(T)
+    >>> A = inner(grad(v), grad(u))
+    >>> b = inner(v, Array(T, val=1))
+    >>> sol = la.CG(A, tol=1e-12)
+    >>> u_hat = sol(b)
+    >>> sol.converged
+    True
+    """
+    def __init__(self, mats, M=None, tol=1e-8, atol=0, maxiter=1000):
+        if isinstance(mats, BlockMatrix):
+            mats = mats.get_mats()
+        elif isinstance(mats, SparseMatrix):
+            mats = [mats]
+        mats = list(mats)
+        bc_mats = extract_bc_matrices([mats])
+        assert len(mats) > 0
+        self.mat = BlockMatrix(mats)
+        self.bc_mat = BlockMatrix(bc_mats) if len(bc_mats) > 0 else None
+        self.M = M
+        self.tol = tol
+        self.atol = atol
+        self.maxiter = maxiter
+        self.niter = 0
+        self.residuals = []
+        self.time = 0
+        self.converged = False
+
+    def matvec(self, v, c):
+        """Compute c = A v with the regular (non-boundary) matrices
+
+        Parameters
+        ----------
+        v : :class:`.Function` of trialspace
+        c : :class:`.Function` of testspace
+        """
+        return self.mat.matvec(v, c, use_scipy=False)
+
+    def precondition(self, r, z):
+        """Return z = M r, where M is the preconditioner
+
+        Parameters
+        ----------
+        r : :class:`.Function` of testspace
+        z : :class:`.Function` of trialspace
+        """
+        if self.M is None:
+            z[:] = r
+            return z
+        return self.M(r, z)
+
+    def dot(self, a, b):
+        """Return global inner product of coefficient arrays a and b"""
+        s = np.vdot(a, b)
+        comm = getattr(a.function_space(), 'comm', None)
+        if comm is not None:
+            s = comm.allreduce(s)
+        return s
+
+    def norm(self, a):
+        """Return global l2-norm of coefficient array a"""
+        return np.sqrt(abs(self.dot(a, a)))
+
+    def residual(self, b, u, r):
+        """Return r = b - A u
+
+        Parameters
+        ----------
+        b : :class:`.Function`
+            Right hand side, modified for boundary matrices
+        u : :class:`.Function`
+            Current solution
+        r : :class:`.Function`
+            The residual
+        """
+        r = self.matvec(u, r)
+        r *= -1
+        r += b
+        return r
+
+    def solve(self, b, u, bnorm):
+        """Iterate from initial guess u. Return True if converged
+
+        Parameters
+        ----------
+        b : :class:`.Function`
+            Right hand side, modified for boundary matrices
+        u : :class:`.Function`
+            Initial guess and solution
+        bnorm : float
+            Tolerance for the norm of the residual
+        """
+        raise NotImplementedError
+
+    def _check(self, res, tol):
+        self.residuals.append(res)
+        return res <= tol
+
+    @timed()
+    def __call__(self, b, u=None):
+        """Solve problem with right hand side b
+
+        Parameters
+        ----------
+        b : :class:`.Function`
+            Right hand side. Not modified.
+        u : :class:`.Function`, optional
+            Initial guess and solution. Zero initial guess if None.
+        """
+        t0 = time.perf_counter()
+        if u is None:
+            u = Function(self.mat.trialbase)
+        if self.bc_mat is not None:
+            u.set_boundary_dofs()
+            w0 = Function(self.mat.testbase)
+            b0 = Function(self.mat.testbase)
+            b0[:] = b
+            b = b0
+            b -= self.bc_mat.matvec(u, w0)
+        self.niter = 0
+        self.residuals = []
+        tol = max(self.tol*self.norm(b), self.atol)
+        self.converged = self.solve(b, u, tol)
+        if hasattr(u, 'set_boundary_dofs'):
+            u.set_boundary_dofs()
+        self.time = time.perf_counter()-t0
+        timers.count(self.__class__.__name__, self.niter)
+        return u
+
+class CG(KrylovSolver):
+    """Preconditioned conjugate gradient method
+
+    For Hermitian positive definite systems, and Hermitian positive definite
+    preconditioners. See :class:`.KrylovSolver` for parameters.
+    """
+    def solve(self, b, u, tol):
+        test, trial = self.mat.testbase, self.mat.trialbase
+        r = self.residual(b, u, Function(test))
+        if self._check(self.norm(r), tol):
+            return True
+        q = Function(test)
+        z = self.precondition(r, Function(trial))
+        p = z.copy()
+        rz = self.dot(r, z).real
+        while self.niter < self.maxiter:
+            self.niter += 1
+            q = self.matvec(p, q)
+            alpha = rz/self.dot(p, q).real
+            u += alpha*p
+            r -= alpha*q
+            if self._check(self.norm(r), tol):
+                return True
+            z = self.precondition(r, z)
+            rz0 = rz
+            rz = self.dot(r, z).real
+            p *= rz/rz0
+            p += z
+        return False
+
+class MINRES(KrylovSolver):
+    """Preconditioned minimal residual method
+
+    For Hermitian, possibly indefinite, systems, like saddle point problems,
+    and Hermitian positive definite preconditioners. See
+    :class:`.KrylovSolver` for parameters.
+
+    Note
+    ----
+    The residual is measured in the norm induced by the preconditioner, and
+    as such the tolerance is relative to the preconditioned norm of the
+    initial residual.
+    """
+    def solve(self, b, u, tol):
+        space = self.mat.trialbase
+        r1 = self.residual(b, u, Function(space))
+        y = self.precondition(r1, Function(space))
+        beta1 = np.sqrt(abs(self.dot(r1, y)))
+        tol = max(self.tol*beta1, self.atol)
+        if self._check(beta1, tol):
+            return True
+        r2 = r1.copy()
+        v = Function(space)
+        w, w1, w2 = Function(space), Function(space), Function(space)
+        oldb, beta, dbar, epsln, phibar = 0, beta1, 0, 0, beta1
+        cs, sn = -1, 0
+        while self.niter < self.maxiter:
+            self.niter += 1
+            v[:] = y
+            v *= 1/beta
+            y = self.matvec(v, y)
+            if self.niter >= 2:
+                y -= (beta/oldb)*r1
+            alfa = self.dot(v, y).real
+            y -= (alfa/beta)*r2
+            r1, r2, y = r2, y, r1
+            y = self.precondition(r2, y)
+            oldb = beta
+            beta = np.sqrt(abs(self.dot(r2, y)))
+            oldeps = epsln
+            delta = cs*dbar + sn*alfa
+            gbar = sn*dbar - cs*alfa
+            epsln = sn*beta
+            dbar = -cs*beta
+            gamma = max(np.hypot(gbar, beta), np.finfo(float).eps)
+            cs, sn = gbar/gamma, beta/gamma
+            phi = cs*phibar
+            phibar = sn*phibar
+            w1, w2, w = w2, w, w1
+            w[:] = v
+            w -= oldeps*w1
+            w -= delta*w2
+            w *= 1/gamma
+            u += phi*w
+            if self._check(phibar, tol):
+                return True
+        return False
+
+class GMRES(KrylovSolver):
+    """Restarted flexible generalized minimal residual method
+
+    For general systems. The preconditioner is applied from the right and is
+    allowed to change between iterations, such that also inexact (iterative)
+    preconditioners may be used.
+
+    Parameters
+    ----------
+    mats : :class:`.BlockMatrix` or list of :class:`.TPMatrix` or :class:`.SparseMatrix`
+    M : callable, optional
+    tol : float, optional
+    atol : float, optional
+    maxiter : int, optional
+    restart : int, optional
+        Number of iterations between restarts
+
+    See :class:`.KrylovSolver` for the remaining parameters.
+    """
+    def __init__(self, mats, M=None, tol=1e-8, atol=0, maxiter=1000, restart=30):
+        KrylovSolver.__init__(self, mats, M=M, tol=tol, atol=atol, maxiter=maxiter)
+        self.restart = restart
+
+    def solve(self, b, u, tol):
+        test, trial = self.mat.testbase, self.mat.trialbase
+        m = self.restart
+        V = [Function(test) for i in range(m+1)]
+        Z = [Function(trial) for i in range(m)]
+        H = np.zeros((m+1, m), dtype=b.dtype)
+        cs = np.zeros(m, dtype=H.dtype)
+        sn = np.zeros(m, dtype=H.dtype)
+        g = np.zeros(m+1, dtype=H.dtype)
+        while True:
+            r = self.residual(b, u, V[0])
+            beta = self.norm(r)
+            if self._check(beta, tol):
+                return True
+            if self.niter >= self.maxiter:
+                return False
+            r *= 1/beta
+            g[:] = 0
+            g[0] = beta
+            for j in range(m):
+                self.niter += 1
+                Z[j] = self.precondition(V[j], Z[j])
+                w = self.matvec(Z[j], V[j+1])
+                for i in range(j+1):
+                    H[i, j] = self.dot(V[i], w)
+                    w -= H[i, j]*V[i]
+                H[j+1, j] = self.norm(w)
+                if H[j+1, j] > 0:
+                    w *= 1/H[j+1, j]
+                for i in range(j):
+                    h0, h1 = H[i, j], H[i+1, j]
+                    H[i, j] = cs[i]*h0 + sn[i]*h1
+                    H[i+1, j] = -np.conj(sn[i])*h0 + cs[i]*h1
+                h0, h1 = H[j, j], H[j+1, j]
+                d = np.hypot(abs(h0), abs(h1))
+                if abs(h0) == 0:
+                    cs[j], sn[j] = 0, 1
+                else:
+                    cs[j] = abs(h0)/d
+                    sn[j] = h0/abs(h0)*np.conj(h1)/d
+                H[j, j] = cs[j]*h0 + sn[j]*h1
+                H[j+1, j] = 0
+                g[j+1] = -np.conj(sn[j])*g[j]
+                g[j] = cs[j]*g[j]
+                res = abs(g[j+1])
+                self.residuals.append(res)
+                if res <= tol or self.niter >= self.maxiter:
+                    break
+            k = j+1
+            y = np.linalg.solve(np.triu(H[:k, :k]), g[:k])
+            for i in range(k):
+                u += y[i]*Z[i]
+
+class BiCGStab(KrylovSolver):
+    """Preconditioned stabilized bi-conjugate gradient method
+
+    For general systems. The preconditioner is applied from the right. See
+    :class:`.KrylovSolver` for parameters.
+    """
+    def solve(self, b, u, tol):
+        test, trial = self.mat.testbase, self.mat.trialbase
+        r = self.residual(b, u, Function(test))
+        if self._check(self.norm(r), tol):
+            return True
+        r0 = r.copy()
+        p = Function(test)
+        v = Function(test)
+        t = Function(test)
+        phat = Function(trial)
+        shat = Function(trial)
+        rho, alpha, omega = 1, 1, 1
+        while self.niter < self.maxiter:
+            self.niter += 1
+            rho0, rho = rho, self.dot(r0, r)
+            beta = (rho/rho0)*(alpha/omega)
+            p -= omega*v
+            p *= beta
+            p += r
+            phat = self.precondition(p, phat)
+            v = self.matvec(phat, v)
+            rv = self.dot(r0, v)
+            if rv == 0:
+                return False
+            alpha = rho/rv
+            if u.dtype.char in 'fdg':
+                alpha = alpha.real
+            r -= alpha*v # r is now s
+            u += alpha*phat
+            if self._check(self.norm(r), tol):
+                return True
+            shat = self.precondition(r, shat)
+            t = self.matvec(shat, t)
+            tt = self.dot(t, t)
+            if tt == 0:
+                return False
+            omega = self.dot(t, r)/tt
+            if u.dtype.char in 'fdg':
+                omega = omega.real
+            u += omega*shat
+            r -= omega*t
+            if self._check(self.norm(r), tol):
+                return True
+        return False
+
+class BlockDiagonalPreconditioner:
+    """Block-diagonal preconditioner for :class:`.BlockMatrix` systems
+
+    Applies one solver to each of the top level spaces of a
+    :class:`.CompositeSpace`, such that, e.g., a Stokes system may be
+    preconditioned with a Helmholtz solver for the velocity and an
+    approximation of the Schur complement for the pressure.
+
+    Parameters
+    ----------
+    solvers : sequence of callables
+        One solver for each space of the :class:`.CompositeSpace`, called as
+        ``solver(r, z)``. A solver may be None, in which case the identity is
+        used for this block.
+    """
+    def __init__(self, solvers):
+        self.solvers = solvers
+
+    def __call__(self, r, z):
+        for i, sol in enumerate(self.solvers):
+            if sol is None:
+                z[i] = r[i]
+            else:
+                z[i] = sol(r[i], z[i])
+        return z
+
+def eigs(A, B=None, k=6, sigma=0, return_eigenvectors=True, tol=0, maxiter=None):
+    r"""Return k eigenvalues nearest sigma for the generalized eigenvalue
+    problem :math:`A x = \lambda B x`
+
+    The eigenvalues are computed with shift-invert Arnoldi iterations
+    (ARPACK), where the shifted matrix :math:`A - \sigma B` is factorised
+    once with a sparse LU. Only a few sparse solves are required, as
+    opposed to a dense eigenvalue solve of cost :math:`O(N^3)`.
+
+    Parameters
+    ----------
+    A : :class:`.SparseMatrix`, list of :class:`.SparseMatrix`, list of
+        :class:`.TPMatrix` or :class:`.BlockMatrix`
+    B : same type as A, or None, optional
+        If None, then B is the identity matrix
+    k : int, optional
+        Number of eigenvalues
+    sigma : number, optional
+        The target. Find the eigenvalues closest to sigma.
+    return_eigenvectors : bool, optional
+        Whether or not to return eigenvectors
+    tol : float, optional
+        Relative accuracy of eigenvalues. Machine precision if 0.
+    maxiter : int or None, optional
+        Maximum number of Arnoldi iterations
+
+    Returns
+    -------
+    w, v : array, array or dict
+        The k eigenvalues w, sorted by distance to sigma, and eigenvectors v
+        (columns) if return_eigenvectors is True. For a one-dimensional
+        problem the eigenvectors have the dimension of the matrices. For
+        multidimensional problems (list of :class:`.TPMatrix` or
+        :class:`.BlockMatrix`) the eigenvalue problem is solved for each
+        index (wavenumber) of the diagonal (Fourier) axes, and a dictionary
+        is returned that for each index in the local array holds the
+        eigenvalues (and eigenvectors), with the eigenvectors flattened as
+        for :class:`.BlockMatrix`. The keys are the same as for the
+        assembled matrices of :meth:`.BlockMatrix.assemble`, i.e., an int
+        for one diagonal axis and a tuple for more.
+
+    Example
+    -------
+    >>> import numpy as np
+    >>> from shenfun import FunctionSpace, TrialFunction, TestFunction, inner, \
+    ...     div, grad, la
+    >>> D = FunctionSpace(40, 'L', bc=(0, 0))
+    >>> u = TrialFunction(D)
+    >>> v = TestFunction(D)
+    >>> A = inner(grad(v), grad(u))
+    >>> B = inner(v, u)
+    >>> w = la.eigs(A, B, k=2, sigma=0, return_eigenvectors=False)
+    >>> np.allclose(w, (np.pi/2)**2*np.array([1, 4]))
+    True
+    """
+    if isinstance(A, SparseMatrix) or (isinstance(A, (list, tuple)) and isinstance(A[0], SparseMatrix)):
+        A = _get_scipy_matrix(A)
+        B = _get_scipy_matrix(B) if B is not None else None
+        return _shift_invert_eigs(A, B, k, sigma, return_eigenvectors, tol, maxiter)
+
+    A = _get_block_matrix(A)
+    B = _get_block_matrix(B) if B is not None else None
+    result = {}
+    for key, Ai in A._Ai.items():
+        Bi = B._Ai[key] if B is not None else None
+        result[key] = _shift_invert_eigs(Ai, Bi, k, sigma, return_eigenvectors, tol, maxiter)
+    return result
+
+def _get_block_matrix(mats):
+    if isinstance(mats, TPMatrix):
+        mats = [mats]
+    if not isinstance(mats, BlockMatrix):
+        mats = BlockMatrix(mats)
+    mats.assemble()
+    return mats
+
+def _get_scipy_matrix(mats):
+    if isinstance(mats, SparseMatrix):
+        return mats.diags('csc')
+    A = mats[0].diags('csc')
+    for m in mats[1:]:
+        A = A + m.diags('csc')
+    return A
+
+def _shift_invert_eigs(A, B, k, sigma, return_eigenvectors, tol, maxiter):
+    n = A.shape[0]
+    if k >= n-1:
+        # ARPACK requires k < n-1. Use dense solver for small matrices
+        w, v = scipy.linalg.eig(A.toarray(), None if B is None else B.toarray())
+        idx = np.argsort(abs(w-sigma))[:k]
+        return (w[idx], v[:, idx]) if return_eigenvectors else w[idx]
+    B = identity(n, format='csc') if B is None else B.tocsc()
+    C = (A - sigma*B).tocsc()
+    lu = splu(C, permc_spec=config['matrix']['sparse']['permc_spec'])
+    dtype = np.result_type(C.dtype, B.dtype)
+    OP = LinearOperator((n, n), matvec=lambda x: lu.solve(np.asarray(B @ x, dtype=dtype)),
+                        dtype=dtype)
+    mu = arpack_eigs(OP, k=k, which='LM', tol=tol, maxiter=maxiter,
+                     return_eigenvectors=return_eigenvectors)
+    if return_eigenvectors:
+        mu, v = mu
+    idx = np.argsort(abs(mu))[::-1]
+    w = sigma + 1/mu[idx]
+    return (w, v[:, idx]) if return_eigenvectors else w
@@ -47,7 +47,7 @@ from shenfun.config import config
 from shenfun.spectralbase import Transform, getCompositeBase, getBCGeneric, \
     BoundaryConditions, islicedict, slicedict
 from shenfun.matrixbase import SparseMatrix
-from shenfun.utilities import n
+from shenfun.utilities import n, work
 from shenfun.jacobi import JacobiBase
 from .lobatto import legendre_lobatto_nodes_and_weights
 from . import fastgl
@@ -281,18 +281,26 @@ class Orthogonal(JacobiBase):
         flags = (fftw.flag_dict[opts['planner_effort']],
                  fftw.flag_dict[opts['overwrite_input']])
         threads = opts['threads']
-        U = fftw.aligned(shape, dtype=float)
-        xfftn_fwd = DLT(U, axes=(axis,), kind='scalar product', threads=threads, flags=flags)
+        # Arrays internal to the transforms are shared through the work pool
+        padded = self.padding_factor != 1
+        wrapped = np.dtype(dtype) is np.dtype('complex')
+        if wrapped:
+            U = work.aligned(shape, float, 0)
+        else:
+            U = fftw.aligned(shape, dtype=float)
+        V = work.aligned(shape, float, 1) if wrapped or padded else None
+        xfftn_fwd = DLT(U, axes=(axis,), kind='scalar product', threads=threads, flags=flags,
+                        output_array=V)
         V = xfftn_fwd.output_array
         xfftn_bck = DLT(V, axes=(axis,), kind='backward', threads=threads, flags=flags, output_array=U)
         V.fill(0)
         U.fill(0)
         self._leg2cheb = xfftn_fwd.leg2chebclass
 
-        if np.dtype(dtype) is np.dtype('complex'):
+        if wrapped:
             # dct only works on real data, so need to wrap it
             U = fftw.aligned(shape, dtype=complex)
-            V = fftw.aligned(shape, dtype=complex)
+            V = work.aligned(shape, complex, 1) if padded else fftw.aligned(shape, dtype=complex)
             U.fill(0)
             V.fill(0)
             xfftn_fwd = DCTWrap(xfftn_fwd, U, V)
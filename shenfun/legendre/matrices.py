@@ -63,7 +63,7 @@ import numpy as np
 import sympy as sp
 from shenfun.matrixbase import SpectralMatrix, SpectralMatDict
 from shenfun.spectralbase import get_norm_sq
-from shenfun.optimization import cython
+from shenfun.optimization import get_kernel_module
 from shenfun.la import TDMA, PDMA
 from . import bases
 
@@ -455,7 +455,7 @@ class CLLmat(SpectralMatrix):
     """
     def __init__(self, test, trial, scale=1, measure=1, assemble=None, kind=None, fixed_resolution=None):
         SpectralMatrix.__init__(self, test, trial, scale=scale, measure=measure, assemble=assemble, kind=kind, fixed_resolution=fixed_resolution)
-        self._matvec_methods += ['cython', 'self']
+        self._matvec_methods += ['cython', 'numba', 'self']
 
     def assemble(self, method):
         test, trial = self.testfunction, self.trialfunction
@@ -483,8 +483,8 @@ class CLLmat(SpectralMatrix):
                 v = np.moveaxis(v, 0, axis)
             self.scale_array(c, self.scale*self._keyscale)
 
-        elif format == 'cython':
-            cython.Matvec.CLL_matvec(v, c, axis)
+        elif format in ('cython', 'numba'):
+            get_kernel_module('Matvec', format).CLL_matvec(v, c, axis)
             self.scale_array(c, self.scale*self._keyscale)
         else:
             format = None if format in self._matvec_methods else format
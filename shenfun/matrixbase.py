@@ -14,12 +14,14 @@ from scipy.sparse import bmat, spmatrix, dia_matrix, csr_matrix, kron, \
 from scipy.integrate import quad
 from mpi4py import MPI
 from shenfun.config import config
-from .utilities import integrate_sympy
+from shenfun.optimization import runtimeoptimizer
+from .utilities import integrate_sympy, work
 
 __all__ = ['SparseMatrix', 'SpectralMatrix', 'extract_diagonal_matrix',
            'extract_bc_matrices', 'check_sanity', 'assemble_sympy',
            'TPMatrix', 'BlockMatrix', 'BlockMatrices', 'Identity',
-           'get_simplified_tpmatrices', 'ScipyMatrix', 'SpectralMatDict']
+           'get_simplified_tpmatrices', 'ScipyMatrix', 'SpectralMatDict',
+           'FusedMatvec']
 
 comm = MPI.COMM_WORLD
 
@@ -1672,6 +1674,202 @@ def get_simplified_tpmatrices(tpmats):
             B.append(a)
     return B
 
+class FusedMatvec:
+    r"""Fused matrix vector product for a sum of matrices
+
+    Computes
+
+    .. math::
+
+        c \mathrel{+}= \sum_{k} A_k u_k
+
+    where :math:`A_k` are instances of :class:`.TPMatrix` (or
+    :class:`.SparseMatrix` in 1D), and :math:`u_k` is either :math:`u` or,
+    for a :class:`.CompositeSpace`, one of its components.
+
+    Terms acting on the same component, along the same non-diagonal axis
+    and with matrices of the same shape are grouped. The scale arrays of each group are stacked once, and the
+    whole group is then applied in one sweep over the operand, with one
+    single accumulation into the output. This replaces one full matvec, one
+    temporary array and one addition per term.
+
+    Parameters
+    ----------
+    mats : sequence of :class:`.TPMatrix` or :class:`.SparseMatrix`
+
+    Note
+    ----
+    Terms with two or more non-diagonal axes are computed with their
+    regular matvec method. So are terms with matrices that implement their
+    own matvec, or that have more than :attr:`maxdiags` diagonals, since the
+    fused kernel is only efficient for banded matrices. The fused kernel
+    is used for arrays of at most three dimensions, and only along axes
+    that hold all the columns of the matrix locally, i.e., that are not
+    distributed.
+    """
+    #: Maximum number of diagonals of matrices in the fused kernel
+    maxdiags = 8
+
+    def __init__(self, mats):
+        self.mats = mats
+        self._groups = None
+        self._key = None
+
+    def _fuse(self, pmat, v, axis, col0):
+        """Return whether `pmat` should be applied along `axis` of operand
+        `v`, starting at column `col0`, by the fused kernel"""
+        return (v.ndim <= 3 and len(pmat) <= self.maxdiags and
+                type(pmat).matvec in (SparseMatrix.matvec, SpectralMatrix.matvec) and
+                v.shape[axis] >= col0+pmat.shape[1])
+
+    def _index(self, mat, u, c):
+        """Return index of output and operand for matrix `mat`"""
+        if not (hasattr(u, 'function_space') and u.function_space().is_composite_space):
+            return None, None
+        if c.ndim == mat.dimensions:
+            return None, mat.global_index[1]
+        return mat.global_index[0], mat.global_index[1]
+
+    def assemble(self, u, c):
+        """Group matrices and assemble stacked data and scale arrays
+
+        Parameters
+        ----------
+        u : array
+            The operand
+        c : array
+            The output array
+        """
+        key = (u.shape, c.shape, c.dtype.char)
+        if self._key == key:
+            return self._groups
+        groups = {}
+        for mat in self.mats:
+            oi, ui = self._index(mat, u, c)
+            if isinstance(mat, TPMatrix):
+                mat = mat.get_simplified()
+                if len(mat.naxes) == 0:
+                    groups.setdefault((oi, ui, None, 0, None), []).append(mat)
+                    continue
+                if len(mat.naxes) > 1:
+                    groups.setdefault((oi, ui, 'other', 0, None), []).append(mat)
+                    continue
+                axis = mat.naxes[0]
+                pmat = mat.pmat
+            else:
+                axis = 0
+                pmat = mat
+            col0 = 0
+            if isinstance(pmat, SpectralMatrix):
+                col0 = pmat.trialfunction[0].slice().start
+            if not self._fuse(pmat, u if ui is None else u.v[ui], axis, col0):
+                groups.setdefault((oi, ui, 'other', 0, None), []).append(mat)
+                continue
+            groups.setdefault((oi, ui, axis, col0, pmat.shape), []).append(mat)
+
+        self._groups = []
+        for (oi, ui, axis, col0, _), mats in groups.items():
+            ci = c if oi is None else c.v[oi]
+            if axis == 'other':
+                self._groups.append((oi, ui, axis, mats))
+                continue
+            if axis is None:
+                sc = np.zeros(ci.shape, dtype=c.dtype)
+                for mat in mats:
+                    sc += mat.scale
+                self._groups.append((oi, ui, axis, sc))
+                continue
+            pmats = [mat.pmat if isinstance(mat, TPMatrix) else mat for mat in mats]
+            D = [pmat.diags('dia').todia() for pmat in pmats]
+            if np.any([np.iscomplexobj(d.data) for d in D]):
+                self._groups.append((oi, ui, 'other', mats))
+                continue
+            offsets = np.unique(np.hstack([d.offsets for d in D]))
+            N, M = pmats[0].shape
+            data = np.zeros((len(D), len(offsets), M))
+            for k, d in enumerate(D):
+                for o, dd in zip(d.offsets, d.data):
+                    m = min(M, dd.shape[0])
+                    data[k, np.searchsorted(offsets, o), :m] = dd[:m]
+            shape = list(ci.shape)
+            shape[axis] = 1
+            scales = np.zeros((len(mats),)+tuple(shape), dtype=c.dtype)
+            for k, mat in enumerate(mats):
+                scales[k] = mat.scale if isinstance(mat, TPMatrix) else 1
+            rows = [slice(None)]*ci.ndim
+            rows[axis] = slice(0, min(N, ci.shape[axis]))
+            cols = [slice(None)]*ci.ndim
+            cols[axis] = slice(col0, col0+M)
+            self._groups.append((oi, ui, axis, (offsets, data, scales,
+                                                tuple(rows), tuple(cols))))
+        self._key = key
+        return self._groups
+
+    def __call__(self, u, c):
+        """Add the sum of all matrix vector products to c
+
+        Parameters
+        ----------
+        u : :class:`.Function`
+            The operand
+        c : array
+            The output array. The result is added to c, so c must be
+            initialized on entry.
+
+        Returns
+        -------
+        c : array
+        """
+        groups = self.assemble(u, c)
+        for oi, ui, axis, data in groups:
+            ci = c if oi is None else c.v[oi]
+            ui = u if ui is None else u.v[ui]
+            if axis is None:
+                ci += data*ui
+            elif axis == 'other':
+                w0 = work[(ci, 0, False)]
+                for mat in data:
+                    w0 = mat.matvec(ui, w0)
+                    ci += w0
+            else:
+                offsets, d, scales, rows, cols = data
+                fused_matvec(ui[cols], ci[rows], offsets, d, scales, axis)
+        return c
+
+@runtimeoptimizer
+def fused_matvec(v, c, offsets, data, scales, axis):
+    """Add sum of scaled banded matrix vector products along axis to c
+
+    Parameters
+    ----------
+    v : array
+        Operand
+    c : array
+        Output array. Results are added to c
+    offsets : array of ints
+        Offsets of all diagonals
+    data : array of shape (K, len(offsets), M)
+        Diagonals of K matrices, stored by column as for scipy's dia_matrix
+    scales : array of shape (K,)+c.shape, with shape 1 along axis
+        Scales of the K matrices
+    axis : int
+        The axis of the matrix vector product
+    """
+    v = np.moveaxis(v, axis, 0)
+    cm = np.moveaxis(c, axis, 0)
+    N = cm.shape[0]
+    M = min(v.shape[0], data.shape[2])
+    s = (slice(None),)+(np.newaxis,)*(v.ndim-1)
+    for k in range(data.shape[0]):
+        sk = np.moveaxis(scales[k], axis, 0)
+        for d, key in enumerate(offsets):
+            i0 = max(0, -key)
+            i1 = min(N, M-key)
+            if i1 <= i0:
+                continue
+            cm[i0:i1] += sk*data[k, d, i0+key:i1+key][s]*v[i0+key:i1+key]
+    return c
+
 
 def check_sanity(A, test, trial, measure=1, assemble='quadrature', kind='vandermonde', fixed_resolution=None):
     """Sanity check for matrix.
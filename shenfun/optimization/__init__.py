@@ -11,35 +11,164 @@ from functools import wraps
 from . import cython
 from shenfun.config import config
 
-try:
-    from . import numba
-except ModuleNotFoundError:
-    numba = None
 
+def get_numba():
+    """Return the numba submodule, or None if numba is not installed
 
-"""
+    The submodule is imported on first call, since loading numba and its
+    cached, jitted functions is slow.
+    """
+    if 'numba' not in globals():
+        try:
+            globals()['numba'] = importlib.import_module('.numba', __name__)
+        except ModuleNotFoundError:
+            globals()['numba'] = None
+    return globals()['numba']
 
-runtimeoptimizer
+def __getattr__(name):
+    if name == 'numba':
+        return get_numba()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-A decorator that chooses optimized function at runtime
 
-At runtime the decorator looks at::
+# Resolved kernels, with key (function, mode). A value of None means that
+# there is no optimized version and the Python function is used.
+_dispatch = {}
 
-    config['optimization']['mode']
-    config['optimization']['verbose']
+# All functions decorated with runtimeoptimizer, for the report
+_registry = []
 
-and returns the optimized function of choice.
+def resolve(func, mode=None):
+    """Return optimized version of func for given mode, or None
+
+    The lookup is performed only once for each function and mode, and the
+    result is stored in a dispatch table.
+
+    Parameters
+    ----------
+    func : The function to optimize
+    mode : str or None, optional
+        'cython', 'numba' or anything else for pure Python. If None, then
+        use ``config['optimization']['mode']``.
+    """
+    if mode is None:
+        mode = config['optimization']['mode']
+    func = getattr(func, '__func__', func)
+    key = (func, mode.lower())
+    try:
+        return _dispatch[key]
+    except KeyError:
+        pass
+    fun = None
+    if key[1] in ('cython', 'numba'):
+        mod = cython if key[1] == 'cython' else get_numba()
+        fun = getattr(mod, func.__name__, None)
+        if fun is None:
+            fun = getattr(mod, func.__qualname__.replace('.', '_'), None)
+    if fun is None and config['optimization']['verbose']:
+        print(func.__qualname__ + ' not optimized')
+    _dispatch[key] = fun
+    return fun
+
+def kernel_mode():
+    """Return 'numba' if chosen in ``config['optimization']['mode']`` and
+    numba is installed, and 'cython' otherwise"""
+    if config['optimization']['mode'].lower() == 'numba' and get_numba() is not None:
+        return 'numba'
+    return 'cython'
+
+def get_kernel_module(name, mode=None):
+    """Return module name of compiled kernels for given mode
+
+    Kernels that are called directly from the Python modules, like the
+    ``Matvec``, ``evaluate`` and ``convolve`` modules, are taken from
+    numba if mode is 'numba' and numba provides the module. Otherwise
+    the Cython module is returned.
+
+    Parameters
+    ----------
+    name : str
+        Name of module, e.g., 'Matvec'
+    mode : str or None, optional
+        'cython' or 'numba'. If None, then use
+        ``config['optimization']['mode']``.
+    """
+    if mode is None:
+        mode = config['optimization']['mode']
+    if mode.lower() == 'numba':
+        mod = getattr(get_numba(), name, None)
+        if mod is not None:
+            return mod
+    return importlib.import_module('.cython.'+name, __name__)
+
+def warmup(space):
+    """Compile, or load from cache, the numba kernels used by space
+
+    Does nothing unless the numba kernels are in use, see
+    :func:`kernel_mode`. The line kernels of the banded solvers and
+    matvecs may also be compiled ahead of time with
+    ``python -m shenfun.optimization.numba.aot``.
+
+    Parameters
+    ----------
+    space : :class:`.TensorProductSpace` or :class:`.CompositeSpace`
+    """
+    if kernel_mode() == 'numba':
+        get_numba().aot.warmup(space)
+
+def report(mode=None, file=None):
+    """Print which functions decorated with :class:`.runtimeoptimizer` are
+    optimized, and by which module
+
+    Parameters
+    ----------
+    mode : str or None, optional
+        'cython', 'numba' or anything else for pure Python. If None, then
+        use ``config['optimization']['mode']``.
+    file : file object, optional
+        Print to this file instead of stdout
+
+    Returns
+    -------
+    list
+        The qualified names of the functions that are not optimized
+    """
+    if mode is None:
+        mode = config['optimization']['mode']
+    lines = ['%-56s %s' % ('Function (mode=%s)' % mode, 'Implementation')]
+    unoptimized = []
+    for func in _registry:
+        fun = resolve(func, mode)
+        name = func.__module__+'.'+func.__qualname__
+        if fun is None:
+            unoptimized.append(name)
+        lines.append('%-56s %s' % (name, 'not optimized' if fun is None else fun.__module__))
+    print('\n'.join(lines), file=file)
+    return unoptimized
 
-"""
 class runtimeoptimizer:
+    """Decorator that chooses optimized function at runtime
 
+    At runtime the decorator looks at::
+
+        config['optimization']['mode']
+
+    and calls the optimized function of choice. The function is resolved
+    through the dispatch table once, and again only if the mode changes.
+    """
     def __init__(self, func):
         self.func = func
         self.__doc__ = func.__doc__
+        self._mode = None
+        self._fun = func
+        _registry.append(func)
 
     def __call__(self, *args, **kwargs):
-        fun = optimizer(self.func)
-        return fun(*args, **kwargs)
+        mode = config['optimization']['mode']
+        if mode != self._mode:
+            self._fun = resolve(self.func, mode) or self.func
+            self._mode = mode
+        return self._fun(*args, **kwargs)
 
 def optimizer(func, wrap=True):
     """Decorator used to wrap calls to optimized versions of functions.
@@ -57,21 +186,7 @@ def optimizer(func, wrap=True):
         If True, return function wrapped using functools wraps.
         If False, return unwrapped function.
     """
-    mod = config['optimization']['mode']
-    verbose = config['optimization']['verbose']
-
-    if mod.lower() not in ('cython', 'numba'):
-        # Use python function
-        if verbose:
-            print(func.__qualname__ + ' not optimized')
-        return func
-    mod = {'cython': cython, 'numba': numba}[mod.lower()]
-    fun = getattr(mod, func.__name__, func)
-    if fun is func:
-        fun = getattr(mod, func.__qualname__.replace('.', '_'), func)
-    if verbose:
-        if fun is func:
-            print(fun.__qualname__ + ' not optimized')
+    fun = resolve(func) or func
     if wrap is False:
         return fun
     @wraps(func)
@@ -920,3 +920,58 @@ cpdef Biharmonic_matvec(np.ndarray v, np.ndarray b, double a0, np.ndarray alfa,
     else:
         ABIterAllButAxis[complex](Biharmonic_matvec_ptr, np.PyArray_Ravel(v, np.NPY_CORDER), np.PyArray_Ravel(b, np.NPY_CORDER), np.PyArray_Ravel(alfa, np.NPY_CORDER), np.PyArray_Ravel(beta, np.NPY_CORDER), st, N, axis, shape, ashape, &c0)
     return b
+
+def fused_matvec(v, c, offsets, data, scales, int axis):
+    """Add sum of scaled banded matrix vector products along axis to c
+
+    c[i] += sum_k scales[k] * sum_d data[k, d, i+offsets[d]] * v[i+offsets[d]]
+
+    where i runs along axis and the scales are broadcasted over the
+    remaining axes (with shape 1 along axis). The diagonals in data are
+    stored by column, like for scipy's dia_matrix.
+    """
+    cdef:
+        long[::1] off = np.ascontiguousarray(offsets, dtype=int)
+        int ndim = v.ndim
+    vm = np.moveaxis(v, axis, 0)
+    cm = np.moveaxis(c, axis, 0)
+    sm = np.moveaxis(scales, axis+1, 1)
+    if ndim == 1:
+        vm, cm, sm = vm[:, None, None], cm[:, None, None], sm[:, :, None, None]
+    elif ndim == 2:
+        vm, cm, sm = vm[:, :, None], cm[:, :, None], sm[:, :, :, None]
+    if c.dtype.char in 'FDG':
+        _fused_matvec_3D[complex](vm.astype(complex, copy=False), cm, off, data,
+                                  sm.astype(complex, copy=False))
+    else:
+        _fused_matvec_3D[double](vm, cm, off, data, sm)
+    return c
+
+cdef void _fused_matvec_3D(T[:, :, :] v, T[:, :, :] c, long[::1] offsets,
+                           double[:, :, ::1] data, T[:, :, :, :] scales):
+    cdef:
+        int i, j, k, kk, d, key, col, jj, ll
+        int N = c.shape[0]
+        int M = min(v.shape[0], data.shape[2])
+        int K = data.shape[0]
+        int nd = data.shape[1]
+        int sj = scales.shape[2]
+        int sk = scales.shape[3]
+        T s
+        double a
+
+    for i in range(N):
+        for j in range(c.shape[1]):
+            jj = j if sj > 1 else 0
+            for k in range(c.shape[2]):
+                ll = k if sk > 1 else 0
+                s = 0
+                for kk in range(K):
+                    for d in range(nd):
+                        col = i + offsets[d]
+                        if col < 0 or col >= M:
+                            continue
+                        a = data[kk, d, col]
+                        if a != 0:
+                            s = s + scales[kk, 0, jj, ll]*a*v[col, j, k]
+                c[i, j, k] = c[i, j, k] + s
@@ -7,8 +7,10 @@ from .la import TDMA_LU, TDMA_Solve, PDMA_LU, PDMA_Solve, \
     ThreeDMA_inner_solve, HeptaDMA_inner_solve, HeptaDMA_Solve, HeptaDMA_LU, \
     SolverGeneric1ND_solve_data
 
-from .Matvec import Helmholtz_matvec, Helmholtz_Neumann_matvec, Biharmonic_matvec
+from .Matvec import Helmholtz_matvec, Helmholtz_Neumann_matvec, Biharmonic_matvec, \
+    fused_matvec
 from .outer import outer2D, outer3D
+from .contract import contract
 from .applymask import apply_mask
 from .Cheb import chebval
 from .transforms import evaluate_expansion_all, scalar_product, leg2cheb, cheb2leg, \
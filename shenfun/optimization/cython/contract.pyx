@@ -0,0 +1,52 @@
+#cython: boundscheck=False
+#cython: wraparound=False
+#cython: language_level=3
+
+import numpy as np
+cimport cython
+cimport numpy as np
+from cython.parallel import prange
+
+ctypedef fused T:
+    np.float64_t
+    np.complex128_t
+
+def contract(T[:, ::1] c, T[:, ::1] a, T[:, ::1] b, double[:, ::1] g,
+             long[:, ::1] terms, double[::1] coef, int num_threads=1):
+    """Fused contraction of two tensors on the quadrature mesh
+
+    For all points m on the (flattened) mesh compute
+
+        c[p, m] = sum_t coef[t]*a[i, m]*b[j, m]*g[k, m]
+
+    where the sum runs over all terms t = (p, i, j, k) in terms, with
+    output component p. If k < 0, then g[k, m] is taken as 1. The terms
+    must be sorted by p. Components without terms are set to zero.
+    """
+    cdef:
+        Py_ssize_t m, t, t0, t1, p, q
+        Py_ssize_t M = c.shape[1]
+        Py_ssize_t nt = terms.shape[0]
+        T s
+    t0 = 0
+    q = 0
+    while t0 < nt:
+        p = terms[t0, 0]
+        for q in range(q, p):
+            c[q, :] = 0
+        q = p+1
+        t1 = t0
+        while t1 < nt and terms[t1, 0] == p:
+            t1 += 1
+        for m in prange(M, nogil=True, num_threads=num_threads, schedule='static'):
+            s = 0
+            for t in range(t0, t1):
+                if terms[t, 3] < 0:
+                    s = s + coef[t]*a[terms[t, 1], m]*b[terms[t, 2], m]
+                else:
+                    s = s + coef[t]*a[terms[t, 1], m]*b[terms[t, 2], m]*g[terms[t, 3], m]
+            c[p, m] = s
+        t0 = t1
+    for q in range(q, c.shape[0]):
+        c[q, :] = 0
+    return np.asarray(c)
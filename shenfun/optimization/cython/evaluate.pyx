@@ -5,6 +5,7 @@
 import numpy as np
 cimport numpy as np
 import cython
+from cython.parallel import prange
 
 ctypedef np.complex128_t complex_t
 ctypedef np.float64_t real_t
@@ -21,510 +22,119 @@ cdef extern from "math.h" nogil:
     double sin(double)
     double cos(double)
 
-def evaluate_2D(b, u, list P, int r2c, int M, int start):
-    if P[0].dtype == complex and P[1].dtype == complex:
-        # 2 Fourier spaces
-        if r2c < 0: # No R2C
-            b = _evaluate_2D_cc0(b, u, P[0], P[1], r2c, M, start)
-        else:
-            b = _evaluate_2D_cc1(b, u, P[0], P[1], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == complex:
-        # One non-fourier in axis=0
-        if r2c < 0: # No R2C
-            b = _evaluate_2D_rc0(b, u, P[0], P[1], r2c, M, start)
-        else:
-            b = _evaluate_2D_rc1(b, u, P[0], P[1], r2c, M, start)
-
-    elif P[0].dtype == complex and P[1].dtype == float:
-        # One non-fourier in axis=1
-        if r2c < 0: # No R2C
-            b = _evaluate_2D_cr0(b, u, P[0], P[1], r2c, M, start)
-        else:
-            b = _evaluate_2D_cr1(b, u, P[0], P[1], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == float:
-        # Two non-fourier bases
-        b = _evaluate_2D_rr0(b, u, P[0], P[1])
-
-    return b
-
-def _evaluate_2D_cc0(np.ndarray[complex_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[complex_t, ndim=2] P0,
-                     np.ndarray[complex_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i, kk, ll
-    cdef complex_t p
-
-    assert r2c < 0
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                b[i] = b[i] + u[k, l] * P0[i, k] * P1[i, l]
-    return b
-
-def _evaluate_2D_cc1(np.ndarray[real_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[complex_t, ndim=2] P0,
-                     np.ndarray[complex_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i, ii
-    cdef real_t p
-    assert r2c == 0 or r2c == 1
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                p = (u[k, l] * P0[i, k] * P1[i, l]).real
-                b[i] += p
-                if r2c == 0:
-                    ii = k + start
-                else:
-                    ii = l + start
-                if ii > 0 & ii < M:
-                    b[i] += p
-
-    return b
-
-def _evaluate_2D_rc0(np.ndarray[complex_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[real_t, ndim=2] P0,
-                     np.ndarray[complex_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i
-
-    assert r2c < 0
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                b[i] = b[i] + u[k, l] * P0[i, k] * P1[i, l]
-    return b
-
-
-def _evaluate_2D_rc1(np.ndarray[real_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[real_t, ndim=2] P0,
-                     np.ndarray[complex_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i, ii
-    cdef real_t p
-    assert r2c == 0 or r2c == 1
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                p = (u[k, l] * P0[i, k] * P1[i, l]).real
-                b[i] += p
-                if r2c == 0:
-                    ii = k + start
-                else:
-                    ii = l + start
-                if ii > 0 & ii < M:
-                    b[i] += p
-    return b
-
-def _evaluate_2D_cr0(np.ndarray[complex_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[complex_t, ndim=2] P0,
-                     np.ndarray[real_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                b[i] += u[k, l] * P0[i, k] * P1[i, l]
-
-    return b
-
-def _evaluate_2D_cr1(np.ndarray[real_t, ndim=1] b,
-                     np.ndarray[complex_t, ndim=2] u,
-                     np.ndarray[complex_t, ndim=2] P0,
-                     np.ndarray[real_t, ndim=2] P1,
-                     int r2c, int M, int start):
-    cdef int k, l, i, ii
-    cdef real_t p
-    assert r2c == 0 or r2c == 1
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                p = (u[k, l] * P0[i, k] * P1[i, l]).real
-                b[i] += p
-                if r2c == 0:
-                    ii = k + start
-                else:
-                    ii = l + start
-                if ii > 0 & ii < M:
-                    b[i] += p
-
-    return b
-
-def _evaluate_2D_rr0(np.ndarray[real_t, ndim=1] b,
-                     np.ndarray[real_t, ndim=2] u,
-                     np.ndarray[real_t, ndim=2] P0,
-                     np.ndarray[real_t, ndim=2] P1):
-    cdef int k, l, i
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for i in range(b.shape[0]):
-                b[i] = b[i] + u[k, l] * P0[i, k] * P1[i, l]
-    return b
-
-def evaluate_3D(b, u, list P, int r2c, int M, int start):
-
-    if P[0].dtype == complex and P[1].dtype == complex and P[2].dtype == complex:
-        # Only Fourier bases
-        if r2c < 0: # No R2C
-            b = _evaluate_3D_ccc0(b, u, P[0], P[1], P[2], r2c, M, start)
-        else:
-            b = _evaluate_3D_ccc1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == complex and P[2].dtype == complex:
-        # One non-fourier in axis=0
-        if r2c < 0: # No R2C
-            b = _evaluate_3D_rcc0(b, u, P[0], P[1], P[2], r2c, M, start)
-        else:
-            b = _evaluate_3D_rcc1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == complex and P[1].dtype == float and P[2].dtype == complex:
-        # One non-fourier in axis=1
-        if r2c < 0: # No R2C
-            b = _evaluate_3D_crc0(b, u, P[0], P[1], P[2], r2c, M, start)
-        else:
-            b = _evaluate_3D_crc1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == complex and P[1].dtype == complex and P[2].dtype == float:
-        # One non-fourier in axis=2
-        if r2c < 0: # No R2C
-            b = _evaluate_3D_ccr0(b, u, P[0], P[1], P[2], r2c, M, start)
-        else:
-            b = _evaluate_3D_ccr1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == float and P[2].dtype == complex:
-        b = _evaluate_3D_rrc1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == complex and P[2].dtype == float:
-        b = _evaluate_3D_rcr1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == complex and P[1].dtype == float and P[2].dtype == float:
-        b = _evaluate_3D_crr1(b, u, P[0], P[1], P[2], r2c, M, start)
-
-    elif P[0].dtype == float and P[1].dtype == float and P[2].dtype == float:
-        b = _evaluate_3D_rrr(b, u, P[0], P[1], P[2])
-
-    return b
-
-def _evaluate_3D_ccc0(np.ndarray[complex_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i
-    cdef np.ndarray[complex_t, ndim=3] c = np.zeros((b.shape[0], u.shape[0], u.shape[1]), dtype=complex)
-    cdef np.ndarray[complex_t, ndim=2] c2 = np.zeros((b.shape[0], u.shape[0]), dtype=complex)
-
-    #for k in range(u.shape[0]):
-    #    for l in range(u.shape[1]):
-    #        for m in range(u.shape[2]):
-    #            for i in range(b.shape[0]):
-    #                b[i] = b[i] + u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]
-    #return b
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            for l in range(u.shape[1]):
-                for m in range(u.shape[2]):
-                    c[i, k, l] += u[k, l, m] * P2[i, m]
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            for l in range(u.shape[1]):
-                c2[i, k] += c[i, k, l] * P1[i, l]
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            b[i] += c2[i, k] * P0[i, k]
-    return b
-
-def _evaluate_3D_ccc1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef complex_t p1, p2
-    cdef real_t p, ur, ui
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            if r2c == 0:
-                ii = k + start
-            for l in range(u.shape[1]):
-                p1 = P0[i, k] * P1[i, l]
-                if r2c == 1:
-                    ii = l + start
-                for m in range(u.shape[2]):
-                    #p = (u[k, l, m] * p1 * P2[i, m]).real
-                    p2 = p1 * P2[i, m]
-                    ur = u[k, l, m].real
-                    ui = u[k, l, m].imag
-                    p = ur*p2.real - ui*p2.imag
-                    b[i] += p
-                    if r2c == 2:
-                        ii = m + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-
-    return b
-
-def _evaluate_3D_rcc0(np.ndarray[complex_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[real_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i
-    cdef np.ndarray[complex_t, ndim=3] c = np.zeros((b.shape[0], u.shape[0], u.shape[1]), dtype=complex)
-    cdef np.ndarray[complex_t, ndim=2] c2 = np.zeros((b.shape[0], u.shape[0]), dtype=complex)
-
-
-    assert r2c < 0
-
-    #for k in range(u.shape[0]):
-    #    for l in range(u.shape[1]):
-    #        for m in range(u.shape[2]):
-    #            for i in range(b.shape[0]):
-    #                b[i] += P0[i, k] * (u[k, l, m] * P1[i, l] * P2[i, m])
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            for l in range(u.shape[1]):
-                for m in range(u.shape[2]):
-                    c[i, k, l] += u[k, l, m] * P2[i, m]
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            for l in range(u.shape[1]):
-                c2[i, k] += c[i, k, l] * P1[i, l]
-
-    for i in range(b.shape[0]):
-        for k in range(u.shape[0]):
-            b[i] += c2[i, k] * P0[i, k]
-
-    return b
-
-def _evaluate_3D_rcc1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[real_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 1 or r2c == 2
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    #p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    p0 = P1[i, l] * P2[i, m]
-                    p = P0[i, k]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    if r2c == 1:
-                        ii = l + start
-                    else:
-                        ii = m + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_crc0(np.ndarray[complex_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[real_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i
-
-    assert r2c < 0
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    b[i] = b[i] + u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]
-
-    return b
-
-def _evaluate_3D_crc1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[real_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 0 or r2c == 2
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    #p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    p0 = P0[i, k] * P2[i, m]
-                    p = P1[i, l]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    if r2c == 0:
-                        ii = k + start
-                    else:
-                        ii = m + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_ccr0(np.ndarray[complex_t, ndim=1] b, np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[real_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i
-
-    assert r2c < 0
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    b[i] = b[i] + u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]
-    return b
-
-def _evaluate_3D_ccr1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[real_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 0 or r2c == 1
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    #p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    p0 = P0[i, k] * P1[i, l]
-                    p = P2[i, m]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    if r2c == 0:
-                        ii = k + start
-                    else:
-                        ii = l + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_rrc1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[real_t, ndim=2] P0,
-                      np.ndarray[real_t, ndim=2] P1,
-                      np.ndarray[complex_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 2
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    #p0 = P2[i, m]
-                    #p = P0[i, k]*P1[i, l]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    ii = m + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_rcr1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[real_t, ndim=2] P0,
-                      np.ndarray[complex_t, ndim=2] P1,
-                      np.ndarray[real_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 1
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    #p0 = P2[i, m]
-                    #p = P0[i, k]*P1[i, l]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    ii = l + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_crr1(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[complex_t, ndim=3] u,
-                      np.ndarray[complex_t, ndim=2] P0,
-                      np.ndarray[real_t, ndim=2] P1,
-                      np.ndarray[real_t, ndim=2] P2,
-                      int r2c, int M, int start):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-    cdef complex_t p0
-
-    assert r2c == 0
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    p = (u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]).real
-                    #p0 = P2[i, m]
-                    #p = P0[i, k]*P1[i, l]*(u[k, l, m].real*p0.real - u[k, l, m].imag*p0.imag)
-                    b[i] += p
-                    ii = k + start
-                    if ii > 0 & ii < M:
-                        b[i] += p
-    return b
-
-def _evaluate_3D_rrr(np.ndarray[real_t, ndim=1] b,
-                      np.ndarray[real_t, ndim=3] u,
-                      np.ndarray[real_t, ndim=2] P0,
-                      np.ndarray[real_t, ndim=2] P1,
-                      np.ndarray[real_t, ndim=2] P2):
-    cdef int k, l, m, i, ii
-    cdef real_t p
-
-    for k in range(u.shape[0]):
-        for l in range(u.shape[1]):
-            for m in range(u.shape[2]):
-                for i in range(b.shape[0]):
-                    b[i] += u[k, l, m] * P0[i, k] * P1[i, l] * P2[i, m]
-
-    return b
+def evaluate_2D(b, u, list P, int r2c, int M, int start, int num_threads=1):
+    return evaluate_threaded(b, u, P, r2c, M, start, num_threads)
+
+def evaluate_3D(b, u, list P, int r2c, int M, int start, int num_threads=1):
+    return evaluate_threaded(b, u, P, r2c, M, start, num_threads)
+
+def evaluate_4D(b, u, list P, int r2c, int M, int start, int num_threads=1):
+    return evaluate_threaded(b, u, P, r2c, M, start, num_threads)
+
+def evaluate_threaded(b, u, list P, int r2c, int M, int start, int num_threads=1):
+    """Evaluate expansion with coefficients u at points, using OpenMP threads
+
+    For all points i compute, here for 3 dimensions,
+
+        b[i] += sum_{k,l,m} u[k, l, m]*P[0][i, k]*P[1][i, l]*P[2][i, m]
+
+    The loop over points is parallel, and the coefficients are processed
+    in blocks along the first axis, such that each block is reused from
+    cache by all points.
+
+    Parameters
+    ----------
+    b : array
+        Output array of shape (N,), for N points
+    u : array
+        Expansion coefficients of 2, 3 or 4 dimensions
+    P : list of arrays
+        The basis functions of each axis evaluated at the points
+    r2c : int
+        Axis of a real-to-complex Fourier basis, or -1
+    M : int
+        Wavenumbers in 0 < k < M along axis r2c represent two modes
+    start : int
+        Global index of first wavenumber along axis r2c
+    num_threads : int, optional
+        Number of threads
+    """
+    P = list(P)
+    if r2c >= 0:
+        ii = np.arange(P[r2c].shape[1]) + start
+        P[r2c] = P[r2c]*(1 + ((ii > 0) & (ii < M)))
+    dtype = np.result_type(u, *P)
+    c = np.zeros(b.shape[0], dtype=dtype)
+    u = np.ascontiguousarray(u, dtype=dtype)
+    P = [np.ascontiguousarray(p, dtype=dtype) for p in P]
+    # Rows of u that fit in 256 kB
+    cdef int block = max(1, 2**18 // max(1, u[0].nbytes))
+    if u.ndim == 2:
+        _evaluate_threaded_2D(c, u, P[0], P[1], block, num_threads)
+    elif u.ndim == 3:
+        _evaluate_threaded_3D(c, u, P[0], P[1], P[2], block, num_threads)
+    elif u.ndim == 4:
+        _evaluate_threaded_4D(c, u, P[0], P[1], P[2], P[3], block, num_threads)
+    else:
+        raise NotImplementedError
+    b += c.real if r2c >= 0 else c
+    return b
+
+def _evaluate_threaded_2D(T[::1] c, T[:, ::1] u, T[:, ::1] P0,
+                          T[:, ::1] P1, int block, int num_threads):
+    cdef:
+        Py_ssize_t i, k, l, k0
+        T s, s1
+    for k0 in range(0, u.shape[0], block):
+        for i in prange(c.shape[0], nogil=True, num_threads=num_threads, schedule='static'):
+            s = 0
+            for k in range(k0, min(k0+block, u.shape[0])):
+                s1 = 0
+                for l in range(u.shape[1]):
+                    s1 = s1 + u[k, l]*P1[i, l]
+                s = s + s1*P0[i, k]
+            c[i] = c[i] + s
+
+def _evaluate_threaded_3D(T[::1] c, T[:, :, ::1] u, T[:, ::1] P0,
+                          T[:, ::1] P1, T[:, ::1] P2, int block,
+                          int num_threads):
+    cdef:
+        Py_ssize_t i, k, l, m, k0
+        T s, s1, s2
+    for k0 in range(0, u.shape[0], block):
+        for i in prange(c.shape[0], nogil=True, num_threads=num_threads, schedule='static'):
+            s = 0
+            for k in range(k0, min(k0+block, u.shape[0])):
+                s1 = 0
+                for l in range(u.shape[1]):
+                    s2 = 0
+                    for m in range(u.shape[2]):
+                        s2 = s2 + u[k, l, m]*P2[i, m]
+                    s1 = s1 + s2*P1[i, l]
+                s = s + s1*P0[i, k]
+            c[i] = c[i] + s
+
+def _evaluate_threaded_4D(T[::1] c, T[:, :, :, ::1] u, T[:, ::1] P0,
+                          T[:, ::1] P1, T[:, ::1] P2, T[:, ::1] P3,
+                          int block, int num_threads):
+    cdef:
+        Py_ssize_t i, k, l, m, n, k0
+        T s, s1, s2, s3
+    for k0 in range(0, u.shape[0], block):
+        for i in prange(c.shape[0], nogil=True, num_threads=num_threads, schedule='static'):
+            s = 0
+            for k in range(k0, min(k0+block, u.shape[0])):
+                s1 = 0
+                for l in range(u.shape[1]):
+                    s2 = 0
+                    for m in range(u.shape[2]):
+                        s3 = 0
+                        for n in range(u.shape[3]):
+                            s3 = s3 + u[k, l, m, n]*P3[i, n]
+                        s2 = s2 + s3*P2[i, m]
+                    s1 = s1 + s2*P1[i, l]
+                s = s + s1*P0[i, k]
+            c[i] = c[i] + s
 
 def evaluate_lm_2D(list bases, b, u, x0, x1, w0, w1, int r2c, int M, int start):
 
@@ -0,0 +1,268 @@
+import numpy as np
+import numba as nb
+from .transforms import NDim
+
+__all__ = ['CDN_matvec', 'BDN_matvec', 'CDD_matvec', 'SBB_matvec',
+           'ADD_matvec', 'ATT_matvec', 'GLL_matvec', 'CLL_matvec',
+           'CTSD_matvec', 'CTT_matvec', 'Tridiagonal_matvec',
+           'Pentadiagonal_matvec', 'CBD_matvec', 'CDB_matvec', 'BBD_matvec',
+           'fused_matvec']
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CDN_matvec(v, b, ld, ud):
+    Nd = ud.shape[0]+1
+    b[0] = ud[0]*v[1]
+    b[Nd-1] = ld[Nd-2]*v[Nd-2]
+    for i in range(1, Nd-1):
+        b[i] = ud[i]*v[i+1] + ld[i-1]*v[i-1]
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def BDN_matvec(v, b, ld, dd, ud):
+    M = dd.shape[0]
+    b[0] = ud*v[2] + dd[0]*v[0]
+    b[1] = ud*v[3] + dd[1]*v[1]
+    b[M-2] = ld[M-4]*v[M-4] + dd[M-2]*v[M-2]
+    b[M-1] = ld[M-3]*v[M-3] + dd[M-1]*v[M-1]
+    for i in range(2, M-2):
+        b[i] = ud*v[i+2] + dd[i]*v[i] + ld[i-2]*v[i-2]
+
+CDD_matvec = CDN_matvec
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def SBB_matvec(v, b, dd):
+    M = dd.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    o1 = v[0]*0
+    o2 = v[0]*0
+    j = M-1
+    b[j] = dd[j]*v[j]
+    b[j-1] = dd[j-1]*v[j-1]
+    for k in range(M-3, -1, -1):
+        j = k+2
+        p = k*dd[k]/(k+1)
+        r = 24*(k+1)*(k+2)*np.pi
+        d = v[j]/(j+3.)
+        if k % 2 == 0:
+            s1 += d
+            s2 += (j+2)*(j+2)*d
+            b[k] = dd[k]*v[k] + p*s1 + r*s2
+        else:
+            o1 += d
+            o2 += (j+2)*(j+2)*d
+            b[k] = dd[k]*v[k] + p*o1 + r*o2
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def ADD_matvec(v, b, dd):
+    M = dd.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    k = M-1
+    b[k] = dd[k]*v[k]
+    b[k-1] = dd[k-1]*v[k-1]
+    for k in range(M-3, -1, -1):
+        j = k+2
+        p = -4*(k+1)*np.pi
+        if j % 2 == 0:
+            s1 += v[j]
+            b[k] = dd[k]*v[k] + p*s1
+        else:
+            s2 += v[j]
+            b[k] = dd[k]*v[k] + p*s2
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def ATT_matvec(v, b):
+    N = v.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    s3 = v[0]*0
+    s4 = v[0]*0
+    b[N-1] = 0
+    b[N-2] = 0
+    for k in range(N-3, -1, -1):
+        j = k+2
+        p0 = np.pi/2
+        p1 = np.pi/2*k**2
+        if j % 2 == 0:
+            s1 += j*v[j]
+            s3 += j**3*v[j]
+            b[k] = p0*s3 - p1*s1
+        else:
+            s2 += j*v[j]
+            s4 += j**3*v[j]
+            b[k] = p0*s4 - p1*s2
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def GLL_matvec(v, b):
+    N = v.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    s3 = v[0]*0
+    s4 = v[0]*0
+    b[N-1] = 0
+    b[N-2] = 0
+    for k in range(N-3, -1, -1):
+        j = k+2
+        p0 = 2*(k+0.5)/(2*k+1)
+        p1 = p0*k*(k+1)
+        if j % 2 == 0:
+            s1 += j*(j+1)*v[j]
+            s3 += v[j]
+            b[k] = p0*s1 - p1*s3
+        else:
+            s2 += j*(j+1)*v[j]
+            s4 += v[j]
+            b[k] = p0*s2 - p1*s4
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CLL_matvec(v, b):
+    N = v.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    b[N-1] = 0
+    for k in range(N-2, -1, -1):
+        j = k+1
+        if j % 2 == 0:
+            s1 += v[j]
+            b[k] = 2*s1
+        else:
+            s2 += v[j]
+            b[k] = 2*s2
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CTSD_matvec(v, b):
+    N = v.shape[0]
+    s0 = v[0]*0
+    s1 = v[0]*0
+    b[N-1] = 0
+    b[N-2] = -(N-2+1)*np.pi*v[N-3]
+    b[N-3] = -(N-3+1)*np.pi*v[N-4]
+    for i in range(N-4, -1, -1):
+        if i > 0:
+            b[i] = -(i+1)*np.pi*v[i-1]
+        else:
+            b[i] = 0
+        if i % 2 == 0:
+            s0 += v[i+1]
+            b[i] -= s0*2*np.pi
+        else:
+            s1 += v[i+1]
+            b[i] -= s1*2*np.pi
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CTT_matvec(v, b):
+    N = v.shape[0]
+    s1 = v[0]*0
+    s2 = v[0]*0
+    b[N-1] = 0
+    for k in range(N-2, -1, -1):
+        j = k+1
+        if j % 2 == 0:
+            s1 += (k+1)*v[j]
+            b[k] = np.pi*s1
+        else:
+            s2 += (k+1)*v[j]
+            b[k] = np.pi*s2
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def Tridiagonal_matvec(v, b, ld, dd, ud):
+    M = dd.shape[0]
+    b[0] = dd[0]*v[0] + ud[0]*v[2]
+    b[1] = dd[1]*v[1] + ud[1]*v[3]
+    for i in range(2, M-2):
+        b[i] = ld[i-2]*v[i-2] + dd[i]*v[i] + ud[i]*v[i+2]
+    for i in range(M-2, M):
+        b[i] = ld[i-2]*v[i-2] + dd[i]*v[i]
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def Pentadiagonal_matvec(v, b, ldd, ld, dd, ud, udd):
+    M = dd.shape[0]
+    b[0] = dd[0]*v[0] + ud[0]*v[2] + udd[0]*v[4]
+    b[1] = dd[1]*v[1] + ud[1]*v[3] + udd[1]*v[5]
+    b[2] = ld[0]*v[0] + dd[2]*v[2] + ud[2]*v[4] + udd[2]*v[6]
+    b[3] = ld[1]*v[1] + dd[3]*v[3] + ud[3]*v[5] + udd[3]*v[7]
+    for i in range(4, M-4):
+        b[i] = ldd[i-4]*v[i-4] + ld[i-2]*v[i-2] + dd[i]*v[i] + ud[i]*v[i+2] + udd[i]*v[i+4]
+    for i in range(M-4, M-2):
+        b[i] = ldd[i-4]*v[i-4] + ld[i-2]*v[i-2] + dd[i]*v[i] + ud[i]*v[i+2]
+    for i in range(M-2, M):
+        b[i] = ldd[i-4]*v[i-4] + ld[i-2]*v[i-2] + dd[i]*v[i]
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CBD_matvec(v, b, ld, ud, udd):
+    M = udd.shape[0]
+    b[0] = ud[0]*v[1] + udd[0]*v[3]
+    for i in range(1, M):
+        b[i] = ld[i-1]*v[i-1] + ud[i]*v[i+1] + udd[i]*v[i+3]
+    b[M] = ld[M-1]*v[M-1] + ud[M]*v[M+1]
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def CDB_matvec(v, b, lld, ld, ud):
+    M = ud.shape[0]
+    b[0] = ud[0]*v[1]
+    for k in range(1, 3):
+        b[k] = ld[k-1]*v[k-1] + ud[k]*v[k+1]
+    for k in range(3, M):
+        b[k] = lld[k-3]*v[k-3] + ld[k-1]*v[k-1] + ud[k]*v[k+1]
+    for k in range(M, M+2):
+        b[k] = lld[k-3]*v[k-3] + ld[k-1]*v[k-1]
+    b[M+2] = lld[M-1]*v[M-1]
+
+@NDim
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def BBD_matvec(v, b, ld, dd, ud, uud):
+    M = uud.shape[0]
+    b[0] = dd[0]*v[0] + ud[0]*v[2] + uud[0]*v[4]
+    b[1] = dd[1]*v[1] + ud[1]*v[3] + uud[1]*v[5]
+    for k in range(2, M):
+        b[k] = ld*v[k-2] + dd[k]*v[k] + ud[k]*v[k+2] + uud[k]*v[k+4]
+    for k in range(M, M+2):
+        b[k] = ld*v[k-2] + dd[k]*v[k] + ud[k]*v[k+2]
+
+def fused_matvec(v, c, offsets, data, scales, axis):
+    vm = np.moveaxis(v, axis, 0)
+    cm = np.moveaxis(c, axis, 0)
+    sm = np.moveaxis(scales, axis+1, 1)
+    if v.ndim == 1:
+        vm, cm, sm = vm[:, None, None], cm[:, None, None], sm[:, :, None, None]
+    elif v.ndim == 2:
+        vm, cm, sm = vm[:, :, None], cm[:, :, None], sm[:, :, :, None]
+    _fused_matvec_3D(vm.astype(c.dtype, copy=False), cm,
+                     np.ascontiguousarray(offsets, dtype=int), data,
+                     sm.astype(c.dtype, copy=False))
+    return c
+
+@nb.jit(nopython=True, fastmath=True, cache=True, parallel=True)
+def _fused_matvec_3D(v, c, offsets, data, scales):
+    N = c.shape[0]
+    M = min(v.shape[0], data.shape[2])
+    sj = scales.shape[2]
+    sk = scales.shape[3]
+    for i in nb.prange(N):
+        for j in range(c.shape[1]):
+            jj = j if sj > 1 else 0
+            for k in range(c.shape[2]):
+                ll = k if sk > 1 else 0
+                s = c[i, j, k]*0
+                for kk in range(data.shape[0]):
+                    for d in range(data.shape[1]):
+                        col = i + offsets[d]
+                        if col < 0 or col >= M:
+                            continue
+                        a = data[kk, d, col]
+                        if a != 0:
+                            s += scales[kk, 0, jj, ll]*a*v[col, j, k]
+                c[i, j, k] += s
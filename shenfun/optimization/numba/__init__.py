@@ -1,5 +1,6 @@
 import numpy as np
 import numba as nb
+from shenfun.config import config
 from .diagma import *
 from .threedma import *
 from .twodma import *
@@ -12,6 +13,13 @@ from .helmholtz import *
 from .biharmonic import *
 from .chebyshev import *
 from .transforms import *
+from .Matvec import fused_matvec
+from .contract import contract
+from . import evaluate, convolve, aot
+
+# Thread count for the parallel (prange) kernels
+nb.set_num_threads(max(1, min(config['optimization']['num_threads'],
+                              nb.config.NUMBA_NUM_THREADS)))
 
 @nb.jit(nopython=True, fastmath=True, cache=True)
 def crossND(c, a, b):
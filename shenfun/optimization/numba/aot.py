@@ -0,0 +1,266 @@
+"""
+Ahead-of-time compiled numba kernels and warm-up
+
+The multidimensional numba kernels take the line kernel that is applied
+along an axis as a first-class function argument. Such kernels cannot be
+stored in numba's on-disk cache, and are thus compiled by every process
+on first use. This module compiles serial drivers for all the common
+line kernels, dtypes and dimensions into an extension module ``_aot``
+with numba.pycc::
+
+    python -m shenfun.optimization.numba.aot
+
+When the extension exists, and numba runs on one thread (see
+``config['optimization']['num_threads']``), the drivers are used
+instead of the just-in-time compiled parallel kernels.
+
+Kernels that are not covered, like the transforms of a given space, may
+be compiled (or loaded from cache) up front with :func:`warmup`. The
+remaining kernels, like the Helmholtz and biharmonic solvers and the
+FMM/leg2cheb transforms, are compiled with ``cache=True`` and stored in
+numba's on-disk cache on first use.
+"""
+import os
+import importlib
+from functools import wraps
+import numpy as np
+import numba as nb
+from numba.core.dispatcher import Dispatcher
+
+__all__ = ['build', 'lookup', 'warmup']
+
+# Dimensions and dtypes compiled by build
+ndims = (2, 3, 4)
+dtypes = {'d': 'f8', 'D': 'c16'}
+
+# Names of the banded solvers with a line kernel <name>_inner_solve
+solvers = ('TDMA', 'TDMA_O', 'PDMA', 'FDMA', 'TwoDMA', 'ThreeDMA', 'DiagMA',
+           'HeptaDMA')
+
+# Line kernels of two arrays (input, output) and their additional arguments
+lines = {
+    'Matvec': {
+        'CDN_matvec': ('f8[:]', 'f8[:]'),
+        'BDN_matvec': ('f8[:]', 'f8[:]', 'f8'),
+        'SBB_matvec': ('f8[:]',),
+        'ADD_matvec': ('f8[:]',),
+        'ATT_matvec': (),
+        'GLL_matvec': (),
+        'CLL_matvec': (),
+        'CTSD_matvec': (),
+        'CTT_matvec': (),
+        'Tridiagonal_matvec': ('f8[:]',)*3,
+        'Pentadiagonal_matvec': ('f8[:]',)*5,
+        'CBD_matvec': ('f8[:]',)*3,
+        'CDB_matvec': ('f8[:]',)*3,
+        'BBD_matvec': ('f8', 'f8[:]', 'f8[:]', 'f8[:]'),
+    },
+    'transforms': {
+        '_scalar_product': ('f8[:]', 'f8[:]', 'f8[:, :]'),
+        '_evaluate_expansion_all': ('f8[:]', 'f8[:, :]'),
+    }
+}
+
+def export_name(name, ndim, dtype):
+    """Return name of compiled driver in the extension module
+
+    Parameters
+    ----------
+    name : str
+        Name of line kernel
+    ndim : int
+        Number of dimensions of the arrays
+    dtype : str
+        Type character, 'd' or 'D'
+    """
+    return '%s_%dd_%s' % (name.lstrip('_'), ndim, dtypes[dtype])
+
+def _driver(fun, narrays, ndim, nargs):
+    # Serial loop over all but the last axis of the arrays, calling fun for
+    # each line. pycc needs explicit arguments, so the source is generated.
+    arrays = ['u', 'v'][:narrays]
+    args = ['a%d' % i for i in range(nargs)]
+    idx = ', '.join('i%d' % i for i in range(ndim-1))
+    src = ['def driver(%s):' % ', '.join(arrays+args)]
+    for i in range(ndim-1):
+        src.append('    '*(i+1) + 'for i%d in range(u.shape[%d]):' % (i, i))
+    src.append('    '*ndim + 'fun(%s)' % ', '.join(['%s[%s]' % (a, idx) for a in arrays]+args))
+    namespace = {'fun': fun}
+    exec('\n'.join(src), namespace)
+    return namespace['driver']
+
+def _kernels():
+    """Yield name, line kernel, number of arrays and additional arguments"""
+    for name in solvers:
+        mod = importlib.import_module('.'+name.split('_')[0].lower(), __package__)
+        fun = getattr(mod, name+'_inner_solve')
+        yield name+'_inner_solve', fun, 1, ('f8[:, :]',)
+    for modname, funs in lines.items():
+        mod = importlib.import_module('.'+modname, __package__)
+        for name, args in funs.items():
+            fun = getattr(mod, name)
+            while not isinstance(fun, Dispatcher):
+                fun = fun.__wrapped__
+            yield name, fun, 2, args
+
+def build(output_dir=None, verbose=False):
+    """Compile serial drivers for all line kernels into extension ``_aot``
+
+    Parameters
+    ----------
+    output_dir : str, optional
+        Where to place the extension. Default is the directory of this
+        module, where it will be found by :func:`lookup`.
+    verbose : bool, optional
+        Print the progress of pycc
+
+    Returns
+    -------
+    str
+        The path of the extension module
+    """
+    from numba.pycc import CC
+    cc = CC('_aot')
+    cc.output_dir = os.path.dirname(__file__) if output_dir is None else output_dir
+    cc.verbose = verbose
+    for name, fun, narrays, args in _kernels():
+        for ndim in ndims:
+            for dtype, dt in dtypes.items():
+                array = '%s[%s]' % (dt, ', '.join([':']*ndim))
+                sig = 'void(%s)' % ', '.join([array]*narrays + list(args))
+                cc.export(export_name(name, ndim, dtype), sig)(_driver(fun, narrays, ndim, len(args)))
+    cc.compile()
+    return os.path.join(cc.output_dir, cc.output_file)
+
+_lib = []
+_found = {}
+
+def lookup(fun, array):
+    """Return compiled driver applying line kernel fun along the last axis
+    of array, or None
+
+    Parameters
+    ----------
+    fun : Line kernel
+    array : Array of dtype float or complex
+
+    Note
+    ----
+    The serial drivers are only used when numba runs on one thread.
+    """
+    if nb.get_num_threads() > 1:
+        return None
+    key = (fun.__name__, array.ndim, array.dtype.char)
+    try:
+        return _found[key]
+    except KeyError:
+        pass
+    if not _lib:
+        try:
+            _lib.append(importlib.import_module('._aot', __package__))
+        except ImportError:
+            _lib.append(None)
+    driver = None
+    if _lib[0] is not None and key[1] in ndims and key[2] in dtypes:
+        driver = getattr(_lib[0], export_name(*key), None)
+    _found[key] = driver
+    return driver
+
+def solver(solve_axis):
+    """Decorator for the kernels applying a line solver along an axis"""
+    @wraps(solve_axis)
+    def wrapped(data, x, innerfun, axis):
+        driver = lookup(innerfun, x)
+        if driver is not None:
+            try:
+                driver(np.moveaxis(x, axis, -1), data)
+                return
+            except TypeError:
+                pass
+        solve_axis(data, x, innerfun, axis)
+    return wrapped
+
+def linewise(fun_nd):
+    """Decorator for the kernels applying a line kernel along an axis of
+    an input and an output array"""
+    @wraps(fun_nd)
+    def wrapped(fun, input_array, output_array, axis, *args):
+        driver = lookup(fun, input_array)
+        if driver is not None and input_array.dtype == output_array.dtype:
+            try:
+                driver(np.moveaxis(input_array, axis, -1),
+                       np.moveaxis(output_array, axis, -1), *args)
+                return
+            except TypeError:
+                pass
+        fun_nd(fun, input_array, output_array, axis, *args)
+    return wrapped
+
+def _exercise(space):
+    from shenfun.fourier.bases import R2C
+    from shenfun.optimization import get_kernel_module
+    for xfftn in space.xfftn:
+        xfftn.backward.input_array[...] = 0
+        xfftn.backward()
+        xfftn.forward.input_array[...] = 0
+        xfftn.forward()
+    if space.dimensions not in (2, 3):
+        return
+    P = []
+    r2c, M, start = -1, -1, -1
+    for base in space.bases:
+        # Two points, such that the layout of P matches that used by eval
+        D = base.evaluate_basis_all(x=np.zeros(2), argument=1)
+        P.append(D[..., space.local_slice()[base.axis]])
+        if isinstance(base, R2C):
+            r2c = base.axis
+            M = base.N//2 if base.N % 2 == 0 else base.N//2+1
+            start = space.local_slice()[base.axis].start
+    evaluate = get_kernel_module('evaluate', 'numba')
+    f = getattr(evaluate, 'evaluate_%dD' % space.dimensions)
+    b = np.zeros(2, dtype=space.forward.input_array.dtype)
+    u = np.zeros(space.forward.output_array.shape, dtype=space.forward.output_array.dtype)
+    f(b, u, P, r2c, M, start)
+
+def _exercise_matrices(space):
+    # Matvec and solve of the mass matrix, and matvec of the stiffness
+    # matrix, along all non-periodic axes that are not distributed
+    from shenfun.forms import TestFunction, TrialFunction, inner, div, grad
+    u = np.zeros(space.forward.output_array.shape, dtype=space.forward.output_array.dtype)
+    w = np.zeros_like(u)
+    for base in space.bases:
+        if base.family() == 'fourier' or u.shape[base.axis] != base.N:
+            continue
+        H = base.get_homogeneous()
+        v, t = TestFunction(H), TrialFunction(H)
+        B = inner(v, t)
+        B.matvec(u, w, axis=base.axis)
+        B.solve(w, axis=base.axis)
+        inner(v, div(grad(t))).matvec(u, w, axis=base.axis)
+
+def warmup(space):
+    """Compile, or load from cache, the numba kernels used by space
+
+    The serial transforms along all axes of space, the kernel used by
+    ``space.eval``, and the matvecs and solvers of the mass and stiffness
+    matrices along the non-periodic axes are run once on the local
+    arrays. Rank 0 of the
+    communicator of space goes first, such that the remaining ranks only
+    read numba's on-disk cache.
+
+    Parameters
+    ----------
+    space : :class:`.TensorProductSpace` or :class:`.CompositeSpace`
+    """
+    spaces = space.flatten() if hasattr(space, 'flatten') else [space]
+    comm = spaces[0].comm
+    if comm.Get_rank() > 0:
+        comm.Barrier()
+    for T in spaces:
+        _exercise(T)
+        _exercise_matrices(T)
+    if comm.Get_rank() == 0:
+        comm.Barrier()
+
+if __name__ == '__main__':
+    print(build(verbose=True))
@@ -0,0 +1,41 @@
+import numba as nb
+
+__all__ = ['contract']
+
+def contract(c, a, b, g, terms, coef, num_threads=1):
+    """Fused contraction of two tensors on the quadrature mesh
+
+    For all points m on the (flattened) mesh compute
+
+        c[p, m] = sum_t coef[t]*a[i, m]*b[j, m]*g[k, m]
+
+    where the sum runs over all terms t = (p, i, j, k) in terms, with
+    output component p. If k < 0, then g[k, m] is taken as 1. The terms
+    must be sorted by p.
+    """
+    n0 = nb.get_num_threads()
+    nb.set_num_threads(max(1, min(num_threads, nb.config.NUMBA_NUM_THREADS)))
+    try:
+        _contract(c, a, b, g, terms, coef)
+    finally:
+        nb.set_num_threads(n0)
+    return c
+
+@nb.jit(nopython=True, fastmath=True, cache=True, parallel=True)
+def _contract(c, a, b, g, terms, coef):
+    nt = terms.shape[0]
+    t0 = 0
+    while t0 < nt:
+        p = terms[t0, 0]
+        t1 = t0
+        while t1 < nt and terms[t1, 0] == p:
+            t1 += 1
+        for m in nb.prange(c.shape[1]):
+            s = c[p, m]*0
+            for t in range(t0, t1):
+                if terms[t, 3] < 0:
+                    s += coef[t]*a[terms[t, 1], m]*b[terms[t, 2], m]
+                else:
+                    s += coef[t]*a[terms[t, 1], m]*b[terms[t, 2], m]*g[terms[t, 3], m]
+            c[p, m] = s
+        t0 = t1
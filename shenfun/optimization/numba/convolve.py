@@ -0,0 +1,38 @@
+import numba as nb
+
+__all__ = ['convolve_1D', 'convolve_real_1D']
+
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def convolve_1D(u, v, uv, k):
+    N = u.shape[0]
+    for m in k:
+        for n in k:
+            p = m + n
+            um = u[m]
+            vn = v[n]
+            if N % 2 == 0:
+                if abs(m) == N//2:
+                    um = um*0.5
+                if abs(n) == N//2:
+                    vn = vn*0.5
+            uv[p] = uv[p] + um*vn
+
+@nb.jit(nopython=True, fastmath=True, cache=True)
+def convolve_real_1D(u, v, uv, k):
+    N = uv.shape[0]-1
+    for m in k:
+        for n in k:
+            p = m + n
+            if p < 0:
+                continue
+            um = u[abs(m)]
+            vn = v[abs(n)]
+            if N % 2 == 0 and abs(m) == N//2:
+                um = um*0.5
+            elif m < 0:
+                um = um.conjugate()
+            if N % 2 == 0 and abs(n) == N//2:
+                vn = vn*0.5
+            elif n < 0:
+                vn = vn.conjugate()
+            uv[p] = uv[p] + um*vn
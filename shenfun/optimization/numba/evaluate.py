@@ -0,0 +1,79 @@
+import numpy as np
+import numba as nb
+
+__all__ = ['evaluate_2D', 'evaluate_3D', 'evaluate_4D']
+
+def _r2c_weights(P, r2c, M, start):
+    # Hermitian symmetry: all but the zero and Nyquist wavenumbers of the
+    # R2C axis represent two modes
+    P = list(P)
+    if r2c >= 0:
+        ii = np.arange(P[r2c].shape[1]) + start
+        P[r2c] = P[r2c]*(1 + ((ii > 0) & (ii < M)))
+    return P
+
+def _evaluate(kernel, b, u, P, r2c, M, start, num_threads):
+    P = _r2c_weights(P, r2c, M, start)
+    c = np.zeros(b.shape, dtype=np.result_type(u, *P))
+    if num_threads is None:
+        kernel(c, u, *P)
+    else:
+        n0 = nb.get_num_threads()
+        nb.set_num_threads(max(1, min(num_threads, nb.config.NUMBA_NUM_THREADS)))
+        try:
+            kernel(c, u, *P)
+        finally:
+            nb.set_num_threads(n0)
+    b += c.real if r2c >= 0 else c
+    return b
+
+def evaluate_2D(b, u, P, r2c, M, start, num_threads=None):
+    return _evaluate(_evaluate_2D, b, u, P, r2c, M, start, num_threads)
+
+def evaluate_3D(b, u, P, r2c, M, start, num_threads=None):
+    return _evaluate(_evaluate_3D, b, u, P, r2c, M, start, num_threads)
+
+def evaluate_4D(b, u, P, r2c, M, start, num_threads=None):
+    return _evaluate(_evaluate_4D, b, u, P, r2c, M, start, num_threads)
+
+@nb.jit(nopython=True, fastmath=True, cache=True, parallel=True)
+def _evaluate_2D(c, u, P0, P1):
+    for i in nb.prange(c.shape[0]):
+        s = c[i]
+        for k in range(u.shape[0]):
+            s1 = c[i]*0
+            for l in range(u.shape[1]):
+                s1 += u[k, l]*P1[i, l]
+            s += s1*P0[i, k]
+        c[i] = s
+
+@nb.jit(nopython=True, fastmath=True, cache=True, parallel=True)
+def _evaluate_3D(c, u, P0, P1, P2):
+    for i in nb.prange(c.shape[0]):
+        s = c[i]
+        for k in range(u.shape[0]):
+            s1 = c[i]*0
+            for l in range(u.shape[1]):
+                s2 = c[i]*0
+                for m in range(u.shape[2]):
+                    s2 += u[k, l, m]*P2[i, m]
+                s1 += s2*P1[i, l]
+            s += s1*P0[i, k]
+        c[i] = s
+
+@nb.jit(nopython=True, fastmath=True, cache=True, parallel=True)
+def _evaluate_4D(c, u, P0, P1, P2, P3):
+    for i in nb.prange(c.shape[0]):
+        s = c[i]
+        for k in range(u.shape[0]):
+            s1 = c[i]*0
+            for l in range(u.shape[1]):
+                s2 = c[i]*0
+                for m in range(u.shape[2]):
+                    s3 = c[i]*0
+                    for n in range(u.shape[3]):
+                        s3 += u[k, l, m, n]*P3[i, n]
+                    s2 += s3*P2[i, m]
+                s1 += s2*P1[i, l]
+            s += s1*P0[i, k]
+        c[i] = s
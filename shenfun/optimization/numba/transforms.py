@@ -3,11 +3,12 @@ from functools import wraps
 import numba as nb
 import numpy as np
 from scipy.special import gammaln
+from . import aot
 
 warnings.simplefilter('ignore', category=nb.core.errors.NumbaPerformanceWarning)
 
 __all__ = ['scalar_product', 'evaluate_expansion_all', 'cheb2leg', 'leg2cheb',
-           'restricted_product', '_leg2cheb', 'FMMdirect1', 'FMMdirect2',
+           'restricted_product', '_leg2cheb', '_cheb2leg', 'FMMdirect1', 'FMMdirect2',
            'FMMdirect3', 'FMMdirect4']
 
 def NDim(func):
@@ -22,6 +23,12 @@ def NDim(func):
             fun_3D(func, input_array, output_array, axis, *args)
         elif n == 4:
             fun_4D(func, input_array, output_array, axis, *args)
+        else:
+            ui = np.moveaxis(input_array, axis, -1)
+            uo = np.moveaxis(output_array, axis, -1)
+            for i in np.ndindex(ui.shape[:-1]):
+                func(ui[i], uo[i], *args)
+        return output_array
     return wrapped_function
 
 @nb.jit(nopython=True, fastmath=True, cache=False)
@@ -43,49 +50,52 @@ def _matvec(A, x, b, m, n, transpose):
                 b[j] = b[j] + s*a[j]
     return b
 
-@nb.jit(nopython=True, fastmath=True, cache=False)
+@aot.linewise
+@nb.jit(nopython=True, fastmath=True, cache=False, parallel=True)
 def fun_2D(fun, input_array, output_array, axis, *args):
     if axis == 0:
-        for j in range(input_array.shape[1]):
+        for j in nb.prange(input_array.shape[1]):
             fun(input_array[:, j], output_array[:, j], *args)
     elif axis == 1:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             fun(input_array[i], output_array[i], *args)
 
-@nb.jit(nopython=True, fastmath=True, cache=False)
+@aot.linewise
+@nb.jit(nopython=True, fastmath=True, cache=False, parallel=True)
 def fun_3D(fun, input_array, output_array, axis, *args):
     if axis == 0:
-        for j in range(input_array.shape[1]):
+        for j in nb.prange(input_array.shape[1]):
             for k in range(input_array.shape[2]):
                 fun(input_array[:, j, k], output_array[:, j, k], *args)
     elif axis == 1:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             for k in range(input_array.shape[2]):
                 fun(input_array[i, :, k], output_array[i, :, k], *args)
     elif axis == 2:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             for j in range(input_array.shape[1]):
                 fun(input_array[i, j], output_array[i, j], *args)
 
-@nb.jit(nopython=True, fastmath=True, cache=False)
+@aot.linewise
+@nb.jit(nopython=True, fastmath=True, cache=False, parallel=True)
 def fun_4D(fun, input_array, output_array, axis, *args):
     if axis == 0:
-        for j in range(input_array.shape[1]):
+        for j in nb.prange(input_array.shape[1]):
             for k in range(input_array.shape[2]):
                 for l in range(input_array.shape[3]):
                     fun(input_array[:, j, k, l], output_array[:, j, k, l], *args)
     elif axis == 1:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             for k in range(input_array.shape[2]):
                 for l in range(input_array.shape[3]):
                     fun(input_array[i, :, k, l], output_array[i, :, k, l], *args)
     elif axis == 2:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             for j in range(input_array.shape[1]):
                 for l in range(input_array.shape[3]):
                     fun(input_array[i, j, :, l], output_array[i, j, :, l], *args)
     elif axis == 3:
-        for i in range(input_array.shape[0]):
+        for i in nb.prange(input_array.shape[0]):
             for j in range(input_array.shape[1]):
                 for k in range(input_array.shape[2]):
                     fun(input_array[i, j, k, :], output_array[i, j, k, :], *args)
@@ -233,8 +243,9 @@ def _restricted_product(input_array, output_array, xj, Lnm0, Ln0, i0, i1, a0, a)
 Omega = lambda z: np.exp(gammaln(z+0.5) - gammaln(z+1))
 
 @nb.jit(nopython=True, fastmath=True, cache=False)
-def _leg2cheb(c, v, a, N, transpose):
+def _leg2cheb(c, v, a, transpose):
     M_2_PI = 2/np.pi
+    N = c.shape[0]
     if transpose is False:
         for n in range(0, N, 2):
             #v[:(N-n)] += a[n//2]*a[n//2:(N-n//2)]*c[n:]
@@ -262,25 +273,26 @@ def leg2cheb(input_array, output_array=None, axis=0, transpose=False):
     k = np.arange(N)
     a = Omega(k)
     if n == 1:
-        _leg2cheb(input_array, output_array, a, N, transpose)
+        _leg2cheb(input_array, output_array, a, transpose)
     elif n == 2:
-        fun_2D(_leg2cheb, input_array, output_array, axis, a, N, transpose)
+        fun_2D(_leg2cheb, input_array, output_array, axis, a, transpose)
     elif n == 3:
-        fun_3D(_leg2cheb, input_array, output_array, axis, a, N, transpose)
+        fun_3D(_leg2cheb, input_array, output_array, axis, a, transpose)
     elif n == 4:
-        fun_4D(_leg2cheb, input_array, output_array, axis, a, N, transpose)
+        fun_4D(_leg2cheb, input_array, output_array, axis, a, transpose)
     else:
         if axis > 0:
             input_array = np.moveaxis(input_array, axis, 0)
             output_array = np.moveaxis(output_array, axis, 0)
-        _leg2cheb(input_array, output_array, a, N, transpose)
+        _leg2cheb(input_array, output_array, a, transpose)
         if axis > 0:
             input_array = np.moveaxis(input_array, 0, axis)
             output_array = np.moveaxis(output_array, 0, axis)
     return output_array
 
 @nb.jit(nopython=True, fastmath=True, cache=False)
-def _cheb2leg(v, c, a, dn, N):
+def _cheb2leg(v, c, dn, a):
+    N = v.shape[0]
     vn = v.copy()
     for i in range(1, N):
         vn[i] = v[i]*i
@@ -303,18 +315,18 @@ def cheb2leg(input_array, output_array=None, axis=0):
     a = 1/(2*Omega(k)*k*(k+0.5))
     a[0] = 2/np.sqrt(np.pi)
     if n == 1:
-        _cheb2leg(input_array, output_array, a, dn, N)
+        _cheb2leg(input_array, output_array, dn, a)
     elif n == 2:
-        fun_2D(_cheb2leg, input_array, output_array, axis, a, dn, N)
+        fun_2D(_cheb2leg, input_array, output_array, axis, dn, a)
     elif n == 3:
-        fun_3D(_cheb2leg, input_array, output_array, axis, a, dn, N)
+        fun_3D(_cheb2leg, input_array, output_array, axis, dn, a)
     elif n == 4:
-        fun_4D(_cheb2leg, input_array, output_array, axis, a, dn, N)
+        fun_4D(_cheb2leg, input_array, output_array, axis, dn, a)
     else:
         if axis > 0:
             input_array = np.moveaxis(input_array, axis, 0)
             output_array = np.moveaxis(output_array, axis, 0)
-        _cheb2leg(input_array, output_array, a, dn, N)
+        _cheb2leg(input_array, output_array, dn, a)
         if axis > 0:
             input_array = np.moveaxis(input_array, 0, axis)
             output_array = np.moveaxis(output_array, 0, axis)
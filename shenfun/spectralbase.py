@@ -24,9 +24,8 @@ import numpy as np
 from mpi4py_fft import fftw
 from shenfun import config
 from shenfun.utilities import get_stencil_matrix, n
-from .utilities import CachedArrayDict, split
+from .utilities import split, work
 from .coordinates import Coordinates
-work = CachedArrayDict()
 xp = sp.Symbol('x', real=True)
 
 class SpectralBase:
@@ -279,6 +278,12 @@ class SpectralBase:
         If input_array/output_array are not given, then use predefined arrays
         as planned with self.plan
 
+        A backward transform to a uniform mesh, or the mesh of another
+        space, uses a Vandermonde matrix for all but the Fourier spaces.
+        With ``config['transforms']['resample']['method']`` set to
+        'interpolate', the bases on [-1, 1] use the faster, but approximate,
+        :meth:`.resample` instead.
+
         """
         kind = kind if kind is not None else config['transforms']['kind'][self.family()]
         if input_array is not None:
@@ -287,25 +292,116 @@ class SpectralBase:
         self._padding_backward(self.backward.input_array,
                                self.backward.tmp_array)
 
+        x = mesh
         if isinstance(mesh, str):
             assert mesh in ('quadrature', 'uniform')
-            if not self.family() == 'fourier' and mesh == 'uniform':
-                kind = 'vandermonde' if kind == 'fast' else kind
-            mesh = self.mesh(bcast=False, map_true_domain=False, kind=mesh)
+            x = self.mesh(bcast=False, map_true_domain=False, kind=mesh)
 
         elif isinstance(mesh, SpectralBase):
-            if not self.family() == 'fourier':
-                kind = 'vandermonde' if kind == 'fast' else kind
-            mesh = mesh.mesh(bcast=False, map_true_domain=False)
+            x = mesh.mesh(bcast=False, map_true_domain=False)
+
+        if mesh is None or isinstance(mesh, str) and mesh == 'quadrature' or self.family() == 'fourier':
+            self._evaluate_expansion_all(self.backward.tmp_array,
+                                         self.backward.output_array,
+                                         x=x, kind=kind)
+
+        elif (config['transforms']['resample']['method'] == 'interpolate'
+              and self.padding_factor == 1
+              and tuple(self.reference_domain()) == (-1, 1)):
+            self.resample(self.backward.input_array, x,
+                          self.backward.output_array, kind=kind)
 
-        self._evaluate_expansion_all(self.backward.tmp_array,
-                                     self.backward.output_array,
-                                     x=mesh, kind=kind)
+        else:
+            kind = 'vandermonde' if kind == 'fast' else kind
+            self._evaluate_expansion_all(self.backward.tmp_array,
+                                         self.backward.output_array,
+                                         x=x, kind=kind)
         if output_array is not None:
             output_array[...] = self.backward.output_array
             return output_array
         return self.backward.output_array
 
+    def resample(self, input_array, x, output_array=None, kind=None):
+        r"""Evaluate expansion on the points x, using fast transforms and
+        local interpolation
+
+        The expansion is first evaluated on the quadrature mesh of a
+        dealiased space, with ``config['transforms']['resample']['padding_factor']``,
+        using a regular backward transform. The result is then
+        interpolated to x with Lagrange polynomials of order
+        ``config['transforms']['resample']['order']``, in the angle
+        :math:`\theta = \arccos x` of the reference domain, where the
+        quadrature points are close to uniform. The sparse interpolation
+        weights are computed only once for given x.
+
+        Parameters
+        ----------
+        input_array : array
+            Expansion coefficients
+        x : array
+            Points in the reference domain [-1, 1]
+        output_array : array, optional
+            Function values on x, shape as input_array, apart from along
+            self.axis, where it is len(x)
+        kind : str, optional
+            Kind of backward transform on the quadrature mesh of the
+            dealiased space. Not used by the Chebyshev and Legendre
+            families, that use the fast Chebyshev transform. For the
+            remaining families 'recursive' is used if None or 'fast'.
+
+        Note
+        ----
+        Legendre coefficients are first converted to Chebyshev with
+        :func:`.leg2cheb`, which is much faster than the fast Legendre
+        transform for moderate N.
+
+        The result is exact only to within the accuracy of the
+        interpolation, which is typically 1e-9 or better for well
+        resolved functions and default settings.
+        """
+        opts = config['transforms']['resample']
+        shape = list(input_array.shape)
+        shape[self.axis] = len(x)
+        if output_array is None:
+            output_array = np.zeros(shape, dtype=input_array.dtype)
+        if self.family() in ('chebyshev', 'legendre'):
+            kind = 'fast'
+        elif kind in (None, 'fast'):
+            kind = 'recursive'
+        if self.family() == 'legendre':
+            from shenfun.legendre.dlt import leg2cheb
+            c = input_array if self.is_orthogonal else self.to_ortho(input_array)
+            input_array = leg2cheb(c, np.zeros_like(c), axis=self.axis)
+        space, W = self._get_resampling(input_array.shape, input_array.dtype, x,
+                                        opts['padding_factor'], opts['order'])
+        U = space.backward(input_array, kind=kind)
+        U = np.moveaxis(U, self.axis, 0)
+        V = W.dot(U.reshape((U.shape[0], -1)))
+        output_array[...] = np.moveaxis(V.reshape((len(x),)+U.shape[1:]), 0, self.axis)
+        return output_array
+
+    def _get_resampling(self, shape, dtype, x, padding_factor, order):
+        # Planned dealiased space and sparse interpolation matrix, stored
+        # for given input shape and points
+        if not hasattr(self, '_resampling'):
+            self._resampling = {}
+        key = (tuple(shape), np.dtype(dtype).char, self.axis, padding_factor, order)
+        if key not in self._resampling:
+            if self.family() == 'legendre':
+                from shenfun.chebyshev.bases import Orthogonal
+                space = Orthogonal(shape[self.axis], padding_factor=padding_factor)
+            else:
+                space = self.get_dealiased(padding_factor)
+            padded_shape = list(shape)
+            padded_shape[self.axis] = space.shape(False)
+            space.plan(tuple(padded_shape), self.axis, dtype, {})
+            self._resampling[key] = (space, {})
+        space, weights = self._resampling[key]
+        xkey = np.asarray(x).tobytes()
+        if xkey not in weights:
+            weights[xkey] = _lagrange_matrix(space.mesh(False, False), x, order)
+        return space, weights[xkey]
+
     def vandermonde(self, x):
         r"""Return Vandermonde matrix based on the primary (orthogonal) basis
         of the family.
@@ -623,12 +719,14 @@ class SpectralBase:
                 # Already planned
                 return
 
+        padded = self.padding_factor > 1.+1e-8
         U = fftw.aligned(shape, dtype=dtype)
-        V = fftw.aligned(shape, dtype=dtype)
+        # The padded V is internal to the transforms and shared through the work pool
+        V = work.aligned(shape, dtype, 1) if padded else fftw.aligned(shape, dtype=dtype)
         U.fill(0)
         V.fill(0)
         self.axis = axis
-        if self.padding_factor > 1.+1e-8:
+        if padded:
             trunc_array = self._get_truncarray(shape, V.dtype)
             self.scalar_product = Transform(self.scalar_product, None, U, V, trunc_array)
             self.forward = Transform(self.forward, None, U, V, trunc_array)
@@ -646,6 +744,30 @@ class SpectralBase:
         shape[self.axis] = int(np.round(shape[self.axis] / self.padding_factor))
         return fftw.aligned(shape, dtype=dtype)
 
+    def planned_arrays(self, arrays=None):
+        """Return the work arrays allocated when planning transforms
+
+        Parameters
+        ----------
+        arrays : dict, optional
+            Add arrays to this dictionary, keyed by memory address, such
+            that arrays shared between several spaces are only counted once
+
+        Returns
+        -------
+        dict
+        """
+        arrays = {} if arrays is None else arrays
+        for trans in (self.forward, self.backward, self.scalar_product):
+            if isinstance(trans, Transform):
+                for a in (trans.input_array, trans.tmp_array, trans.output_array):
+                    arrays[a.__array_interface__['data'][0]] = a
+        return arrays
+
+    def nbytes(self):
+        """Return number of bytes held by the arrays planned for transforms"""
+        return sum(a.nbytes for a in self.planned_arrays().values())
+
     def get_normalization(self):
         return self._M
 
@@ -1384,6 +1506,35 @@ class SpectralBase:
             padded_array[sp] = trunc_array[sl]
 
 
+def _lagrange_matrix(xj, x, order):
+    """Return sparse matrix interpolating from points xj to points x
+
+    Lagrange interpolation of given order is performed in the angle
+    theta = arccos(x), using the even and 2 pi periodic extension of
+    functions of cos(theta) beyond the end points.
+    """
+    import scipy.sparse as scp
+    order = min(order, len(xj))
+    theta = np.arccos(np.clip(xj, -1, 1))
+    perm = np.argsort(theta)
+    theta = theta[perm]
+    M = len(theta)
+    ext = np.hstack((-theta[::-1], theta, 2*np.pi-theta[::-1]))
+    cols = np.hstack((perm[::-1], perm, perm[::-1]))
+    t = np.arccos(np.clip(np.atleast_1d(x), -1, 1))
+    lo = np.searchsorted(ext, t) - order//2
+    lo = np.clip(lo, 0, 3*M-order)
+    ix = lo[:, None] + np.arange(order)[None, :]
+    tj = ext[ix]
+    d = tj[:, :, None] - tj[:, None, :]
+    d[:, np.arange(order), np.arange(order)] = 1
+    num = np.repeat((t[:, None] - tj)[:, None, :], order, axis=1)
+    num[:, np.arange(order), np.arange(order)] = 1
+    w = np.prod(num/d, axis=2)
+    rows = np.repeat(np.arange(len(t)), order)
+    return scp.csr_matrix((w.ravel(), (rows, cols[ix].ravel())), shape=(len(t), M))
+
+
 def getCompositeBase(Orthogonal):
     """Dynamic class factory for Composite base class
 
@@ -11,16 +11,19 @@ from mpi4py_fft.pencil import Subcomm, Pencil
 from mpi4py import MPI
 from shenfun import config
 from shenfun.fourier.bases import R2C, C2C
-from shenfun.utilities import apply_mask
+from shenfun.utilities import apply_mask, work
+from shenfun.utilities.timers import timers
 from shenfun.forms.arguments import Function, Array
+from shenfun.optimization import get_kernel_module
 from shenfun.optimization.cython import evaluate
 from shenfun.spectralbase import slicedict, islicedict, SpectralBase
 from shenfun.coordinates import Coordinates
 
 comm = MPI.COMM_WORLD
 
+
 __all__ = ('TensorProductSpace', 'VectorSpace', 'TensorSpace',
-           'CompositeSpace', 'Convolve')
+           'CompositeSpace', 'EnsembleSpace', 'Convolve')
 
 @staticmethod
 def _get_kind(xfftn, kind):
@@ -79,20 +82,23 @@ class BackwardTransform(Transform):
 
         """
 
-        if input_array is not None:
-            self.input_array[...] = input_array
-
-        for i in range(len(self._transfer)):
-            self._xfftn[i](kind=self._get_kind(self._xfftn[i], kind), mesh=self._get_mesh(self._xfftn[i], mesh), **kw)
-            arrayA = self._xfftn[i].output_array
-            arrayB = self._xfftn[i+1].input_array
-            self._transfer[i](arrayA, arrayB)
-        self._xfftn[-1](kind=self._get_kind(self._xfftn[-1], kind), mesh=self._get_mesh(self._xfftn[-1], mesh), **kw)
+        with timers('backward'):
+            if input_array is not None:
+                self.input_array[...] = input_array
 
-        if output_array is not None:
-            output_array[...] = self.output_array
-            return output_array
-        else:
+            for i in range(len(self._transfer)):
+                with timers('transform'):
+                    self._xfftn[i](kind=self._get_kind(self._xfftn[i], kind), mesh=self._get_mesh(self._xfftn[i], mesh), **kw)
+                arrayA = self._xfftn[i].output_array
+                arrayB = self._xfftn[i+1].input_array
+                with timers('transfer'):
+                    self._transfer[i](arrayA, arrayB)
+            with timers('transform'):
+                self._xfftn[-1](kind=self._get_kind(self._xfftn[-1], kind), mesh=self._get_mesh(self._xfftn[-1], mesh), **kw)
+
+            if output_array is not None:
+                output_array[...] = self.output_array
+                return output_array
             return self.output_array
 
 class ScalarTransform(Transform):
@@ -170,24 +176,31 @@ class ScalarTransform(Transform):
         as planned with serial transform object ``_xfftn``.
 
         """
-        if input_array is not None:
-            self.input_array[...] = input_array
+        with timers('scalar_product'):
+            if input_array is not None:
+                self.input_array[...] = input_array
 
-        if not self._T.coors.is_cartesian:
-            self.get_measured_input_array()
+            if not self._T.coors.is_cartesian:
+                self.get_measured_input_array()
+
+            self._transform(kind, **kw)
+
+            if output_array is not None:
+                output_array[...] = self.output_array
+                return output_array
+            return self.output_array
 
+    def _transform(self, kind=None, **kw):
+        """Apply all serial transforms and global redistributions"""
         for i in range(len(self._transfer)):
-            self._xfftn[i](kind=self._get_kind(self._xfftn[i], kind), **kw)
+            with timers('transform'):
+                self._xfftn[i](kind=self._get_kind(self._xfftn[i], kind), **kw)
             arrayA = self._xfftn[i].output_array
             arrayB = self._xfftn[i+1].input_array
-            self._transfer[i](arrayA, arrayB)
-        self._xfftn[-1](kind=self._get_kind(self._xfftn[-1], kind), **kw)
-
-        if output_array is not None:
-            output_array[...] = self.output_array
-            return output_array
-        else:
-            return self.output_array
+            with timers('transfer'):
+                self._transfer[i](arrayA, arrayB)
+        with timers('transform'):
+            self._xfftn[-1](kind=self._get_kind(self._xfftn[-1], kind), **kw)
 
 
 class ForwardTransform(ScalarTransform):
@@ -229,33 +242,28 @@ class ForwardTransform(ScalarTransform):
         as planned with serial transform object ``_xfftn``.
 
         """
-        if input_array is not None:
-            self.input_array[...] = input_array
-
-        if not self._T.coors.is_cartesian:
-            self.get_measured_input_array()
-
-        if len(self._T.get_nonhomogeneous_axes()) > 1:
-            from shenfun import la, TestFunction, TrialFunction, inner
-            assert self._T.dimensions == 2, 'Two inhomogeneous boundary directions only implemented for 2D'
-            u = TrialFunction(self._T)
-            v = TestFunction(self._T)
-            B = inner(u, v, kind=kind)
-            b = inner(v, input_array, kind=kind)
-            sol = la.Solver2D(B)
-            self.output_array[:] = sol(b)
-        else:
-            for i in range(len(self._transfer)):
-                self._xfftn[i](kind=self._get_kind(self._xfftn[i], kind), **kw)
-                arrayA = self._xfftn[i].output_array
-                arrayB = self._xfftn[i+1].input_array
-                self._transfer[i](arrayA, arrayB)
-            self._xfftn[-1](kind=self._get_kind(self._xfftn[-1], kind), **kw)
+        with timers('forward'):
+            if input_array is not None:
+                self.input_array[...] = input_array
+
+            if not self._T.coors.is_cartesian:
+                self.get_measured_input_array()
+
+            if len(self._T.get_nonhomogeneous_axes()) > 1:
+                from shenfun import la, TestFunction, TrialFunction, inner
+                assert self._T.dimensions == 2, 'Two inhomogeneous boundary directions only implemented for 2D'
+                u = TrialFunction(self._T)
+                v = TestFunction(self._T)
+                B = inner(u, v, kind=kind)
+                b = inner(v, input_array, kind=kind)
+                sol = la.Solver2D(B)
+                self.output_array[:] = sol(b)
+            else:
+                self._transform(kind, **kw)
 
-        if output_array is not None:
-            output_array[...] = self.output_array
-            return output_array
-        else:
+            if output_array is not None:
+                output_array[...] = self.output_array
+                return output_array
             return self.output_array
 
 
@@ -557,18 +565,21 @@ class TensorProductSpace(PFFT):
             padding_factor = (padding_factor,)*len(self)
         elif isinstance(padding_factor, (tuple, list, np.ndarray)):
             assert len(padding_factor) == len(self)
-        padded_bases = [base.get_dealiased(padding_factor=padding_factor[axis],
-                                           dealias_direct=dealias_direct)
-                        for axis, base in enumerate(self.bases)]
-        # Need the correct order of the transforms in case reversed somehow
-        axes = []
-        for ax in self.axes:
-            for ai in ax:
-                axes.append(ai)
-        return TensorProductSpace(self.comm, padded_bases, axes=tuple(axes),
-                                  dtype=self.forward.output_array.dtype,
-                                  backward_from_pencil=self.forward.output_pencil,
-                                  coordinates=self.coors.coordinates)
+        key = ('dealiased', tuple(float(p) for p in padding_factor), dealias_direct)
+        def create():
+            padded_bases = [base.get_dealiased(padding_factor=padding_factor[axis],
+                                               dealias_direct=dealias_direct)
+                            for axis, base in enumerate(self.bases)]
+            # Need the correct order of the transforms in case reversed somehow
+            axes = []
+            for ax in self.axes:
+                for ai in ax:
+                    axes.append(ai)
+            return TensorProductSpace(self.comm, padded_bases, axes=tuple(axes),
+                                      dtype=self.forward.output_array.dtype,
+                                      backward_from_pencil=self.forward.output_pencil,
+                                      coordinates=self.coors.coordinates)
+        return self._get_derived_space(key, create)
 
     def get_refined(self, N):
         """Return space (otherwise as self) refined to new shape
@@ -585,11 +596,58 @@ class TensorProductSpace(PFFT):
             N = N*np.array(self.global_shape())
         elif isinstance(N, (tuple, list, np.ndarray)):
             assert len(N) == len(self)
-        refined_bases = [base.get_refined(N[axis])
-                         for axis, base in enumerate(self.bases)]
-        return TensorProductSpace(self.subcomm, refined_bases, axes=self.axes,
-                                  dtype=self.dtype(),
-                                  coordinates=self.coors.coordinates)
+        key = ('refined', tuple(int(n) for n in N))
+        def create():
+            refined_bases = [base.get_refined(N[axis])
+                             for axis, base in enumerate(self.bases)]
+            return TensorProductSpace(self.subcomm, refined_bases, axes=self.axes,
+                                      dtype=self.dtype(),
+                                      coordinates=self.coors.coordinates)
+        return self._get_derived_space(key, create)
+
+    def _get_derived_space(self, key, create):
+        """Return space derived from self, created only once for each key
+
+        Parameters
+        ----------
+        key : tuple
+            Description of the derived space
+        create : callable
+            Function returning a new derived space
+        """
+        cache = self.__dict__.setdefault('_derived_spaces', {})
+        if key not in cache:
+            space = create()
+            space._derived_from = (cache, key)
+            cache[key] = space
+        return cache[key]
+
+    def nbytes(self, derived=True):
+        """Return number of bytes held by the arrays planned for transforms
+
+        Parameters
+        ----------
+        derived : bool, optional
+            Whether or not to include the spaces created and cached by
+            :meth:`get_dealiased` and :meth:`get_refined`.
+        """
+        arrays = {}
+        for base in self.bases:
+            base.planned_arrays(arrays)
+        nbytes = sum(a.nbytes for a in arrays.values())
+        if derived:
+            for space in self.__dict__.get('_derived_spaces', {}).values():
+                nbytes += space.nbytes()
+        return nbytes
+
+    def destroy(self):
+        PFFT.destroy(self)
+        self.__dict__.pop('_derived_spaces', None)
+        derived = self.__dict__.pop('_derived_from', None)
+        if derived is not None:
+            cache, key = derived
+            if cache.get(key) is self:
+                del cache[key]
 
     def get_unplanned(self, tensorproductspace=False, **kwargs):
         """Return unplanned bases otherwise as self. Or return a new
@@ -649,13 +707,15 @@ class TensorProductSpace(PFFT):
         a convolution without aliasing. The padding is specified when creating
         instances of bases for the :class:`.TensorProductSpace`.
 
-        FIXME Efficiency due to allocation
+        The padded arrays are cached work arrays, and the product is computed
+        in-place. Use :class:`.Convolve` for computing several products at once.
         """
-        a = self.backward.output_array.copy()
-        b = self.backward.output_array.copy()
+        a = work[(self.backward.output_array, 0, False)]
+        b = work[(self.backward.output_array, 1, False)]
         a = self.backward(a_hat, a)
         b = self.backward(b_hat, b)
-        ab_hat = self.forward(a*b, ab_hat)
+        a *= b
+        ab_hat = self.forward(a, ab_hat)
         return ab_hat
 
     def eval(self, points, coefficients, output_array=None, method=1):
@@ -672,16 +732,24 @@ class TensorProductSpace(PFFT):
         method : int, optional
             Chooses implementation. The method 0 is a low-memory cython
             version. Using method = 1 (default) leads to a faster cython
-            implementation that, on the downside, uses more memory.
-            The final, method = 2, is a python implementation.
+            implementation that, on the downside, uses more memory. With
+            ``config['optimization']['mode']`` set to 'numba', method 1
+            uses a threaded numba kernel instead. The final, method = 2,
+            is a python implementation. Spaces of 4 dimensions always
+            use method 1.
+
+        Note
+        ----
+        Method 1 is parallelized over the points, using the number of
+        threads set in ``config['optimization']['num_threads']``.
         """
         if output_array is None:
             output_array = np.zeros(points.shape[1], dtype=self.forward.input_array.dtype)
         else:
             output_array[:] = 0
-        if len(self.get_nonperiodic_axes()) > 1:
+        if len(self.get_nonperiodic_axes()) > 1 or self.dimensions == 4:
             method = 1
-        assert self.dimensions < 4, 'eval not implemented (yet) for higher dimensions'
+        assert self.dimensions < 5, 'eval not implemented (yet) for higher dimensions'
         if method == 0:
             return self._eval_lm_cython(points, coefficients, output_array)
         elif method == 1:
@@ -836,11 +904,16 @@ class TensorProductSpace(PFFT):
                 else:
                     last_conj_index = M
                 sl = self.local_slice()[axis].start
+        kernels = get_kernel_module('evaluate')
+        num_threads = config['optimization']['num_threads']
         if len(self) == 2:
-            output_array = evaluate.evaluate_2D(output_array, coefficients, P, r2c, last_conj_index, sl)
+            output_array = kernels.evaluate_2D(output_array, coefficients, P, r2c, last_conj_index, sl, num_threads)
 
         elif len(self) == 3:
-            output_array = evaluate.evaluate_3D(output_array, coefficients, P, r2c, last_conj_index, sl)
+            output_array = kernels.evaluate_3D(output_array, coefficients, P, r2c, last_conj_index, sl, num_threads)
+
+        elif len(self) == 4:
+            output_array = kernels.evaluate_4D(output_array, coefficients, P, r2c, last_conj_index, sl, num_threads)
 
         output_array = np.atleast_1d(output_array)
         output_array = comm.allreduce(output_array)
@@ -1418,14 +1491,17 @@ class CompositeSpace:
         a convolution without aliasing. The padding is specified when creating
         instances of bases for the TensorProductSpace.
 
-        FIXME Efficiency due to allocation
+        The padded arrays are cached work arrays, and the product is computed
+        in-place.
         """
         N = list(self.backward.output_array.shape)
-        a = np.zeros([self.dimensions]+N, dtype=self.backward.output_array.dtype)
-        b = np.zeros([self.dimensions]+N, dtype=self.backward.output_array.dtype)
+        z = np.broadcast_to(self.backward.output_array, [self.dimensions]+N)
+        a = work[(z, 0, False)]
+        b = work[(z, 1, False)]
         a = self.backward(a_hat, a)
         b = self.backward(b_hat, b)
-        ab_hat = self.forward(a*b, ab_hat)
+        a *= b
+        ab_hat = self.forward(a, ab_hat)
         return ab_hat
 
     @property
@@ -1604,6 +1680,18 @@ class CompositeSpace:
     def get_dealiased(self, padding_factor=1.5, dealias_direct=False):
         raise NotImplementedError
 
+    def nbytes(self, derived=True):
+        """Return number of bytes held by the arrays planned for transforms
+
+        Parameters
+        ----------
+        derived : bool, optional
+            Whether or not to include the spaces created and cached by
+            :meth:`get_dealiased` and :meth:`get_refined`.
+        """
+        spaces = {id(space): space for space in self.flatten()}
+        return sum(space.nbytes(derived) for space in spaces.values())
+
     def __getitem__(self, i):
         return self.spaces[i]
 
@@ -1733,6 +1821,93 @@ class TensorSpace(VectorSpace):
             return TensorSpace(self.spaces[0].get_orthogonal())
         return TensorSpace([s.get_orthogonal() for s in self.spaces])
 
+class EnsembleSpace(CompositeSpace):
+    """Ensemble of independent members of the same function space
+
+    Functions and Arrays of an ensemble space have a leading batch axis, with
+    one independent member for each index. All members share the planned
+    transforms and the assembled matrices of the member space, such that one
+    process may advance many members of, e.g., a parameter sweep at once.
+
+    Parameters
+    ----------
+    space : :class:`.SpectralBase` or :class:`.TensorProductSpace`
+        The function space of each member
+    M : int
+        The number of members
+
+    Note
+    ----
+    For 1D spaces, and for tensor product spaces on one process with
+    Cartesian coordinates and homogeneous boundary conditions, the transforms
+    of all members are computed in one call of each serial transform.
+    Otherwise the transforms loop over the members.
+
+    Operations in spectral space, like multiplication with wavenumbers,
+    broadcast over the leading axis. The 1D solvers of :mod:`.la` solve for
+    all members at once with ``sol(b, u, axis=1)``, and the integrators
+    :class:`.RK4`, :class:`.ETD` and :class:`.ETDRK4` accept an ensemble
+    space, using the linear operator of the member space for all members.
+
+    Example
+    -------
+    >>> from shenfun import FunctionSpace, EnsembleSpace, Array
+    >>> F = FunctionSpace(8, 'F', dtype='d')
+    >>> E = EnsembleSpace(F, 4)
+    >>> u = Array(E)
+    >>> u_hat = u.forward()
+    >>> print(u.shape, u_hat.shape)
+    (4, 8) (4, 5)
+    """
+    def __init__(self, space, M):
+        assert isinstance(space, (SpectralBase, TensorProductSpace))
+        assert space.dimensions == 1 or isinstance(space, TensorProductSpace)
+        CompositeSpace.__init__(self, [space]*M)
+        self.member = space
+        bases = self._get_batched_bases()
+        self.forward = EnsembleTransform(self.forward, bases, 'forward')
+        self.backward = EnsembleTransform(self.backward, bases[::-1] if bases else None, 'backward')
+        self.scalar_product = EnsembleTransform(self.scalar_product, bases, 'scalar_product')
+
+    def _get_batched_bases(self):
+        """Return 1D spaces planned for all members, in order of the forward
+        transform, or None if the transforms must loop over the members"""
+        space = self.member
+        M = len(self.spaces)
+        if isinstance(space, SpectralBase):
+            xfftn, axes = [space], [(0,)]
+        elif (space.comm.Get_size() == 1 and space.coors.is_cartesian and
+              len(space.get_nonhomogeneous_axes()) == 0 and
+              min(space.global_shape()) > 0):
+            xfftn = [b for xf in space.forward._xfftn for b in space.bases if b.forward is xf]
+            axes = [getattr(b, '_planned_axes', (b.axis,)) for b in xfftn]
+        else:
+            return None
+        bases = []
+        for base, ax in zip(xfftn, axes):
+            batched = base.get_unplanned()
+            U = base.forward.input_array
+            batched.plan((M,)+U.shape, tuple(a+1 for a in ax), U.dtype, {})
+            bases.append(batched)
+        return bases
+
+    def slice(self):
+        """The slices of dofs for all members"""
+        s = self.member.slice()
+        return (slice(None),) + (s if isinstance(s, tuple) else (s,))
+
+    def get_refined(self, N):
+        return EnsembleSpace(self.member.get_refined(N), len(self.spaces))
+
+    def get_dealiased(self, padding_factor=1.5, dealias_direct=False):
+        if padding_factor == 1 and dealias_direct is False:
+            return self
+        return EnsembleSpace(self.member.get_dealiased(padding_factor, dealias_direct),
+                             len(self.spaces))
+
+    def get_orthogonal(self):
+        return EnsembleSpace(self.member.get_orthogonal(), len(self.spaces))
+
 class VectorTransform:
 
     __slots__ = ('_transforms',)
@@ -1763,8 +1938,44 @@ class VectorTransform:
         return output_array
 
 
+class EnsembleTransform(VectorTransform):
+    """Transform of all members of an :class:`.EnsembleSpace`
+
+    Parameters
+    ----------
+    transforms : :class:`.VectorTransform`
+        Transforms of the members, used for attributes like the planned
+        arrays, and for looping over the members if bases is None
+    bases : list of :class:`.SpectralBase` or None
+        1D spaces planned for all members, in the order they are applied
+    name : str
+        The transform, 'forward', 'backward' or 'scalar_product'
+    """
+    __slots__ = ('_bases', '_name')
+
+    def __init__(self, transforms, bases, name):
+        VectorTransform.__init__(self, [transforms])
+        self._bases = bases
+        self._name = name
+
+    def __call__(self, input_array, output_array, kind=None, **kw):
+        if self._bases is None:
+            return VectorTransform.__call__(self, input_array, output_array, kind=kind, **kw)
+        mesh = kw.pop('mesh', None)
+        if isinstance(mesh, EnsembleSpace):
+            mesh = mesh.member
+        a = input_array
+        for base in self._bases:
+            if mesh is not None:
+                kw['mesh'] = mesh.bases[base.axis-1] if isinstance(mesh, TensorProductSpace) else mesh
+            k = kind.get(base.family(), None) if isinstance(kind, dict) else kind
+            a = getattr(base, self._name)(a, kind=k, **kw)
+        output_array[...] = a
+        return output_array
+
+
 class Convolve:
-    r"""Class for convolving without truncation.
+    r"""Class for convolving with preallocated work arrays.
 
     The convolution of :math:`\hat{a}` and :math:`\hat{b}` is computed by first
     transforming backwards with padding::
@@ -1778,50 +1989,102 @@ class Convolve:
 
     where Tp is a :class:`.TensorProductSpace` for regular padding, and
     T is a TensorProductSpace with no padding, but using the shape
-    of the padded a and b arrays.
+    of the padded a and b arrays. With ``truncate=True`` the product is
+    instead transformed forward with truncation, using Tp.forward.
 
-    For convolve with truncation forward, use just the convolve method
-    of the Tp space instead.
+    All padded arrays are allocated once and reused for all calls, and the
+    product is computed in-place. Several products may be computed at once
+    with :meth:`products`, where the backward transform of each distinct
+    operand is computed only once. This is useful, e.g., for the nonlinear
+    convection term :math:`u \cdot \nabla u`, where each velocity component
+    appears in several products.
 
     Parameters
     ----------
     padding_space : :class:`.TensorProductSpace`
         Space with regular padding backward and truncation forward.
+    truncate : bool, optional
+        Whether or not to truncate the product forward.
+
+    Note
+    ----
+    If no output array is provided, the result is returned in an array
+    owned by this class, which is overwritten by the next call.
     """
 
-    def __init__(self, padding_space):
+    def __init__(self, padding_space, truncate=False):
         self.padding_space = padding_space
-        shape = padding_space.shape()
-        bases = []
-        for i, base in enumerate(padding_space.bases):
-            newbase = base.__class__(shape[i], padding_factor=1.0)
-            bases.append(newbase)
-        axes = []
-        for axis in padding_space.axes:
-            axes.append(axis[0])
-        newspace = TensorProductSpace(padding_space.comm, bases, axes=axes)
-        self.newspace = newspace
+        self.truncate = truncate
+        if truncate:
+            self.newspace = padding_space
+        else:
+            shape = padding_space.global_shape()
+            bases = []
+            for i, base in enumerate(padding_space.bases):
+                newbase = base.__class__(shape[i], padding_factor=1.0)
+                bases.append(newbase)
+            axes = []
+            for axis in padding_space.axes:
+                axes.append(axis[0])
+            self.newspace = TensorProductSpace(padding_space.comm, bases, axes=axes)
+        self._padded = []
+        self._output = []
+        self._ab = Array(padding_space)
+
+    def _work(self, i, padded=True):
+        """Return work array number `i`, padded or output"""
+        arrays = self._padded if padded else self._output
+        while len(arrays) <= i:
+            arrays.append(Array(self.padding_space) if padded else Function(self.newspace))
+        return arrays[i]
 
     def __call__(self, a_hat, b_hat, ab_hat=None):
-        """Compute convolution of a_hat and b_hat without truncation
+        """Compute convolution of a_hat and b_hat
 
         Parameters
         ----------
         a_hat : :class:`.Function`
         b_hat : :class:`.Function`
-        ab_hat : :class:`.Function`
+        ab_hat : :class:`.Function`, optional
+        """
+        return self.products([(a_hat, b_hat)], None if ab_hat is None else [ab_hat])[0]
+
+    def products(self, pairs, output=None):
+        """Compute the convolutions of several pairs of Functions
+
+        Parameters
+        ----------
+        pairs : sequence of 2-tuples
+            Each tuple (a_hat, b_hat) contains two :class:`.Function`s, or
+            arrays of the same shape, to be convolved. Operands that appear
+            in several pairs (the same memory) are only transformed once.
+        output : sequence of :class:`.Function`s, optional
+            Arrays for the results, one for each pair.
+
+        Returns
+        -------
+        list of :class:`.Function`s
+            The convolution of each pair
         """
         Tp = self.padding_space
         T = self.newspace
-        if ab_hat is None:
-            ab_hat = Function(T)
-
-        a = Array(Tp)
-        b = Array(Tp)
-        a = Tp.backward(a_hat, a)
-        b = Tp.backward(b_hat, b)
-        ab_hat = T.forward(a*b, ab_hat)
-        return ab_hat
+        index = {}
+        padded = []
+        for pair in pairs:
+            p = []
+            for a_hat in pair:
+                key = (a_hat.__array_interface__['data'][0], a_hat.strides)
+                if key not in index:
+                    index[key] = len(index)
+                    Tp.backward(a_hat, self._work(index[key]))
+                p.append(self._padded[index[key]])
+            padded.append(p)
+        if output is None:
+            output = [self._work(i, False) for i in range(len(pairs))]
+        for (a, b), ab_hat in zip(padded, output):
+            np.multiply(a, b, out=self._ab)
+            T.forward(self._ab, ab_hat)
+        return list(output)
 
 
 class BoundaryValues:
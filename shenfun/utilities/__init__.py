@@ -6,11 +6,12 @@ try:
     from collections.abc import MutableMapping
 except ImportError:
     from collections import MutableMapping
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import numpy as np
 import sympy as sp
 from scipy.fftpack import dct
 from scipy.integrate import quad
+from mpi4py_fft import fftw
 from shenfun.optimization import runtimeoptimizer
 from shenfun.optimization.cython import Lambda
 from shenfun.config import config
@@ -19,7 +20,8 @@ from .findbasis import get_bc_basis, get_stencil_matrix, n
 __all__ = ['dx', 'clenshaw_curtis1D', 'CachedArrayDict', 'surf3D',
            'wrap_periodic', 'outer', 'dot', 'apply_mask', 'integrate_sympy',
            'mayavi_show', 'quiver3D', 'get_bc_basis', 'get_stencil_matrix',
-           'scalar_product', 'n', 'cross', 'reset_profile', 'Lambda']
+           'scalar_product', 'n', 'cross', 'reset_profile', 'Lambda',
+           'get_contraction', 'fused_product']
 
 def dx(u, weighted=False):
     r"""Compute integral of u over domain
@@ -81,6 +83,14 @@ def clenshaw_curtis1D(u, quad="GC"):  # pragma: no cover
 class CachedArrayDict(MutableMapping):
     """Dictionary for caching Numpy arrays (work arrays)
 
+    Parameters
+    ----------
+    maxbytes : int or None, optional
+        Upper bound on the number of bytes held by the cache. When a new
+        array would make the cache exceed this bound, the least recently
+        used arrays are dropped from the cache. If None, use the bound in
+        ``config['memory']['work_maxbytes']``, where None means no bound.
+
     Example
     -------
 
@@ -96,22 +106,83 @@ class CachedArrayDict(MutableMapping):
      [0 0 0 0]
      [0 0 0 0]]
     >>> w2 = work[(a, 1, True)] # Get different(note 1!) array of same shape/dtype
+
+    Note
+    ----
+    An array dropped from the cache is still valid for anyone holding a
+    reference to it. A later lookup with the same key returns a new array.
+
+    The internal arrays of planned transforms, that are overwritten by
+    each transform and never returned to the user, are shared through
+    :meth:`aligned`. These are kept apart from the arrays returned by
+    lookups, which may be in use by the caller during a transform.
     """
-    def __init__(self):
-        self._data = {}
+    def __init__(self, maxbytes=None):
+        self._data = OrderedDict()
+        self._maxbytes = maxbytes
+
+    @property
+    def maxbytes(self):
+        """Return upper bound on bytes held by the cache"""
+        if self._maxbytes is None:
+            return config['memory']['work_maxbytes']
+        return self._maxbytes
+
+    @property
+    def nbytes(self):
+        """Return number of bytes held by the cache"""
+        return sum(value.nbytes for value in self._data.values())
 
     def __getitem__(self, key):
         newkey, fill = self.__keytransform__(key)
         try:
             value = self._data[newkey]
+            self._data.move_to_end(newkey)
         except KeyError:
             shape, dtype, _ = newkey
             value = np.empty(shape, dtype=np.dtype(dtype, align=True))
             self._data[newkey] = value
+            self._evict()
         if fill:
             value.fill(0)
         return value
 
+    def aligned(self, shape, dtype, index=0):
+        """Return SIMD aligned array for internal use in planned transforms
+
+        Parameters
+        ----------
+        shape : sequence of ints
+            Shape of array
+        dtype : numpy.dtype
+            Type of array
+        index : int, optional
+            Get different arrays of the same shape and dtype
+
+        Note
+        ----
+        The content of the array is undefined, since any space with the
+        same planned shape and dtype may overwrite it.
+        """
+        key = (tuple(np.atleast_1d(shape)), np.dtype(dtype), ('aligned', index))
+        try:
+            value = self._data[key]
+            self._data.move_to_end(key)
+        except KeyError:
+            value = fftw.aligned(key[0], dtype=dtype)
+            self._data[key] = value
+            self._evict()
+        return value
+
+    def _evict(self):
+        maxbytes = self.maxbytes
+        if maxbytes is None:
+            return
+        nbytes = self.nbytes
+        while nbytes > maxbytes and len(self._data) > 1:
+            _, value = self._data.popitem(last=False)
+            nbytes -= value.nbytes
+
     @staticmethod
     def __keytransform__(key):
         assert len(key) == 3
@@ -122,6 +193,7 @@ class CachedArrayDict(MutableMapping):
 
     def __setitem__(self, key, value):
         self._data[self.__keytransform__(key)[0]] = value
+        self._evict()
 
     def __delitem__(self, key):
         del self._data[self.__keytransform__(key)[0]]
@@ -132,6 +204,12 @@ class CachedArrayDict(MutableMapping):
     def values(self):
         raise TypeError('Cached work arrays not iterable')
 
+    def clear(self):
+        self._data.clear()
+
+# Global pool of work arrays shared by all modules and spaces
+work = CachedArrayDict()
+
 def reset_profile(prof):
     """Reset profiler for kernprof
 
@@ -148,6 +226,9 @@ def reset_profile(prof):
 def cross(c, a, b):
     """Cross product c = a x b
 
+    For curvilinear coordinates, with Arrays a and b, the product is
+    computed with the fused kernel :func:`.fused_product`.
+
     Parameters
     ----------
     c : Array
@@ -158,6 +239,9 @@ def cross(c, a, b):
     -------
     c : Array
     """
+    if hasattr(a, 'function_space') and not a.function_space().coors.is_cartesian:
+        g, terms, coef = get_contraction(a.function_space(), 'cross')
+        return fused_product(c, a, b, g, terms, coef)
     if a.ndim == 3:
         cross2D(c, a, b)
     elif a.ndim == 4:
@@ -217,6 +301,9 @@ def outer3D(a, b, c, symmetric):
     c[0] = a[0]*b[0]
     c[1] = a[0]*b[1]
     c[2] = a[0]*b[2]
+    c[4] = a[1]*b[1]
+    c[5] = a[1]*b[2]
+    c[8] = a[2]*b[2]
     if symmetric:
         c[3] = c[1]
         c[6] = c[2]
@@ -225,9 +312,6 @@ def outer3D(a, b, c, symmetric):
         c[3] = a[1]*b[0]
         c[6] = a[2]*b[0]
         c[7] = a[2]*b[1]
-    c[4] = a[1]*b[1]
-    c[5] = a[1]*b[2]
-    c[8] = a[2]*b[2]
 
 def dot(u, v, output_array=None, forward_output=True):
     """Return dot product of u and v
@@ -306,94 +390,8 @@ def dot(u, v, output_array=None, forward_output=True):
         va = Array(Vvp)
         va = Vvp.backward(v, va)
 
-    if Vu.coors.is_cartesian:
-
-        if Vu.tensor_rank == 1 and Vv.tensor_rank == 1:
-            uv = np.sum(ua.v*va.v, axis=0, out=uv)
-
-        elif Vu.tensor_rank == 2 and Vv.tensor_rank == 1:
-            for i in range(D):
-                ui = ua[i]
-                for j in range(D):
-                    uv[i] += ui[j]*va[j]
-
-        elif Vu.tensor_rank == 1 and Vv.tensor_rank == 2:
-            for i in range(D):
-                ui = ua[i]
-                vi = va[i]
-                for j in range(D):
-                    uv[j] += ui*vi[j]
-
-        elif Vu.tensor_rank == 2 and Vv.tensor_rank == 2:
-            for i in range(D):
-                ui = ua[i]
-                wi = uv[i]
-                for j in range(D):
-                    vj = va[j]
-                    for k in range(D):
-                        wi[k] += ui[j]*vj[k]
-
-        else:
-            raise NotImplementedError
-
-    else:
-        gij = Vu.coors.get_metric_tensor(config['basisvectors'])
-        mesh = Vup.local_mesh(True)
-        def measure(g):
-            sym0 = g.free_symbols
-            m = []
-            for sym in sym0:
-                j = 'xyzrs'.index(str(sym))
-                m.append(mesh[j])
-            return sp.lambdify(tuple(sym0), g)(*m)
-
-        if Vu.tensor_rank == 1 and Vv.tensor_rank == 1:
-            if Vu.coors.is_orthogonal:
-                for i in range(D):
-                    uv += ua[i]*va[i]*measure(gij[i, i])
-            else:
-                for i in range(D):
-                    ui = ua[i]
-                    for j in range(D):
-                        g = gij[i, j]
-                        if not g == 0:
-                            uv += ui*va[j]*measure(g)
-
-        elif Vu.tensor_rank == 2 and Vv.tensor_rank == 1:
-            for i in range(D):
-                ui = ua[i]
-                for j in range(D):
-                    for k in range(D):
-                        g = gij[j, k]
-                        if not g == 0:
-                            uv[i] += ui[j]*va[k]*measure(g)
-
-        elif Vu.tensor_rank == 1 and Vv.tensor_rank == 2:
-            for i in range(D):
-                ui = ua[i]
-                for j in range(D):
-                    vj = va[j]
-                    g = gij[i, j]
-                    if not g == 0:
-                        ms = measure(g)
-                        for k in range(D):
-                            uv[k] += ui*vj[k]*ms
-
-        elif Vu.tensor_rank == 2 and Vv.tensor_rank == 2:
-            for i in range(D):
-                ui = ua[i]
-                wi = uv[i]
-                for j in range(D):
-                    for k in range(D):
-                        g = gij[j, k]
-                        if not g == 0:
-                            vk = va[k]
-                            ms = measure(g)
-                            for l in range(D):
-                                wi[l] += ui[j]*vk[l]*ms
-
-        else:
-            raise NotImplementedError
+    g, terms, coef = get_contraction(Vup, 'dot', (Vu.tensor_rank, Vv.tensor_rank))
+    uv = fused_product(uv, ua, va, g, terms, coef)
 
     if forward_output is True:
 
@@ -408,6 +406,183 @@ def dot(u, v, output_array=None, forward_output=True):
     return uv
 
 
+def get_contraction(V, kind, ranks=(1, 1)):
+    r"""Return metric arrays and terms for a fused product of two tensors
+
+    The product of two tensors a and b is computed on the quadrature mesh as
+
+    .. math::
+
+        c_p = \sum_t s_t a_{i_t} b_{j_t} g_{k_t}
+
+    where each term t contributes to component p of the output, and
+    :math:`g_k` is a metric factor computed on the mesh.
+
+    Parameters
+    ----------
+    V : :class:`.TensorProductSpace`, :class:`.VectorSpace` or :class:`.TensorSpace`
+        The space of a. The quadrature mesh of V is used for the metric
+        arrays, so V should be padded if the product is to be dealiased.
+    kind : str
+        The kind of product
+
+        - 'dot' - Contract the last index of a with the first of b
+        - 'cross' - Cross product of two vectors
+        - 'outer' - Outer product of two vectors
+    ranks : 2-tuple of ints, optional
+        The tensor ranks of a and b
+
+    Returns
+    -------
+    3-tuple (g, terms, coef)
+        g : array of shape (ng, M) with ng metric factors on the M points
+        of the flattened local mesh. terms : int array of shape (nt, 4),
+        where row t holds :math:`(p, i_t, j_t, k_t)`, with :math:`k_t=-1`
+        for a unit metric factor. coef : array of shape (nt,) with the
+        scalings :math:`s_t`.
+
+    Note
+    ----
+    The convection term :math:`u \cdot \nabla u` is the 'dot' product
+    with ranks (1, 2) of u and the gradient of u.
+
+    The returned arrays are computed once and cached on V.
+    """
+    key = (kind, tuple(ranks), config['basisvectors'])
+    cache = V.__dict__.setdefault('_contractions', {})
+    if key in cache:
+        return cache[key]
+    coors = V.coors
+    T = _get_contraction_terms(coors, kind, tuple(ranks), V.dimensions)
+    mesh = V.local_mesh(True)
+    shape = np.broadcast_shapes(*[np.shape(m) for m in mesh])
+    gs = {}
+    terms = []
+    coef = []
+    for p, i, j, g in T:
+        if g.is_number:
+            terms.append((p, i, j, -1))
+            coef.append(float(g))
+            continue
+        if g not in gs:
+            sym = tuple(g.free_symbols)
+            x = [mesh[coors.psi.index(z)] for z in sym]
+            gs[g] = (len(gs), np.broadcast_to(sp.lambdify(sym, g)(*x), shape))
+        terms.append((p, i, j, gs[g][0]))
+        coef.append(1.)
+    order = np.argsort([t[0] for t in terms], kind='stable')
+    g = np.zeros((max(len(gs), 1), int(np.prod(shape))))
+    for k, gk in gs.values():
+        g[k] = gk.ravel()
+    terms = np.array(terms, dtype=int).reshape((-1, 4))[order].copy()
+    coef = np.array(coef, dtype=float)[order].copy()
+    cache[key] = (g, terms, coef)
+    return cache[key]
+
+def _get_contraction_terms(coors, kind, ranks, D):
+    """Return list of terms (p, i, j, g) for c[p] += a[i]*b[j]*g
+
+    The nonzero terms are computed once and cached on coors.
+    """
+    key = (kind, ranks, D, config['basisvectors'])
+    cache = coors.__dict__.setdefault('_contraction_terms', {})
+    if key in cache:
+        return cache[key]
+    if coors.is_cartesian:
+        gij = sp.eye(D)
+    else:
+        gij = sp.Matrix(coors.get_metric_tensor(config['basisvectors']))
+
+    T = []
+    if kind == 'dot':
+        if ranks == (1, 1):
+            T = [(0, i, j, gij[i, j]) for i in range(D) for j in range(D)]
+        elif ranks == (2, 1):
+            T = [(i, i*D+j, k, gij[j, k]) for i in range(D) for j in range(D)
+                 for k in range(D)]
+        elif ranks == (1, 2):
+            T = [(k, i, j*D+k, gij[i, j]) for i in range(D) for j in range(D)
+                 for k in range(D)]
+        elif ranks == (2, 2):
+            T = [(i*D+l, i*D+j, k*D+l, gij[j, k]) for i in range(D)
+                 for j in range(D) for k in range(D) for l in range(D)]
+        else:
+            raise NotImplementedError
+
+    elif kind == 'cross':
+        if coors.is_cartesian or (config['basisvectors'] == 'normal' and coors.is_orthogonal):
+            glow, sg = sp.eye(D), 1
+        elif config['basisvectors'] == 'covariant':
+            glow, sg = sp.Matrix(coors.get_covariant_metric_tensor()), coors.sg
+        else:
+            raise NotImplementedError
+        if D == 2:
+            T = [(0, l, m, sp.LeviCivita(j, k)*glow[j, l]*glow[k, m]/sg)
+                 for j in range(2) for k in range(2) for l in range(2) for m in range(2)]
+        elif D == 3:
+            T = [(i, l, m, sp.LeviCivita(i, j, k)*glow[j, l]*glow[k, m]/sg)
+                 for i in range(3) for j in range(3) for k in range(3)
+                 for l in range(3) for m in range(3)]
+        else:
+            raise NotImplementedError
+
+    elif kind == 'outer':
+        T = [(i*D+j, i, j, 1) for i in range(D) for j in range(D)]
+
+    else:
+        raise NotImplementedError
+
+    T = [(p, i, j, sp.sympify(g) if coors.is_cartesian else coors.refine(sp.simplify(g)))
+         for p, i, j, g in T]
+    cache[key] = [t for t in T if t[3] != 0]
+    return cache[key]
+
+def fused_product(c, a, b, g, terms, coef):
+    """Compute fused product of a and b in one pass per output component
+
+    Parameters
+    ----------
+    c : array
+        The output array
+    a, b : arrays
+        The tensors to multiply
+    g, terms, coef : arrays
+        Metric factors, terms and scalings as returned by
+        :func:`.get_contraction`
+
+    Returns
+    -------
+    c : array
+
+    Note
+    ----
+    The number of threads used by the compiled kernel is set in
+    ``config['optimization']['num_threads']``.
+    """
+    M = g.shape[1]
+    cf = np.asarray(c).reshape((-1, M))
+    af = np.asarray(a).reshape((-1, M))
+    bf = np.asarray(b).reshape((-1, M))
+    if af.dtype == bf.dtype == cf.dtype and cf.dtype.char in 'dD' and cf.flags.c_contiguous:
+        contract(cf, np.ascontiguousarray(af), np.ascontiguousarray(bf), g,
+                 terms, coef, config['optimization']['num_threads'])
+    else:
+        contract.func(cf, af, bf, g, terms, coef)
+    if not np.shares_memory(cf, c):
+        # c is not contiguous and reshape returned a copy
+        c[...] = cf.reshape(np.shape(c))
+    return c
+
+@runtimeoptimizer
+def contract(c, a, b, g, terms, coef, num_threads=1):
+    c.fill(0)
+    for (p, i, j, k), s in zip(terms, coef):
+        if k < 0:
+            c[p] += s*a[i]*b[j]
+        else:
+            c[p] += s*a[i]*b[j]*g[k]
+    return c
+
 @runtimeoptimizer
 def apply_mask(u_hat, mask):
     if mask is not None:
@@ -29,28 +29,59 @@ instance for each equation. These are mainly IMEX Runge Kutta integrators:
     - IMEXRK111
     - IMEXRK222
     - IMEXRK443
+    - IMEXARK324L2SA
+
+and IMEX linear multistep methods, that need only one solver, one solve and
+one evaluation of the nonlinear terms per time step:
+
+    - CNAB2
+    - SBDF2
+    - SBDF3
+    - SBDF4
+
+Adaptive time stepping is available for integrators with an embedded error
+estimate (RK4, ETDRK4 and IMEXARK324L2SA), using the :class:`PIController`
+step size controller and the :func:`error_norm` computed in spectral space.
 
 See, e.g., https://github.com/spectralDNS/shenfun/blob/master/demo/ChannelFlow
 for an example of use.
 
 Note
 ----
-`RK4`, `ETD` and `ETDRK4` can only be used with Fourier function spaces,
-as they assume all matrices are diagonal.
+`RK4` can only be used with Fourier function spaces, as it assumes all
+matrices are diagonal. `ETD` and `ETDRK4` can also be used with one
+non-periodic axis with homogeneous boundary conditions, where the linear
+operator is stored as dense matrices along this axis, see
+:class:`DenseAxisOperator`.
 
 """
 import copy
 import types
+from collections import OrderedDict
 import numpy as np
+from mpi4py import MPI
+from scipy.linalg import expm, solve
 from shenfun import Function, TPMatrix, TrialFunction, TestFunction,\
     inner, la, Expr, CompositeSpace, BlockMatrix, SparseMatrix, \
-    get_simplified_tpmatrices, ScipyMatrix, Inner, SpectralMatrix
+    get_simplified_tpmatrices, ScipyMatrix, Inner, SpectralMatrix, \
+    extract_bc_matrices, EnsembleSpace
+from .timers import timed
 
 __all__ = ('IRK3', 'BackwardEuler', 'RK4', 'ETDRK4', 'ETD',
-           'IMEXRK3', 'IMEXRK111', 'IMEXRK222', 'IMEXRK443')
+           'IMEXRK3', 'IMEXRK111', 'IMEXRK222', 'IMEXRK443', 'IMEXARK324L2SA',
+           'CNAB2', 'SBDF2', 'SBDF3', 'SBDF4', 'PIController', 'error_norm')
 
 #pylint: disable=unused-variable
 
+def get_member_space(T):
+    """Return the space of one member if T is an :class:`.EnsembleSpace`,
+    otherwise T
+
+    The linear operators of the integrators are assembled for one member,
+    and broadcast over the leading ensemble axis.
+    """
+    return T.member if isinstance(T, EnsembleSpace) else T
+
 class IntegratorBase:
     """Abstract base class for integrators
 
@@ -77,6 +108,7 @@ class IntegratorBase:
         _p.update(params)
         self.params = _p
         self.T = T
+        self.err = None
         if L is not None:
             self.LinearRHS = types.MethodType(L, self)
         if N is not None:
@@ -84,6 +116,9 @@ class IntegratorBase:
         if update is not None:
             self.update = types.MethodType(update, self)
 
+    #: Order of embedded solution used for error estimates, if any
+    embedded_order = None
+
     def update(self, u, u_hat, t, tstep, **par):
         pass
 
@@ -97,6 +132,79 @@ class IntegratorBase:
         """Set up solver"""
         pass
 
+    def get_linear_operator(self):
+        """Return the linear operator
+
+        Returns
+        -------
+        array or :class:`.DenseAxisOperator`
+            The diagonal of the linear operator as a scale array if all
+            axes are Fourier, otherwise the operator as dense matrices along
+            the one non-periodic axis.
+        """
+        T = get_member_space(self.T)
+        if T.dimensions == 1:
+            diagonal = T.family() == 'fourier'
+        else:
+            diagonal = T.tensor_rank > 0 or len(T.get_nondiagonal_axes()) == 0
+        if diagonal:
+            return np.atleast_1d(self.get_linear_diagonal())
+        u = TrialFunction(T)
+        v = TestFunction(T)
+        return DenseAxisOperator(inner(v, u), inner(v, self.LinearRHS(u, **self.params)))
+
+    def get_linear_diagonal(self):
+        """Return the diagonal of the linear operator as a scale array
+
+        Only for linear operators that are diagonal, like for pure
+        Fourier spaces.
+        """
+        T = get_member_space(self.T)
+        u = TrialFunction(T)
+        v = TestFunction(T)
+        L = self.LinearRHS(u, **self.params)
+        if isinstance(L, Expr):
+            L = inner(v, L)
+            if isinstance(L, list):
+                if isinstance(L[0], TPMatrix):
+                    L = get_simplified_tpmatrices(L)[0]
+                elif isinstance(L[0], SpectralMatrix):
+                    L = sum(L[1:], L[0])
+        if isinstance(L, list):
+            assert T.tensor_rank == 1
+            assert L[0].isidentity()
+            L = L[0].scale
+            # Use only L[0] and let numpy broadcasting take care of the rest
+        elif isinstance(L, TPMatrix):
+            assert L.isidentity()
+            L = L.scale
+        elif isinstance(L, SparseMatrix):
+            L.simplify_diagonal_matrices()
+            L = L.scale
+        return L
+
+    def step(self, u, u_hat, dt):
+        """Take one step of length dt
+
+        Parameters
+        ----------
+            u : array
+                The solution array in physical space
+            u_hat : array
+                The solution array in spectral space. On return it holds
+                the solution at the end of the step.
+            dt : float
+                Timestep
+
+        Note
+        ----
+        Integrators with an embedded error estimate store the estimated
+        local error of the step in the attribute ``err``, if this is not
+        None.
+        """
+        raise NotImplementedError
+
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         """Integrate forward in time
 
@@ -113,6 +221,315 @@ class IntegratorBase:
         """
         pass
 
+    @timed()
+    def solve_adaptive(self, u, u_hat, dt, trange, atol=1e-6, rtol=1e-3,
+                       controller=None):
+        """Integrate forward in time with adaptive time steps
+
+        The local error of each step is estimated using an embedded lower
+        order solution, and the time step is modified by a step size
+        controller. Steps with a too large error are rejected and
+        recomputed with a smaller time step.
+
+        Parameters
+        ----------
+            u : array
+                The solution array in physical space
+            u_hat : array
+                The solution array in spectral space
+            dt : float
+                Initial timestep
+            trange : two-tuple
+                Time and end time
+            atol, rtol : numbers, optional
+                Absolute and relative tolerance, see :func:`.error_norm`
+            controller : :class:`.PIController`, optional
+                Step size controller. If None, then a :class:`.PIController`
+                is created for the order of the embedded solution.
+
+        Note
+        ----
+        The accepted time steps are stored in the list ``dts``, and the
+        number of rejected steps in ``nrejected``. The last proposed time
+        step is stored as ``dt_next``.
+        """
+        if self.embedded_order is None:
+            raise NotImplementedError('%s has no embedded error estimate' % self.__class__.__name__)
+        if controller is None:
+            controller = PIController(self.embedded_order)
+        self.controller = controller
+        self.err = Function(self.T)
+        u0_hat = Function(self.T)
+        comm = getattr(self.T, 'comm', None)
+        self.dts = []
+        self.nrejected = 0
+        t, end_time = trange
+        tstep = 0
+        while t < end_time-1e-8:
+            h = min(dt, end_time-t)
+            if abs(self.params['dt']-h) > 1e-12:
+                self.setup(h)
+            u0_hat[:] = u_hat
+            self.step(u, u_hat, h)
+            err = error_norm(self.err, u0_hat, u_hat, atol, rtol, comm)
+            accepted, dt = controller(err, h)
+            if accepted:
+                t += h
+                tstep += 1
+                self.dts.append(h)
+                self.update(u, u_hat, t, tstep, **self.params)
+            else:
+                u_hat[:] = u0_hat
+                self.nrejected += 1
+        self.dt_next = dt
+        self.err = None
+        return u_hat
+
+
+def error_norm(e, u0, u1=None, atol=1e-6, rtol=1e-3, comm=None):
+    r"""Return scaled root mean square norm of error estimate e
+
+    .. math::
+
+        \sqrt{\frac{1}{N}\sum_{k} \left(\frac{|e_k|}{atol + rtol \max(|u_{0,k}|, |u_{1,k}|)}\right)^2}
+
+    where the sum is over all N spectral coefficients on all processors.
+
+    Parameters
+    ----------
+    e : array
+        Error estimate in spectral space
+    u0 : array
+        Solution in spectral space at the start of the step
+    u1 : array, optional
+        Solution in spectral space at the end of the step
+    atol, rtol : numbers, optional
+        Absolute and relative tolerance
+    comm : MPI communicator, optional
+        Reduce over all processors in comm
+    """
+    sc = abs(u0) if u1 is None else np.maximum(abs(u0), abs(u1))
+    sc *= rtol
+    sc += atol
+    z = np.array([np.sum((abs(e)/sc)**2), e.size], dtype=float)
+    if comm is not None:
+        comm.Allreduce(MPI.IN_PLACE, z)
+    return np.sqrt(z[0]/z[1])
+
+
+class PIController:
+    r"""Proportional-integral step size controller
+
+    For a step of length dt with error norm err (see :func:`.error_norm`),
+    the step is accepted if err <= 1, and the next time step is
+
+    .. math::
+
+        dt_{new} = dt \cdot safety \cdot err^{-\beta_1} err_{prev}^{\beta_2}
+
+    where :math:`err_{prev}` is the error of the previous accepted step.
+    For a rejected step :math:`dt_{new} = dt \cdot safety \cdot err^{-1/(q+1)}`.
+
+    Parameters
+    ----------
+    order : int
+        The order q of the embedded (lower order) solution
+    beta1, beta2 : numbers, optional
+        Exponents of the controller. Default are 0.7/(q+1) and 0.4/(q+1)
+    safety : number, optional
+        Safety factor
+    facmin, facmax : numbers, optional
+        Minimum and maximum allowed change of dt
+    dtmin, dtmax : numbers, optional
+        Minimum and maximum allowed dt. A step with dt <= dtmin is always
+        accepted.
+    deadband : 2-tuple of numbers, optional
+        Keep dt unchanged if the proposed change lies within deadband. This
+        avoids new factorisations of implicit solvers for small changes.
+    """
+    def __init__(self, order, beta1=None, beta2=None, safety=0.9, facmin=0.2,
+                 facmax=5., dtmin=0, dtmax=np.inf, deadband=(1, 1.2)):
+        self.order = order
+        self.beta1 = 0.7/(order+1) if beta1 is None else beta1
+        self.beta2 = 0.4/(order+1) if beta2 is None else beta2
+        self.safety = safety
+        self.facmin = facmin
+        self.facmax = facmax
+        self.dtmin = dtmin
+        self.dtmax = dtmax
+        self.deadband = deadband
+        self.err_prev = 1
+
+    def reset(self):
+        """Forget the error of the previous step"""
+        self.err_prev = 1
+
+    def __call__(self, err, dt):
+        """Return whether the step is accepted, and the new time step
+
+        Parameters
+        ----------
+        err : number
+            The error norm of the step
+        dt : number
+            The time step used
+        """
+        err = max(err, 1e-10)
+        accepted = err <= 1 or dt <= self.dtmin
+        if accepted:
+            fac = self.safety*err**(-self.beta1)*self.err_prev**self.beta2
+            fac = min(self.facmax, max(self.facmin, fac))
+            self.err_prev = err
+        else:
+            fac = max(self.facmin, min(1, self.safety*err**(-1/(self.order+1))))
+        if accepted and self.deadband[0] <= fac <= self.deadband[1]:
+            fac = 1
+        return accepted, min(self.dtmax, max(self.dtmin, dt*fac))
+
+
+class DenseAxisOperator:
+    r"""Linear operator :math:`M^{-1}A` stored as dense matrices along one
+    non-periodic axis
+
+    For a space with one non-periodic axis, and Fourier bases along the
+    remaining axes, the Galerkin matrices of the mass and the linear operator
+    are block diagonal, with one small matrix along the non-periodic axis for
+    each index (wavenumber) of the Fourier axes. This class holds the dense
+    matrices :math:`M^{-1}A` for all these indices, such that functions of
+    the operator, like the phi functions of exponential integrators, can be
+    computed once and applied as matrix vector products.
+
+    Parameters
+    ----------
+    M : :class:`.SparseMatrix`, :class:`.TPMatrix` or list of these
+        The mass matrix, e.g., from ``inner(v, u)``
+    A : :class:`.SparseMatrix`, :class:`.TPMatrix` or list of these
+        The linear operator, e.g., from ``inner(v, div(grad(u)))``
+
+    Note
+    ----
+    Indices of the Fourier axes with equal scales share the same matrix. The
+    boundary conditions must be homogeneous, and the non-periodic axis must
+    not be distributed in spectral space.
+
+    Operators may be scaled and added, and multiplication with an array
+    applies the operator along the non-periodic axis.
+    """
+    __array_ufunc__ = None
+
+    def __init__(self, M, A):
+        M = M if isinstance(M, list) else [M]
+        A = A if isinstance(A, list) else [A]
+        assert len(extract_bc_matrices([M, A])) == 0, 'Only homogeneous boundary conditions are supported'
+        if isinstance(M[0], TPMatrix):
+            M = get_simplified_tpmatrices(M)
+            A = get_simplified_tpmatrices(A)
+            axis = M[0].naxes[0]
+            assert np.all([len(m.naxes) == 1 and m.naxes[0] == axis for m in M+A])
+            T = M[0].space
+            shape = list(T.forward.output_array.shape)
+            assert shape[axis] == T.global_shape(True)[axis], 'Non-periodic axis must be aligned'
+            shape[axis] = 1
+            scales = [np.broadcast_to(m.scale, shape) for m in M+A]
+            dense = [m.mats[axis].diags('csr').toarray() for m in M+A]
+            base = T.bases[axis]
+        else:
+            axis = 0
+            scales = [np.ones(1)]*len(M+A)
+            dense = [m.diags('csr').toarray() for m in M+A]
+            base = M[0].testfunction[0]
+        S = np.stack([np.moveaxis(sc, axis, -1).ravel() for sc in scales], axis=1)
+        S, inverse = np.unique(S, axis=0, return_inverse=True)
+        nm = len(M)
+        mats = []
+        for s in S:
+            Mi = sum(s[j]*dense[j] for j in range(nm))
+            Ai = sum(s[j]*dense[j] for j in range(nm, len(dense)))
+            mats.append(solve(Mi, Ai))
+        self.mats = np.array(mats)
+        self.groups = [np.nonzero(inverse.ravel() == i)[0] for i in range(len(S))]
+        self.axis = axis
+        self.ndim = len(scales[0].shape)
+        self.nrows = len(inverse.ravel())
+        self.slice = base.slice()
+
+    def _new(self, mats):
+        op = copy.copy(self)
+        op.mats = mats
+        return op
+
+    def __mul__(self, a):
+        if isinstance(a, np.ndarray):
+            return self.matvec(a)
+        return self._new(self.mats*a)
+
+    def __rmul__(self, a):
+        return self.__mul__(a)
+
+    def __add__(self, a):
+        assert a.groups is self.groups
+        return self._new(self.mats+a.mats)
+
+    def __sub__(self, a):
+        assert a.groups is self.groups
+        return self._new(self.mats-a.mats)
+
+    def __neg__(self):
+        return self._new(-self.mats)
+
+    def matvec(self, u):
+        """Return operator applied to u along the non-periodic axis
+
+        Parameters
+        ----------
+        u : array
+            Spectral coefficients. Any leading axes in addition to the
+            axes of the space, like the axis of an :class:`.EnsembleSpace`,
+            are treated as the Fourier axes.
+        """
+        axis = self.axis + u.ndim - self.ndim
+        um = np.moveaxis(u, axis, -1)
+        uf = um.reshape((-1, self.nrows, um.shape[-1]))
+        c = np.zeros(uf.shape, dtype=np.result_type(u.dtype, self.mats.dtype))
+        sl = self.slice
+        for mat, idx in zip(self.mats, self.groups):
+            c[:, idx, sl] = uf[:, idx, sl] @ mat.T
+        out = np.zeros(u.shape, dtype=c.dtype)
+        np.moveaxis(out, axis, -1)[:] = c.reshape(um.shape)
+        return out
+
+    def phi(self, h, k):
+        r"""Return :math:`\exp(hL)` and the phi functions :math:`\varphi_j(hL)`
+        for j=1, ..., k, where L is this operator
+
+        The functions are computed with the exponential of an augmented
+        matrix, see Al-Mohy and Higham, 'Computing the action of the matrix
+        exponential, with an application to exponential integrators', SIAM
+        J. Sci. Comput., 33 (2011) 488-511.
+
+        Parameters
+        ----------
+        h : number
+            Time step
+        k : int
+            The highest phi function
+
+        Returns
+        -------
+        List of k+1 :class:`.DenseAxisOperator`
+        """
+        m, n = self.mats.shape[:2]
+        phis = np.zeros((k+1, m, n, n), dtype=self.mats.dtype)
+        Z = np.zeros(((k+1)*n, (k+1)*n), dtype=self.mats.dtype)
+        for j in range(k):
+            Z[j*n:(j+1)*n, (j+1)*n:(j+2)*n] = np.eye(n)
+        for i, mat in enumerate(self.mats):
+            Z[:n, :n] = h*mat
+            E = expm(Z)
+            for j in range(k+1):
+                phis[j, i] = E[:n, j*n:(j+1)*n]
+        return [self._new(p) for p in phis]
+
 
 class IRK3(IntegratorBase):
     """Third order implicit Runge Kutta
@@ -190,6 +607,7 @@ class IRK3(IntegratorBase):
             mat = ScipyMatrix if self.T.dimensions == 1 else BlockMatrix
             self.rhs_mats.append(mat(rhs_mats))
 
+    @timed()
     def compute_rhs(self, u, u_hat, dU, dU1, rk):
         a = self.a[rk]
         b = self.b[rk]
@@ -203,6 +621,7 @@ class IRK3(IntegratorBase):
             dU[:] = w1
         return dU
 
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         if self.solver is None or abs(self.params['dt']-dt) > 1e-12:
             self.setup(dt)
@@ -280,6 +699,7 @@ class BackwardEuler(IntegratorBase):
             self.solver = la.BlockMatrixSolver(mats)
         self.rhs_mats = BlockMatrix(M if isinstance(M, list) else [M])
 
+    @timed()
     def compute_rhs(self, u, u_hat, dU, dU1):
         dt = self.params['dt']
         dU = self.NonlinearRHS(u, u_hat, dU, **self.params)
@@ -289,6 +709,7 @@ class BackwardEuler(IntegratorBase):
         dU1[:] = dU
         return w1
 
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         if self.solver is None or abs(self.params['dt']-dt) > 1e-12:
             self.setup(dt)
@@ -336,30 +757,18 @@ class ETD(IntegratorBase):
         self.dU = Function(T)
         self.psi = None
         self.ehL = None
+        self.L = None
 
     def setup(self, dt):
         """Set up ETD ODE solver"""
         self.params['dt'] = dt
-        u = TrialFunction(self.T)
-        v = TestFunction(self.T)
-        L = self.LinearRHS(u, **self.params)
-        if isinstance(L, Expr):
-            L = inner(v, L)
-            L = get_simplified_tpmatrices(L)[0]
-        if isinstance(L, list):
-            assert self.T.tensor_rank == 1
-            assert L[0].isidentity()
-            L = L[0].scale
-            # Use only L[0] and let numpy broadcasting take care of the rest
-        elif isinstance(L, TPMatrix):
-            assert L.isidentity()
-            L = L.scale
-        elif isinstance(L, SparseMatrix):
-            L.simplify_diagonal_matrices()
-            L = L.scale
+        if self.L is None:
+            self.L = self.get_linear_operator()
+        if isinstance(self.L, DenseAxisOperator):
+            self.ehL, self.psi = self.L.phi(dt, 1)
+            return
 
-        L = np.atleast_1d(L)
-        hL = L*dt
+        hL = self.L*dt
         self.ehL = np.exp(hL)
         M = 50
         psi = self.psi = np.zeros(hL.shape, dtype=float)
@@ -368,6 +777,7 @@ class ETD(IntegratorBase):
             psi += ((np.exp(ll)-1.)/ll).real
         psi /= M
 
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         """Integrate forward in time
 
@@ -401,6 +811,11 @@ class ETDRK4(IntegratorBase):
     H. Montanelli and N. Bootland "Solving periodic semilinear PDEs in 1D, 2D and
     3D with exponential integrators", https://arxiv.org/pdf/1604.08900.pdf
 
+    With :meth:`.IntegratorBase.solve_adaptive` the local error is estimated
+    as the difference from the second order ETD2RK solution, where the last
+    stage of ETDRK4 is used as predictor. The estimate requires no additional
+    evaluations of the right hand side.
+
     Parameters
     ----------
         T : TensorProductSpace
@@ -413,6 +828,8 @@ class ETDRK4(IntegratorBase):
         params : dictionary
             Any relevant keyword arguments
     """
+    embedded_order = 2
+
     def __init__(self, T,
                  L=None,
                  N=None,
@@ -429,34 +846,21 @@ class ETDRK4(IntegratorBase):
         self.b = [0.5, 0.5, 0.5]
         self.ehL = None
         self.ehL_h = None
+        self.L = None
 
     def setup(self, dt):
         """Set up ETDRK4 ODE solver"""
         self.params['dt'] = dt
-        u = TrialFunction(self.T)
-        v = TestFunction(self.T)
-        L = self.LinearRHS(u, **self.params)
-        if isinstance(L, Expr):
-            L = inner(v, L)
-            if isinstance(L, list):
-                if isinstance(L[0], TPMatrix):
-                    L = get_simplified_tpmatrices(L)[0]
-                elif isinstance(L[0], SpectralMatrix):
-                    L = sum(L[1:], L[0])
-        if isinstance(L, list):
-            assert self.T.tensor_rank == 1
-            assert L[0].isidentity()
-            L = L[0].scale
-            # Use only L[0] and let numpy broadcasting take care of the rest
-        elif isinstance(L, TPMatrix):
-            assert L.isidentity()
-            L = L.scale
-        elif isinstance(L, SparseMatrix):
-            L.simplify_diagonal_matrices()
-            L = L.scale
-
-        L = np.atleast_1d(L)
-        hL = L*dt
+        if self.L is None:
+            self.L = self.get_linear_operator()
+        if isinstance(self.L, DenseAxisOperator):
+            ehL, psi0, psi1, psi2 = self.L.phi(dt, 3)
+            self.ehL_h, psi3 = self.L.phi(dt/2, 1)
+            self.ehL = ehL
+            self.psi = [psi0, psi1, psi2, psi3]
+            self.set_weights()
+            return
+        hL = self.L*dt
         self.ehL = np.exp(hL)
         self.ehL_h = np.exp(hL/2.)
         M = 50
@@ -470,12 +874,17 @@ class ETDRK4(IntegratorBase):
             psi[3] += ((np.exp(ll2)-1.)/(ll2)).real
 
         psi /= M
+        self.set_weights()
+
+    def set_weights(self):
+        psi = self.psi
         a = [psi[0]-3*psi[1]+4*psi[2]]
         a.append(2*psi[1]-4*psi[2])
         a.append(2*psi[1]-4*psi[2])
         a.append(-psi[1]+4*psi[2])
         self.a = a
 
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         """Integrate forward in time
 
@@ -497,29 +906,43 @@ class ETDRK4(IntegratorBase):
         while t < end_time-1e-8:
             t += dt
             tstep += 1
-
-            self.U_hat0[:] = u_hat*self.ehL_h
-            self.U_hat1[:] = u_hat*self.ehL
-            for rk in range(4):
-                self.dU = self.NonlinearRHS(u, u_hat, self.dU, **self.params)
-                if rk < 2:
-                    u_hat[:] = self.U_hat0 + self.b[rk]*dt*self.psi[3]*self.dU
-                elif rk == 2:
-                    u_hat[:] = self.ehL_h*self.V2 + self.b[rk]*dt*self.psi[3]*(2*self.dU-self.dU0)
-
-                if rk == 0:
-                    self.dU0[:] = self.dU
-                    self.V2[:] = u_hat
-
-                self.U_hat1 += self.a[rk]*dt*self.dU
-            u_hat[:] = self.U_hat1
+            self.step(u, u_hat, dt)
             self.update(u, u_hat, t, tstep, **self.params)
         return u_hat
 
+    def step(self, u, u_hat, dt):
+        if self.err is not None:
+            # Second order ETD2RK solution, using the last stage as predictor
+            self.err[:] = -self.ehL*u_hat
+        self.U_hat0[:] = u_hat*self.ehL_h
+        self.U_hat1[:] = u_hat*self.ehL
+        for rk in range(4):
+            self.dU = self.NonlinearRHS(u, u_hat, self.dU, **self.params)
+            if rk < 2:
+                u_hat[:] = self.U_hat0 + self.b[rk]*dt*self.psi[3]*self.dU
+            elif rk == 2:
+                u_hat[:] = self.ehL_h*self.V2 + self.b[rk]*dt*self.psi[3]*(2*self.dU-self.dU0)
+
+            if rk == 0:
+                self.dU0[:] = self.dU
+                self.V2[:] = u_hat
+
+            self.U_hat1 += self.a[rk]*dt*self.dU
+        u_hat[:] = self.U_hat1
+        if self.err is not None:
+            self.err += u_hat
+            self.err -= dt*(self.psi[0]-self.psi[1])*self.dU0
+            self.err -= dt*self.psi[1]*self.dU
+        return u_hat
+
 
 class RK4(IntegratorBase):
     """Regular 4'th order Runge-Kutta integrator
 
+    With :meth:`.IntegratorBase.solve_adaptive` the local error is estimated
+    with the embedded third order solution of Zonneveld's RK4(3) pair, which
+    requires one additional evaluation of the right hand side.
+
     Parameters
     ----------
         T : TensorProductSpace
@@ -532,6 +955,8 @@ class RK4(IntegratorBase):
         params : dictionary
             Any relevant keyword arguments
     """
+    embedded_order = 3
+
     def __init__(self, T,
                  L=None,
                  N=None,
@@ -543,11 +968,50 @@ class RK4(IntegratorBase):
         self.dU = Function(T)
         self.a = np.array([1./6., 1./3., 1./3., 1./6.])
         self.b = np.array([0.5, 0.5, 1.])
+        # Zonneveld's embedded stage and difference of weights, fourth minus third order
+        self.a5 = np.array([5./32., 7./32., 13./32., -1./32.])
+        self.e = np.array([2./3., -2., -2., -2., 16./3.])
+        self.K = None
+        self.L = None
 
     def setup(self, dt):
         """Set up RK4 ODE solver"""
         self.params['dt'] = dt
+        if self.L is None:
+            self.L = self.get_linear_diagonal()
+
+    def compute_rhs(self, u, u_hat):
+        dU = self.NonlinearRHS(u, u_hat, self.dU, **self.params)
+        if isinstance(self.L, np.ndarray):
+            dU += self.L*u_hat
+        return dU
 
+    def step(self, u, u_hat, dt):
+        self.U_hat0[:] = self.U_hat1[:] = u_hat
+        K = None
+        if self.err is not None:
+            if self.K is None:
+                self.K = [Function(self.T) for _ in range(4)]
+            K = self.K
+        for rk in range(4):
+            dU = self.compute_rhs(u, u_hat)
+            if K is not None:
+                K[rk][:] = dU
+            if rk < 3:
+                u_hat[:] = self.U_hat0 + self.b[rk]*dt*dU
+            self.U_hat1 += self.a[rk]*dt*dU
+        if self.err is not None:
+            u_hat[:] = self.U_hat0
+            for rk in range(4):
+                u_hat += self.a5[rk]*dt*K[rk]
+            dU = self.compute_rhs(u, u_hat)
+            self.err[:] = self.e[4]*dt*dU
+            for rk in range(4):
+                self.err += self.e[rk]*dt*K[rk]
+        u_hat[:] = self.U_hat1
+        return u_hat
+
+    @timed()
     def solve(self, u, u_hat, dt, trange):
         """Integrate forward in end_time
 
@@ -562,44 +1026,114 @@ class RK4(IntegratorBase):
             trange : two-tuple
                 Time and end time
         """
-        if self.a is None or abs(self.params['dt']-dt) > 1e-12:
+        if self.L is None or abs(self.params['dt']-dt) > 1e-12:
             self.setup(dt)
         t, end_time = trange
         tstep = 0
-        ut = TrialFunction(self.T)
-        vt = TestFunction(self.T)
-        L = self.LinearRHS(ut, **self.params)
-        if isinstance(L, Expr):
-            L = inner(vt, L)
-            L = get_simplified_tpmatrices(L)[0]
-        if isinstance(L, list):
-            assert self.T.tensor_rank == 1
-            assert L[0].isidentity()
-            L = L[0].scale
-            # Use only L[0] and let numpy broadcasting take care of the rest
-        elif isinstance(L, TPMatrix):
-            assert L.isidentity()
-            L = L.scale
-        elif isinstance(L, SparseMatrix):
-            L.simplify_diagonal_matrices()
-            L = L.scale
-
         while t < end_time-1e-8:
             t += dt
             tstep += 1
-            self.U_hat0[:] = self.U_hat1[:] = u_hat
-            for rk in range(4):
-                dU = self.NonlinearRHS(u, u_hat, self.dU, **self.params)
-                if isinstance(L, np.ndarray):
-                    dU += L*u_hat
-                if rk < 3:
-                    u_hat[:] = self.U_hat0 + self.b[rk]*dt*dU
-                self.U_hat1 += self.a[rk]*dt*dU
-            u_hat[:] = self. U_hat1
+            self.step(u, u_hat, dt)
             self.update(u, u_hat, t, tstep, **self.params)
         return u_hat
 
 
+def assemble_operators(v, u, Lu):
+    """Return mass and linear operators of an IMEX integrator
+
+    Parameters
+    ----------
+    v : :class:`.TestFunction`
+    u : :class:`.Expr`
+        The unknown, with a :class:`.TrialFunction` basis
+    Lu : :class:`.Expr`
+        The linear operator applied to u
+
+    Returns
+    -------
+    2-tuple of lists
+        The matrices of the mass operator (v, u) and the linear operator
+        (v, Lu), including boundary matrices
+    """
+    M = inner(v, u)
+    A = inner(v, Lu)
+    M = M if isinstance(M, list) else [M]
+    A = A if isinstance(A, list) else [A]
+    return M, A
+
+def scaled_matrix(mat, c):
+    """Return copy of matrix scaled by c, of the same class as mat
+
+    Parameters
+    ----------
+    mat : :class:`.SparseMatrix` or :class:`.TPMatrix`
+    c : number
+
+    Note
+    ----
+    The copy of a :class:`.SparseMatrix` shares its diagonals with mat.
+    Unlike ``mat*c``, a :class:`.SpectralMatrix` keeps its test and trial
+    functions, such that boundary matrices are still recognised.
+    """
+    if isinstance(mat, TPMatrix):
+        return mat*c
+    A = mat.__class__.__new__(mat.__class__)
+    A.__dict__.update(mat.__dict__)
+    A._storage = dict(mat._storage)
+    A.scale = mat.scale*c
+    return A
+
+def get_stage_matrices(pde, c):
+    """Return matrices of M - c*A for the implicit stages of an IMEX integrator
+
+    The matrices are created from the already assembled operators
+    ``pde.mass`` (M) and ``pde.linear`` (A), such that no forms are
+    assembled when the time step changes. :class:`.TPMatrix` instances and
+    boundary matrices are only rescaled, see :func:`.scaled_matrix`. The
+    remaining 1D SparseMatrices are summed into one matrix, whereas the
+    boundary matrices are kept separate, such that they are recognised by
+    the solvers.
+
+    Parameters
+    ----------
+    pde : :class:`.IMEXRK3` or :class:`.PDEIMEXRK`
+    c : number
+        Scaling of the linear operator
+    """
+    linear = pde.linear if c != 0 else []
+    if isinstance(pde.mass[0], TPMatrix):
+        return [m*1 for m in pde.mass] + [m*(-c) for m in linear]
+    mats = [m.copy() for m in pde.mass if not m.is_bc_matrix()]
+    mats += [m*(-c) for m in linear if not m.is_bc_matrix()]
+    bc_mats = [m for m in pde.mass if m.is_bc_matrix()]
+    bc_mats += [scaled_matrix(m, -c) for m in linear if m.is_bc_matrix()]
+    return [sum(mats[1:], mats[0])] + bc_mats
+
+def get_stage_solver(pde, key, c):
+    """Return solver for the implicit matrix M - c*A of an IMEX integrator
+
+    The solver is taken from the cache ``pde.solvers`` if present, otherwise
+    it is created from the matrices of :func:`.get_stage_matrices`. At most
+    ``pde.cachesize`` solvers are kept, and the least recently used are
+    evicted.
+
+    Parameters
+    ----------
+    pde : :class:`.IMEXRK3` or :class:`.PDEIMEXRK`
+    key : 2-tuple
+        (stage, dt)
+    c : number
+        Scaling of the linear operator
+    """
+    solvers = pde.solvers
+    if key in solvers:
+        solvers.move_to_end(key)
+        return solvers[key]
+    solvers[key] = pde._solver(get_stage_matrices(pde, c))
+    while len(solvers) > max(1, pde.cachesize):
+        solvers.popitem(last=False)
+    return solvers[key]
+
 class IMEXRK3:
     r"""Solve partial differential equations of the form
 
@@ -627,28 +1161,45 @@ class IMEXRK3:
         Time step
     solver : Linear solver, optional
     name : str, optional
+    latex : str, optional
+        optional representation of the equation to solve
+    cachesize : int, optional
+        The maximum number of stage solvers (factorisations) to keep
+
+    Note
+    ----
+    The mass and linear operators are assembled once, and the stage solvers
+    are created for each new time step from these operators. The solvers
+    are cached on (stage, dt), such that the time step can be modified
+    cheaply, e.g., for a CFL condition, and returning to a previous time
+    step requires no new factorisations.
     """
-    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None):
+    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None,
+                 cachesize=12):
         self.v = v
         self.u = u if isinstance(u, Expr) else Expr(u)
         self.u_ = self.u.basis()
         self.L = L
         self.N = N
         self.dt = dt
+        self.cachesize = cachesize
         T = self.T = v.function_space()
         self._solver = solver
         if solver is None:
             if v.dimensions == 1:
                 self._solver = la.Solver
-            elif len(T.get_nondiagonal_axes().ndim) == 1:
+            elif len(T.get_nondiagonal_axes()) == 1:
                 self._solver = la.SolverGeneric1ND
-            elif len(T.get_nondiagonal_axes().ndim) == 2:
+            elif len(T.get_nondiagonal_axes()) == 2:
                self._solver = la.SolverGeneric2ND
             else:
                 raise NotImplementedError
 
-        self.solvers = []
-        self.linear_rhs = []
+        self.solvers = OrderedDict()
+        self.mass = None
+        self.linear = None
+        self.mass_rhs = None
+        self.linear_rhs = None
         self.nonlinear_rhs = None
         self.name = name
         self.latex = latex
@@ -669,16 +1220,12 @@ class IMEXRK3:
         return a, b, c
 
     def assemble(self):
-        a, b, _ = self.stages()
-        dt = self.dt
         ul = copy.copy(self.u)
         ul._basis = TrialFunction(self.u.function_space())
-        L1 = self.L(ul)
-        L2 = self.L(self.u)
-        for rk in range(len(a)):
-            mats = inner(self.v, ul - (a[rk]+b[rk])*dt/2*L1)
-            self.solvers.append(self._solver(mats))
-            self.linear_rhs.append(Inner(self.v, self.u + (a[rk]+b[rk])*dt/2*L2))
+        self.mass, self.linear = assemble_operators(self.v, ul, self.L(ul))
+        self.solvers.clear()
+        self.mass_rhs = Inner(self.v, self.u)
+        self.linear_rhs = Inner(self.v, self.L(self.u))
         if isinstance(self.N, (Expr, Function)):
             self.nonlinear_rhs = Inner(self.v, self.N)
         elif isinstance(self.N, list):
@@ -686,18 +1233,32 @@ class IMEXRK3:
         else:
             raise RuntimeError('Wrong type of nonlinear expression')
 
+    @timed()
     def compute_rhs(self, rk=0):
         a, b, _ = self.stages()
         w0 = self.nonlinear_rhs()
         self.rhs[1] = self.dt*(a[rk]*w0+b[rk]*self.rhs[0])
-        self.rhs[1] += self.linear_rhs[rk]()
+        self.rhs[1] += self.mass_rhs()
+        self.rhs[1] += (a[rk]+b[rk])*self.dt/2*self.linear_rhs()
         self.rhs[0] = w0
         if self.mask is not None:
             self.T.mask_nyquist(self.rhs[1], self.mask)
         return self.rhs
 
+    def get_solver(self, rk):
+        """Return solver for stage rk and the current time step
+
+        Parameters
+        ----------
+        rk : int
+            The stage
+        """
+        a, b, _ = self.stages()
+        return get_stage_solver(self, (rk, self.dt), (a[rk]+b[rk])*self.dt/2)
+
+    @timed()
     def solve_step(self, rk):
-        return self.solvers[rk](self.rhs[-1], self.u_)
+        return self.get_solver(rk)(self.rhs[-1], self.u_)
 
 class PDEIMEXRK:
     r"""Solve partial differential equations of the form
@@ -735,14 +1296,23 @@ class PDEIMEXRK:
     name : str, optional
     latex : str, optional
         optional representation of the equation to solve
+    cachesize : int, optional
+        The maximum number of solvers (factorisations) to keep
+
+    Note
+    ----
+    The diagonal of a is constant, so there is only one solver for each time
+    step. See :class:`.IMEXRK3` for the caching of solvers.
     """
-    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None):
+    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None,
+                 cachesize=4):
         self.v = v
         self.u = u if isinstance(u, Expr) else Expr(u)
         self.u_ = self.u.basis()
         self.L = L
         self.N = N
         self.dt = dt
+        self.cachesize = cachesize
         self._solver = solver
         if solver is None:
             if v.dimensions > 1:
@@ -750,8 +1320,10 @@ class PDEIMEXRK:
             else:
                 self._solver = la.Solver
 
-        self.solvers = []
-        self.linear_rhs = []
+        self.solvers = OrderedDict()
+        self.mass = None
+        self.linear = None
+        self.linear_rhs = None
         self.nonlinear_rhs = None
         self.name = name
         self.latex = latex
@@ -780,12 +1352,10 @@ class PDEIMEXRK:
         raise NotImplementedError
 
     def assemble(self):
-        a = self.stages()[0]
-        dt = self.dt
         ul = copy.copy(self.u)
         ul._basis = TrialFunction(self.u.function_space())
-        mats = inner(self.v, ul - dt*a[1, 1]*self.L(ul))
-        self.solvers.append(self._solver(mats))
+        self.mass, self.linear = assemble_operators(self.v, ul, self.L(ul))
+        self.solvers.clear()
         self.linear_rhs = Inner(self.v, self.L(self.u))
         self.u0_rhs = Inner(self.v, self.u)
         if isinstance(self.N, (Expr, Function)):
@@ -795,6 +1365,7 @@ class PDEIMEXRK:
         else:
             raise RuntimeError('Wrong type of nonlinear expression')
 
+    @timed()
     def compute_rhs(self, rk=0):
         a, b = self.stages()[:2]
         self.Krhs[rk] = self.nonlinear_rhs()
@@ -812,9 +1383,15 @@ class PDEIMEXRK:
             self.T.mask_nyquist(self.rhs, self.mask)
         return self.rhs
 
+    def get_solver(self):
+        """Return solver for the current time step"""
+        a = self.stages()[0]
+        return get_stage_solver(self, (0, self.dt), self.dt*a[1, 1])
+
+    @timed()
     def solve_step(self, rk=0):
         # only one solver since the diagonal of a is constant
-        return self.solvers[0](self.rhs, self.u_)
+        return self.get_solver()(self.rhs, self.u_)
 
 class IMEXRK111(PDEIMEXRK):
 
@@ -873,3 +1450,324 @@ class IMEXRK443(PDEIMEXRK):
             [1/4, 7/4, 3/4, -7/4, 0]])
         c = (0, 1/2, 2/3, 1/2, 1)
         return a, b, c
+
+class IMEXARK324L2SA(PDEIMEXRK):
+    r"""Additive Runge-Kutta method ARK3(2)4L[2]SA with embedded error estimate
+
+    Third order IMEX Runge-Kutta method with an embedded second order
+    solution, from::
+
+        Kennedy and Carpenter 'Additive Runge-Kutta schemes for
+        convection-diffusion-reaction equations' Applied Numerical
+        Mathematics, 44 (2003) 139-181
+
+    The three implicit stages share the same diagonal coefficient, and thus
+    the same solver. The last of the :meth:`steps` computes the solution from
+    the weights of the method, together with the embedded error estimate
+    of the step, using a mass matrix solver. Use :meth:`error_norm` with a
+    :class:`.PIController` to adapt the time step, and :meth:`reject` to
+    restore the solution of a rejected step::
+
+        controller = PIController(IMEXARK324L2SA.embedded_order)
+        while t < end_time:
+            for rk in range(pde.steps()):
+                # compute nonlinear terms
+                pde.compute_rhs(rk)
+                pde.solve_step(rk)
+            accepted, dt = controller(pde.error_norm(), pde.dt)
+            if accepted:
+                t += pde.dt
+            else:
+                pde.reject()
+            pde.dt = dt
+
+    For systems of equations use the maximum error norm of all equations.
+    The solvers are cached on (stage, dt), see :class:`.IMEXRK3`.
+
+    Parameters
+    ----------
+    See :class:`.PDEIMEXRK`
+    """
+    embedded_order = 2
+
+    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None,
+                 cachesize=4):
+        PDEIMEXRK.__init__(self, v, u, L, N, dt, solver=solver, name=name,
+                           latex=latex, cachesize=cachesize)
+        WL = CompositeSpace([self.T]*self.steps())
+        self.Lrhs = Function(WL).v # linear terms of all stages
+        self.u0 = Function(self.T)
+        self.u1 = Function(self.T)
+        self.rhs1 = np.zeros_like(self.rhs)
+        self.err = Function(self.T)
+
+    @classmethod
+    def steps(cls):
+        return 4
+
+    def stages(self):
+        g = 1767732205903/4055673282236
+        w = [1471266399579/7840856788654, -4482444167858/7529755066697,
+             11266239266428/11593286722821, g]
+        a = np.array([
+            [0, 0, 0, 0],
+            [g, g, 0, 0],
+            [2746238789719/10658868560708, -640167445237/6845629431997, g, 0],
+            w,
+            w])
+        b = np.array([
+            [0, 0, 0, 0],
+            [2*g, 0, 0, 0],
+            [5535828885825/10492691773637, 788022342437/10882634858940, 0, 0],
+            [6485989280629/16251701735622, -4246266847089/9704473918619,
+             10755448449292/10357097424841, 0],
+            w])
+        c = (0, 2*g, 3/5, 1, 1)
+        return a, b, c
+
+    def embedded_weights(self):
+        """Return weights of the embedded second order solution"""
+        return np.array([2756255671327/12835298489170, -10771552573575/22201958757719,
+                         9247589265047/10645013368117, 2193209047091/5459859503100])
+
+    @timed()
+    def compute_rhs(self, rk=0):
+        a, b = self.stages()[:2]
+        self.Krhs[rk] = self.nonlinear_rhs()
+        self.Lrhs[rk] = self.linear_rhs()
+        if rk == 0:
+            self.u0_rhs() # only at start
+            self.u0[:] = self.u_
+        self.rhs[:] = self.u0_rhs.output_array
+        for j in range(0, rk+1):
+            self.rhs += self.dt*b[rk+1, j]*self.Krhs[j]
+            self.rhs += self.dt*a[rk+1, j]*self.Lrhs[j]
+
+        if self.mask is not None:
+            self.T.mask_nyquist(self.rhs, self.mask)
+        return self.rhs
+
+    @timed()
+    def solve_step(self, rk=0):
+        if rk < self.steps()-1:
+            return self.get_solver()(self.rhs, self.u_)
+        # Explicit final step. Compute embedded solution first, and then
+        # the error as the difference from the third order solution.
+        M = get_stage_solver(self, (rk, 0), 0)
+        bh = self.embedded_weights()
+        self.rhs1[:] = self.u0_rhs.output_array
+        for j in range(rk+1):
+            self.rhs1 += self.dt*bh[j]*(self.Krhs[j]+self.Lrhs[j])
+        if self.mask is not None:
+            self.T.mask_nyquist(self.rhs1, self.mask)
+        M(self.rhs1, self.u1)
+        M(self.rhs, self.u_)
+        self.err[:] = self.u_ - self.u1
+        return self.u_
+
+    def error_norm(self, atol=1e-6, rtol=1e-3):
+        """Return norm of the error estimate of the last step
+
+        Parameters
+        ----------
+        atol, rtol : numbers, optional
+            Absolute and relative tolerance, see :func:`.error_norm`
+        """
+        return error_norm(self.err, self.u0, self.u_, atol, rtol,
+                          getattr(self.T, 'comm', None))
+
+    def reject(self):
+        """Restore the solution from the start of the last step"""
+        self.u_[:] = self.u0
+
+class PDEIMEXMultistep(PDEIMEXRK):
+    r"""Base class for IMEX linear multistep methods
+
+    Solve equations of the form (1) in :class:`.PDEIMEXRK` with multistep
+    methods of order :math:`s`
+
+    .. math::
+
+        \sum_{j=0}^{s} a_j u^{n+1-j} = \Delta t \sum_{j=0}^{s} b_j L u^{n+1-j}
+            + \Delta t \sum_{j=1}^{s} c_j N^{n+1-j},
+
+    where only :math:`u^{n+1}` is unknown. There is one solver, one solve
+    and one evaluation of the nonlinear terms for each time step. The terms
+    of the previous time steps are kept in ring buffers.
+
+    Use as the IMEX Runge-Kutta methods::
+
+        for rk in range(pde.steps()):
+            # compute nonlinear terms
+            pde.compute_rhs(rk)
+            pde.solve_step(rk)
+
+    The first :math:`s-1` time steps, where the history is not yet complete,
+    are computed with the one-step method ``starter``, and :meth:`steps`
+    returns the number of stages of this method. Without a starter, these
+    time steps bootstrap the method with the lower order methods of the same
+    family, and the global error is then at best second order. The history
+    is discarded, and the method restarts, if the time step ``dt`` is
+    modified, or after a call to :meth:`reset`.
+
+    Parameters
+    ----------
+    starter : class, optional
+        One-step IMEX Runge-Kutta method used for the first time steps.
+        Defaults to :class:`.IMEXRK443` for methods of order higher than two.
+    See :class:`.PDEIMEXRK` for the remaining parameters
+    """
+    #: Order of the method
+    order = None
+
+    def __init__(self, v, u, L, N, dt, solver=None, name='U-equation', latex=None,
+                 cachesize=4, starter=None):
+        self.starter = None
+        self.tstep = 0
+        self._dt = dt
+        PDEIMEXRK.__init__(self, v, u, L, N, dt, solver=solver, name=name,
+                           latex=latex, cachesize=cachesize)
+        s = self.order
+        self.Mrhs = np.zeros((s,)+self.rhs.shape, dtype=self.rhs.dtype) # mass terms
+        self.Krhs = np.zeros_like(self.Mrhs) # nonlinear terms
+        self.Lrhs = np.zeros_like(self.Mrhs) if self.implicit_history() else None
+        self._order = 1
+        if starter is None and s > 2:
+            starter = IMEXRK443
+        if starter is not None:
+            self.starter = starter(v, self.u, L, N, dt, solver=solver, name=name,
+                                   latex=latex, cachesize=cachesize)
+
+    def steps(self):
+        """Return the number of stages of the next time step"""
+        self._check_dt()
+        return self.starter.steps() if self._starting() else 1
+
+    def _check_dt(self):
+        if self.dt != self._dt:
+            self.reset()
+
+    def _starting(self):
+        # Whether the next time step is computed by the starter
+        return self.starter is not None and self.tstep < self.order-1
+
+    def coefficients(self, order):
+        """Return coefficients a, b and c of the method of given order
+
+        Parameters
+        ----------
+        order : int
+            The order of the method, less than or equal to :attr:`order`.
+            Lower orders are used to bootstrap the method.
+        """
+        raise NotImplementedError
+
+    def implicit_history(self):
+        """Return whether the linear terms of previous time steps are used"""
+        return any(np.any(self.coefficients(k)[1][1:]) for k in range(1, self.order+1))
+
+    def reset(self):
+        """Discard history and restart the method"""
+        self.tstep = 0
+        self._dt = self.dt
+
+    def assemble(self):
+        PDEIMEXRK.assemble(self)
+        if self.starter is not None:
+            self.starter.assemble()
+        self.reset()
+
+    @timed()
+    def compute_rhs(self, rk=0):
+        self._check_dt()
+        s = self.order
+        i = self.tstep % s
+        if self._starting():
+            starter = self.starter
+            starter.dt = self.dt
+            starter.compute_rhs(rk)
+            if rk == 0:
+                # Store the history of the start of the step
+                self.Mrhs[i] = starter.u0_rhs.output_array
+                self.Krhs[i] = starter.Krhs[0]
+                if self.Lrhs is not None:
+                    self.Lrhs[i] = self.linear_rhs()
+            return starter.rhs
+        self.Mrhs[i] = self.u0_rhs()
+        self.Krhs[i] = self.nonlinear_rhs()
+        if self.Lrhs is not None:
+            self.Lrhs[i] = self.linear_rhs()
+        self._order = order = min(self.tstep+1, s)
+        a, b, c = self.coefficients(order)
+        self.rhs[:] = 0
+        for j in range(1, order+1):
+            k = (self.tstep+1-j) % s
+            self.rhs -= a[j]*self.Mrhs[k]
+            self.rhs += self.dt*c[j]*self.Krhs[k]
+            if b[j] != 0:
+                self.rhs += self.dt*b[j]*self.Lrhs[k]
+        self.rhs /= a[0]
+        self.tstep += 1
+        if self.mask is not None:
+            self.T.mask_nyquist(self.rhs, self.mask)
+        return self.rhs
+
+    def get_solver(self):
+        """Return solver for the current order and time step"""
+        a, b = self.coefficients(self._order)[:2]
+        return get_stage_solver(self, (b[0]/a[0], self.dt), self.dt*b[0]/a[0])
+
+    @timed()
+    def solve_step(self, rk=0):
+        if self._starting():
+            self.starter.solve_step(rk)
+            if rk == self.starter.steps()-1:
+                self.tstep += 1
+            return self.u_
+        return self.get_solver()(self.rhs, self.u_)
+
+class CNAB2(PDEIMEXMultistep):
+    """Crank-Nicolson, Adams-Bashforth second order multistep method
+
+    Bootstrapped with Crank-Nicolson, forward Euler, which uses the same
+    solver. See :class:`.PDEIMEXMultistep`.
+    """
+    order = 2
+
+    def coefficients(self, order):
+        a = np.zeros(order+1)
+        b = np.zeros(order+1)
+        a[:2] = 1, -1
+        b[:2] = 1/2, 1/2
+        c = np.array([0, 1]) if order == 1 else np.array([0, 3/2, -1/2])
+        return a, b, c
+
+class SBDF(PDEIMEXMultistep):
+    """Semi-implicit backward differentiation formula multistep methods
+
+    See::
+
+        Ascher, Ruuth and Wetton 'Implicit-explicit methods for time-dependent
+        partial differential equations' SIAM J. Numer. Anal., 32 (1995)
+        797-823
+
+    and :class:`.PDEIMEXMultistep`.
+    """
+    def coefficients(self, order):
+        a, c = {
+            1: ([1, -1], [0, 1]),
+            2: ([3/2, -2, 1/2], [0, 2, -1]),
+            3: ([11/6, -3, 3/2, -1/3], [0, 3, -3, 1]),
+            4: ([25/12, -4, 3, -4/3, 1/4], [0, 4, -6, 4, -1])}[order]
+        b = np.zeros(order+1)
+        b[0] = 1
+        return np.array(a), b, np.array(c)
+
+class SBDF2(SBDF):
+    order = 2
+
+class SBDF3(SBDF):
+    order = 3
+
+class SBDF4(SBDF):
+    order = 4
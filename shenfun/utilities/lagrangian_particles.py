@@ -3,7 +3,7 @@ from mpi4py import MPI
 
 comm = MPI.COMM_WORLD
 
-__all__ = ['LagrangianParticles']
+__all__ = ['LagrangianParticles', 'DistributedParticles']
 
 class LagrangianParticles:
     """Class for tracking Lagrangian particles
@@ -17,6 +17,11 @@ class LagrangianParticles:
     u_hat : :class:`.Function`
         Spectral Galerkin :class:`.Function` for the Eulerian velocity
 
+    Note
+    ----
+    All particles are stored on all ranks. See :class:`.DistributedParticles`
+    for a large number of particles.
+
     """
 
     def __init__(self, points, dt, u_hat):
@@ -32,6 +37,374 @@ class LagrangianParticles:
     def rhs(self):
         return self.u_hat.eval(self.x, output_array=self.up)
 
+
+class DistributedParticles:
+    """Class for tracking Lagrangian particles distributed over processors
+
+    A particle is owned by the rank whose part of the physical mesh holds
+    the mesh point closest to the particle. Particles migrate between the
+    ranks after each time step. The velocity is interpolated from the
+    physical velocity on the local mesh, extended with a halo of
+    neighbouring mesh points, using tensor product Lagrange polynomials
+    through ``order`` points along each axis. The velocity may also be
+    evaluated exactly from the spectral coefficients, but this requires
+    all particles on all ranks, and is thus mainly useful for
+    verification.
+
+    Parameters
+    ----------
+    points : array
+        Initial location of particles. (D, N) array, with N particles in D
+        dimensions
+    dt : float
+        Time step
+    velocity : :class:`.Function` or :class:`.Array`
+        The Eulerian velocity of a :class:`.VectorSpace`, in Cartesian
+        coordinates
+    scheme : str, optional
+        Time integrator, 'RK4', 'RK2' or 'Euler'
+    interpolation : str, optional
+        - 'local' - Lagrange interpolation from the physical velocity
+        - 'spectral' - Evaluate the spectral expansion of the velocity
+    order : int, optional
+        Number of points of the local interpolation along each axis
+    replicated : bool, optional
+        If True, then points are the same on all ranks, and each rank keeps
+        the particles it owns. If False, then each rank holds a different
+        share of the particles, that are migrated to their owners.
+
+    Note
+    ----
+    The velocity is assumed fixed during a time step, and is updated from
+    ``velocity`` at the start of each step. Particles are wrapped along
+    periodic (Fourier) axes, and kept within the domain along the
+    remaining axes.
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from shenfun import FunctionSpace, TensorProductSpace, VectorSpace, \\
+    ...     Function, comm, DistributedParticles
+    >>> F = FunctionSpace(16, 'F', dtype='D')
+    >>> G = FunctionSpace(16, 'F', dtype='d')
+    >>> V = VectorSpace(TensorProductSpace(comm, (F, G)))
+    >>> u = Function(V, buffer=(1, 0))
+    >>> lp = DistributedParticles(np.array([[1.], [1.]]), 0.5, u)
+    >>> lp.step()
+    >>> np.round(lp.gather()[0], 4)
+    array([[1.5],
+           [1. ]])
+    """
+    def __init__(self, points, dt, velocity, scheme='RK4',
+                 interpolation='local', order=4, replicated=True):
+        from shenfun.forms.arguments import Function
+        assert scheme in ('RK4', 'RK2', 'Euler')
+        assert interpolation in ('local', 'spectral')
+        self.dt = dt
+        self.scheme = scheme
+        self.interpolation = interpolation
+        self.order = order
+        self.velocity = velocity
+        V = velocity.function_space()
+        T = V.flatten()[0]
+        self.T = T
+        self.comm = T.comm
+        self.D = T.dimensions
+        assert V.num_components() == self.D
+        self._spectral = isinstance(velocity, Function)
+        self._setup_mesh()
+        points = np.atleast_2d(np.array(points, dtype=float))
+        assert points.shape[0] == self.D
+        rank = self.comm.Get_rank()
+        N = points.shape[1]
+        x = self.wrap(points)
+        if replicated:
+            mine = self.owner(x) == rank
+            self.x, self.ids = x[:, mine].copy(), np.arange(N)[mine]
+        else:
+            offset = self.comm.exscan(N)
+            self.x, self.ids = x, np.arange(N) + (offset if rank > 0 else 0)
+        self.up = np.zeros_like(self.x)
+        self.migrate()
+        self._u = None
+        self._xe = None
+        self._u_hat = None
+
+    def _setup_mesh(self):
+        # Global mesh, halo widths and owned intervals along each axis
+        T = self.T
+        pencil = T.forward.input_pencil
+        h = self.order//2 + 1
+        self._periodic = []
+        self._domain = []
+        self._mesh = []
+        self._halo = []
+        self._bounds = []
+        for axis, base in enumerate(T.bases):
+            periodic = base.family() == 'fourier'
+            xg = np.asarray(base.mesh(bcast=False, map_true_domain=True))
+            N = len(xg)
+            assert 2 <= self.order <= N
+            subcomm = pencil.subcomm[axis]
+            size, r = subcomm.Get_size(), subcomm.Get_rank()
+            start, n = pencil.substart[axis], pencil.subshape[axis]
+            if size > 1:
+                assert n >= h, 'Too few mesh points on each rank for halo'
+            hlo = h if periodic or r > 0 else 0
+            hhi = h if periodic or r < size-1 else 0
+            self._periodic.append(periodic)
+            self._domain.append(tuple(float(d) for d in base.domain))
+            self._mesh.append(xg)
+            self._halo.append((hlo, hhi))
+            # Owned interval between midpoints of neighbouring ranks' meshes
+            xl = xg[start:start+n]
+            lims = np.array(subcomm.allgather((xl.min(), xl.max())))
+            lims = lims[np.argsort(lims[:, 0])]
+            self._bounds.append(0.5*(lims[1:, 0]+lims[:-1, 1]))
+        # Map from coordinates of the processor grid to rank
+        coords = tuple(c.Get_rank() for c in pencil.subcomm)
+        sizes = tuple(c.Get_size() for c in pencil.subcomm)
+        self._ranks = np.zeros(sizes, dtype=int)
+        for rank, c in enumerate(self.comm.allgather(coords)):
+            self._ranks[c] = rank
+        # The processor coordinate increases with decreasing mesh if the
+        # mesh is sorted descending
+        self._descending = [xg[0] > xg[-1] for xg in self._mesh]
+
+    def wrap(self, x):
+        """Return positions wrapped into the domain
+
+        Parameters
+        ----------
+        x : array
+            Positions of shape (D, N)
+        """
+        x = np.array(x, dtype=float)
+        for axis, (a, b) in enumerate(self._domain):
+            if self._periodic[axis]:
+                x[axis] = a + np.mod(x[axis]-a, b-a)
+            else:
+                x[axis] = np.clip(x[axis], a, b)
+        return x
+
+    def owner(self, x):
+        """Return rank of owner of particles
+
+        Parameters
+        ----------
+        x : array
+            Wrapped positions of shape (D, N)
+        """
+        c = []
+        for axis in range(self.D):
+            i = np.searchsorted(self._bounds[axis], x[axis])
+            if self._descending[axis]:
+                i = len(self._bounds[axis]) - i
+            c.append(i)
+        return self._ranks[tuple(c)]
+
+    def update(self):
+        """Update the velocity used for interpolation from ``velocity``"""
+        if self.interpolation == 'spectral':
+            if self._spectral:
+                self._u_hat = self.velocity
+            else:
+                self._u_hat = self.velocity.forward(self._u_hat)
+            return
+        u = np.asarray(self.velocity.backward() if self._spectral else self.velocity)
+        self._u, self._xe = self._extend(u.real)
+
+    def _extend(self, u):
+        # Return u extended with halos, and the ascending mesh of each axis
+        pencil = self.T.forward.input_pencil
+        xe = []
+        for axis in range(self.D):
+            subcomm = pencil.subcomm[axis]
+            size, r = subcomm.Get_size(), subcomm.Get_rank()
+            hlo, hhi = self._halo[axis]
+            left = (r-1) % size if hlo > 0 else MPI.PROC_NULL
+            right = (r+1) % size if hhi > 0 else MPI.PROC_NULL
+            n = u.shape[axis+1]
+            shape = list(u.shape)
+            shape[axis+1] = n + hlo + hhi
+            ue = np.zeros(shape, dtype=u.dtype)
+            s = [slice(None)]*u.ndim
+            s[axis+1] = slice(hlo, hlo+n)
+            ue[tuple(s)] = u
+            h = self.order//2 + 1
+            for dest, source, send, recv in ((left, right, slice(0, h), slice(hlo+n, None)),
+                                             (right, left, slice(n-h, n), slice(0, hlo))):
+                s[axis+1] = send
+                sendbuf = np.ascontiguousarray(u[tuple(s)])
+                s[axis+1] = recv
+                recvbuf = np.zeros_like(ue[tuple(s)])
+                subcomm.Sendrecv(sendbuf, dest, recvbuf=recvbuf, source=source)
+                if recvbuf.size > 0:
+                    ue[tuple(s)] = recvbuf
+            # Mesh of extended array, shifted across periodic boundaries
+            xg = self._mesh[axis]
+            N = len(xg)
+            a, b = self._domain[axis]
+            k = np.arange(pencil.substart[axis]-hlo, pencil.substart[axis]+n+hhi)
+            x = xg[k % N] + (b-a)*(k // N)
+            if self._descending[axis]:
+                # Periodic meshes are always ascending
+                x = x[::-1]
+                ue = np.flip(ue, axis=axis+1)
+            xe.append(x)
+            u = ue
+        return np.ascontiguousarray(u), xe
+
+    def _interpolate(self, x):
+        # Velocity at wrapped positions x owned by this rank
+        p = self.order
+        out = np.zeros(x.shape)
+        u = self._u.reshape((self.D, -1))
+        m = max(1, 2**22//(self.D*p**self.D))
+        for j in range(0, x.shape[1], m):
+            xj = x[:, j:j+m]
+            ix = 0
+            w = 1
+            for axis in range(self.D):
+                xe = self._xe[axis]
+                i0 = np.searchsorted(xe, xj[axis], 'right') - p//2
+                i0 = np.clip(i0, 0, len(xe)-p)
+                i = i0[:, None] + np.arange(p)[None, :]
+                sh = (-1,)+(1,)*axis+(p,)+(1,)*(self.D-axis-1)
+                ix = ix*len(xe) + i.reshape(sh)
+                w = w*_lagrange_weights(xe[i], xj[axis]).reshape(sh)
+            n = xj.shape[1]
+            out[:, j:j+m] = np.einsum('cmk,mk->cm', u[:, ix.reshape((n, -1))], w.reshape((n, -1)))
+        return out
+
+    def evaluate(self, x):
+        """Return velocity at positions x
+
+        Parameters
+        ----------
+        x : array
+            Positions of shape (D, N). The positions need not be owned by
+            this rank.
+        """
+        x = self.wrap(x)
+        if self.interpolation == 'spectral':
+            n = self.comm.allgather(x.shape[1])
+            rank = self.comm.Get_rank()
+            xall = np.hstack(self.comm.allgather(x))
+            u = self._u_hat.eval(xall)
+            u = np.atleast_2d(u).real
+            return u[:, sum(n[:rank]):sum(n[:rank+1])].copy()
+        if self.comm.Get_size() == 1:
+            return self._interpolate(x)
+        dest = self.owner(x)
+        index = np.argsort(dest, kind='stable')
+        xr, counts = self._alltoallv(x[:, index], dest[index])
+        ur, _ = self._alltoallv(self._interpolate(xr), counts=counts)
+        u = np.zeros_like(x)
+        u[:, index] = ur
+        return u
+
+    def _alltoallv(self, a, dest=None, counts=None):
+        # Send columns of a to ranks dest, sorted, or with given send counts.
+        # Return received columns and receive counts.
+        size = self.comm.Get_size()
+        if counts is None:
+            counts = np.bincount(dest, minlength=size)
+        rcounts = np.zeros(size, dtype=counts.dtype)
+        self.comm.Alltoall(counts, rcounts)
+        k = a.shape[0]
+        sendbuf = np.ascontiguousarray(a.T)
+        recvbuf = np.zeros((rcounts.sum(), k), dtype=a.dtype)
+        sc, rc = counts*k, rcounts*k
+        sd = np.hstack(([0], np.cumsum(sc)[:-1]))
+        rd = np.hstack(([0], np.cumsum(rc)[:-1]))
+        mpitype = MPI._typedict[a.dtype.char]
+        self.comm.Alltoallv([sendbuf, (sc, sd), mpitype], [recvbuf, (rc, rd), mpitype])
+        return recvbuf.T, rcounts
+
+    def migrate(self):
+        """Send particles to the ranks that own them"""
+        if self.comm.Get_size() == 1:
+            return
+        dest = self.owner(self.x)
+        index = np.argsort(dest, kind='stable')
+        dest = dest[index]
+        self.x = np.ascontiguousarray(self._alltoallv(self.x[:, index], dest)[0])
+        self.ids = self._alltoallv(self.ids[None, index], dest)[0][0].copy()
+        self.up = np.ascontiguousarray(self._alltoallv(self.up[:, index], dest)[0])
+
+    def step(self):
+        """Advance particles one time step"""
+        self.update()
+        x, dt, f = self.x, self.dt, self.evaluate
+        self.up = k1 = f(x)
+        if self.scheme == 'Euler':
+            x = x + dt*k1
+        elif self.scheme == 'RK2':
+            k2 = f(x + dt*k1)
+            x = x + 0.5*dt*(k1 + k2)
+        else:
+            k2 = f(x + 0.5*dt*k1)
+            k3 = f(x + 0.5*dt*k2)
+            k4 = f(x + dt*k3)
+            x = x + dt/6*(k1 + 2*k2 + 2*k3 + k4)
+        self.x = self.wrap(x)
+        self.migrate()
+
+    def gather(self, root=None):
+        """Return positions and ids of all particles, sorted by id
+
+        Parameters
+        ----------
+        root : int or None, optional
+            Return on rank root only, or on all ranks if None
+        """
+        if root is None:
+            x = np.hstack(self.comm.allgather(self.x))
+            ids = np.hstack(self.comm.allgather(self.ids))
+        else:
+            x = self.comm.gather(self.x, root=root)
+            ids = self.comm.gather(self.ids, root=root)
+            if self.comm.Get_rank() != root:
+                return None, None
+            x, ids = np.hstack(x), np.hstack(ids)
+        index = np.argsort(ids)
+        return x[:, index], ids[index]
+
+    def write(self, filename, step):
+        """Store positions and ids of particles with parallel HDF5
+
+        The positions are stored in dataset ``x/step`` of shape (D, N),
+        and the ids of the particles in ``id/step``. Each rank writes its
+        own particles to a contiguous part of the datasets.
+
+        Parameters
+        ----------
+        filename : str
+            Name of HDF5 file, opened in append mode
+        step : int
+            Time step
+        """
+        import h5py
+        n = self.comm.allgather(self.x.shape[1])
+        rank = self.comm.Get_rank()
+        s = slice(sum(n[:rank]), sum(n[:rank+1]))
+        f = h5py.File(filename, 'a', driver="mpio", comm=self.comm)
+        for name, val in (('x', self.x), ('id', self.ids)):
+            f.require_group(name)
+            dset = f[name].require_dataset(str(step), shape=val.shape[:-1]+(sum(n),), dtype=val.dtype)
+            dset[..., s] = val
+        f.close()
+
+def _lagrange_weights(xj, x):
+    """Return weights of Lagrange polynomials through the rows of xj at x"""
+    p = xj.shape[1]
+    d = xj[:, :, None] - xj[:, None, :]
+    d[:, np.arange(p), np.arange(p)] = 1
+    num = np.repeat((x[:, None] - xj)[:, None, :], p, axis=1)
+    num[:, np.arange(p), np.arange(p)] = 1
+    return np.prod(num/d, axis=2)
+
 if __name__ == '__main__':
     from shenfun import *
     import sympy as sp
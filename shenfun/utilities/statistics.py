@@ -0,0 +1,306 @@
+"""
+Module for in-situ statistics
+
+Statistics of turbulent flows, like mean profiles, Reynolds stresses and
+energy spectra, are accumulated while the simulation runs, such that full
+fields never need to be stored for post-processing. For a channel flow
+with wall-normal direction along the first axis::
+
+    from shenfun import Moments, Spectrum, Statistics
+    stats = Statistics('channel', writeevery=1000,
+                       data={'uvw': Moments(ub, axes=(1, 2)),
+                             'Ex': Spectrum(u_, axes=(1,))})
+    for tstep in ...:
+        ...
+        stats.update(t, tstep)
+
+The moments are combined with the running moments of previous samples
+using the pairwise update of Chan, Golub and LeVeque, which reduces to
+Welford's algorithm for single samples. Averages over homogeneous
+directions are reduced over the subcommunicators of the distributed axes
+only. The accumulators are dumped to the HDF5 file ``filename.stats.h5``.
+
+"""
+import numpy as np
+from mpi4py import MPI
+
+__all__ = ['Moments', 'Spectrum', 'Statistics']
+
+
+class Moments:
+    """Running mean and covariances of fields in physical space
+
+    Parameters
+    ----------
+    fields : :class:`.Array` or :class:`.Function`, or sequence of these
+        The fields of a :class:`.TensorProductSpace`, or the components of
+        a vector. A :class:`.Function` is transformed to physical space
+        for each new sample.
+    axes : sequence of ints, optional
+        Homogeneous (Fourier) axes that are averaged over, e.g., the
+        streamwise and spanwise directions of a channel. The mean and
+        covariances are then profiles along the remaining axes.
+
+    Note
+    ----
+    The covariance of fields i and j, e.g., the Reynolds stress
+    :math:`\\overline{u'v'}`, is :code:`covariance[i, j]`.
+    """
+    def __init__(self, fields, axes=()):
+        from shenfun.forms.arguments import Function
+        if not isinstance(fields, (list, tuple)):
+            fields = [fields[i] for i in range(len(fields))] if fields.tensor_rank > 0 else [fields]
+        self.fields = list(fields)
+        self.T = T = fields[0].function_space()
+        self.axes = tuple(axes)
+        assert np.all([T.bases[ax].family() == 'fourier' for ax in self.axes])
+        self._spectral = [isinstance(f, Function) for f in fields]
+        self._arrays = [None]*len(fields)
+        pencil = T.forward.input_pencil
+        self._comms = [pencil.subcomm[ax] for ax in self.axes if pencil.subcomm[ax].Get_size() > 1]
+        shape = list(pencil.subshape)
+        for ax in self.axes:
+            shape[ax] = 1
+        F = len(fields)
+        self.npoints = int(np.prod([T.global_shape(False)[ax] for ax in self.axes]))
+        self.count = 0
+        self._mean = np.zeros((F,)+tuple(shape))
+        self._pairs = [(i, j) for i in range(F) for j in range(i, F)]
+        self._C = np.zeros((len(self._pairs),)+tuple(shape))
+
+    def _get_fields(self):
+        x = []
+        for i, (f, spectral) in enumerate(zip(self.fields, self._spectral)):
+            if spectral:
+                self._arrays[i] = f.backward(self._arrays[i])
+                f = self._arrays[i]
+            x.append(np.asarray(f).real)
+        return x
+
+    def _average(self, a):
+        # Mean over the homogeneous axes, also across processors
+        if not self.axes:
+            return a
+        a = np.sum(a, axis=self.axes, keepdims=True)
+        for comm in self._comms:
+            comm.Allreduce(MPI.IN_PLACE, a)
+        return a/self.npoints
+
+    def update(self):
+        """Add current fields as a new sample"""
+        x = self._get_fields()
+        mb = np.array([self._average(xi) for xi in x])
+        na, nb = self.count, self.npoints
+        n = na + nb
+        delta = mb - self._mean
+        self._mean += delta*(nb/n)
+        for p, (i, j) in enumerate(self._pairs):
+            if self.axes:
+                self._C[p] += nb*self._average((x[i]-mb[i])*(x[j]-mb[j]))
+            self._C[p] += delta[i]*delta[j]*(na*nb/n)
+        self.count = n
+
+    @property
+    def mean(self):
+        """Return mean of all fields"""
+        return self._mean
+
+    @property
+    def covariance(self):
+        """Return covariances of all pairs of fields"""
+        F = len(self.fields)
+        C = np.zeros((F, F)+self._C.shape[1:])
+        for p, (i, j) in enumerate(self._pairs):
+            C[i, j] = C[j, i] = self._C[p]/max(self.count, 1)
+        return C
+
+    def global_shape(self):
+        """Return global shape of mean of one field"""
+        shape = list(self.T.global_shape(False))
+        for ax in self.axes:
+            shape[ax] = 1
+        return tuple(shape)
+
+    def write(self, group):
+        """Store accumulators in group of an open HDF5 file
+
+        Parameters
+        ----------
+        group : h5py Group
+        """
+        s = list(self.T.local_slice(False))
+        for ax in self.axes:
+            s[ax] = slice(0, 1)
+        writer = np.all([comm.Get_rank() == 0 for comm in self._comms])
+        shape = self.global_shape()
+        for name, val in (('mean', self._mean), ('C', self._C)):
+            dset = group.require_dataset(name, shape=val.shape[:1]+shape, dtype=val.dtype)
+            if writer:
+                dset[(slice(None),)+tuple(s)] = val
+        group.attrs['count'] = self.count
+        group.attrs['pairs'] = np.array(self._pairs)
+
+
+class Spectrum:
+    """Running mean of energy spectra computed from spectral coefficients
+
+    The energy :math:`|\\hat{u}|^2` of a :class:`.Function` is collected
+    in bins of the absolute integer wavenumber along the Fourier axes
+    ``axes``, and summed over the remaining Fourier axes. Along
+    non-periodic axes the spectrum is a profile on the quadrature mesh,
+    such that :code:`spectrum[j].sum()` is the plane average of
+    :math:`u^2` at mesh point j of a channel.
+
+    Parameters
+    ----------
+    u : :class:`.Function`
+        Scalar or vector Function. The energy is summed over components.
+    axes : sequence of ints, optional
+        One or two Fourier axes of the spectrum
+
+    Note
+    ----
+    The non-periodic axes must not be distributed in spectral space, which
+    is the case for the first axis by default.
+    """
+    def __init__(self, u, axes=(-1,)):
+        from shenfun.fourier.bases import R2C
+        self.u = u
+        self.T = T = u.function_space()
+        if u.tensor_rank > 0:
+            self.T = T = T.flatten()[0]
+        D = T.dimensions
+        self.axes = tuple(ax % D for ax in axes)
+        assert 1 <= len(self.axes) <= 2
+        fourier = [base.family() == 'fourier' for base in T.bases]
+        assert np.all([fourier[ax] for ax in self.axes])
+        pencil = T.forward.output_pencil
+        self._nonperiodic = [ax for ax in range(D) if not fourier[ax]]
+        assert np.all([pencil.subcomm[ax].Get_size() == 1 for ax in self._nonperiodic])
+        self._summed = tuple(ax for ax in range(D) if fourier[ax] and ax not in self.axes)
+        k = T.local_wavenumbers(scaled=False)
+        self._bins = [np.abs(k[ax]).astype(int) for ax in self.axes]
+        # Weights of Hermitian symmetry along the R2C axis
+        self._weights = 1
+        for ax, base in enumerate(T.bases):
+            if isinstance(base, R2C):
+                kr = np.abs(k[ax])
+                self._weights = 1 + ((kr > 0) & (2*kr < base.N))
+        shape = [T.global_shape(False)[ax] for ax in self._nonperiodic]
+        shape += [T.bases[ax].N//2+1 for ax in self.axes]
+        self.count = 0
+        self._spectrum = np.zeros(shape)
+
+    def _energy(self):
+        # Energy density of all components on the local mesh of the
+        # non-periodic axes
+        e = 0
+        u = self.u
+        for c in ([u[i] for i in range(len(u))] if u.tensor_rank > 0 else [u]):
+            for ax in self._nonperiodic:
+                c = self.T.bases[ax].backward(c)
+            e = e + np.abs(c)**2
+        return e*self._weights
+
+    def update(self):
+        """Add spectrum of current u as a new sample"""
+        e = self._energy()
+        if self._summed:
+            e = np.sum(e, axis=self._summed, keepdims=True)
+        E = np.zeros_like(self._spectrum)
+        ix = [np.arange(e.shape[ax]).reshape([-1 if i == ax else 1 for i in range(e.ndim)])
+              for ax in self._nonperiodic]
+        ix += list(self._bins)
+        ix = np.broadcast_arrays(*ix, e)
+        np.add.at(E, tuple(ix[:-1]), ix[-1])
+        self.T.comm.Allreduce(MPI.IN_PLACE, E)
+        self.count += 1
+        self._spectrum += (E-self._spectrum)/self.count
+
+    @property
+    def spectrum(self):
+        """Return mean spectrum, with non-periodic axes first"""
+        return self._spectrum
+
+    def wavenumbers(self):
+        """Return the wavenumbers of the bins of all spectrum axes"""
+        k = []
+        for ax in self.axes:
+            base = self.T.bases[ax]
+            L = float(base.domain[1]-base.domain[0])
+            k.append(np.arange(base.N//2+1)*2*np.pi/L)
+        return k
+
+    def correlation(self):
+        """Return two-point correlation along the axis of a 1D spectrum
+
+        The correlation of separations ``r = j*L/N``, ``j = 0, ..., N-1``,
+        along the last axis, computed from the mean spectrum.
+        """
+        assert len(self.axes) == 1
+        N = self.T.bases[self.axes[0]].N
+        j = np.arange(N)
+        k = np.arange(N//2+1)
+        return np.dot(self._spectrum, np.cos(2*np.pi*np.outer(k, j)/N))
+
+    def write(self, group):
+        """Store accumulators in group of an open HDF5 file
+
+        Parameters
+        ----------
+        group : h5py Group
+        """
+        dset = group.require_dataset('spectrum', shape=self._spectrum.shape,
+                                     dtype=self._spectrum.dtype)
+        if self.T.comm.Get_rank() == 0:
+            dset[...] = self._spectrum
+        group.attrs['count'] = self.count
+
+
+class Statistics:
+    """Class for accumulating statistics during simulations
+
+    Parameters
+    ----------
+    filename : str
+        Name of file, without ending. The statistics are stored in
+        ``filename.stats.h5``
+    writeevery : int, optional
+        Store accumulators every writeevery time step
+    updateevery : int, optional
+        Add new sample every updateevery time step
+    data : dict, optional
+        Named accumulators, e.g., :class:`.Moments` and :class:`.Spectrum`
+    """
+    def __init__(self, filename, writeevery=100, updateevery=1, data={}):
+        self.filename = filename
+        self.writeevery = writeevery
+        self.updateevery = updateevery
+        self.data = data
+
+    def update(self, t, tstep):
+        """Add samples and store accumulators, if the time step is right
+
+        Parameters
+        ----------
+        t : float
+            Time
+        tstep : int
+            Time step
+        """
+        if tstep % self.updateevery == 0:
+            for acc in self.data.values():
+                acc.update()
+        if tstep % self.writeevery == 0:
+            self.write(t, tstep)
+
+    def write(self, t, tstep):
+        """Store all accumulators with parallel HDF5"""
+        import h5py
+        comm = list(self.data.values())[0].T.comm
+        f = h5py.File(self.filename+'.stats.h5', 'a', driver="mpio", comm=comm)
+        for name, acc in self.data.items():
+            acc.write(f.require_group(name))
+        f.attrs['t'] = t
+        f.attrs['tstep'] = tstep
+        f.close()
@@ -0,0 +1,201 @@
+"""
+Module for built-in timers and counters
+
+Named timers are used to measure the time spent in the different phases
+of a simulation, like transforms, global redistribution of data (transfer),
+linear solvers, assembling of linear forms and time integrators. The
+timers are disabled by default and turned on with::
+
+    from shenfun import config, timers
+    config['profiling']['timers'] = True
+
+Timers are nested, such that a timer started inside another gets a name
+prefixed with the name of the outer, e.g., 'backward/transfer'. A report
+with minimum, average and maximum times over all MPI processes is printed
+with::
+
+    timers.report()
+
+Timers may also be used in user code::
+
+    with timers('nonlinear'):
+        ...
+
+"""
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+from functools import wraps
+import numpy as np
+from mpi4py import MPI
+from shenfun.config import config
+
+__all__ = ['timers', 'timed', 'Timers']
+
+_nocontext = nullcontext()
+
+class _Phase:
+    """Context manager for one timed phase"""
+    __slots__ = ('timers', 'name', 't0')
+
+    def __init__(self, timers, name):
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+        stack = self.timers._stack
+        self.name = stack[-1]+'/'+self.name if stack else self.name
+        stack.append(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        dt = time.perf_counter()-self.t0
+        t = self.timers
+        t._stack.pop()
+        t.elapsed[self.name] += dt
+        t.calls[self.name] += 1
+
+class Timers:
+    """Collection of named, nestable wall-clock timers and counters
+
+    Use an instance as a context manager factory::
+
+        timers = Timers()
+        with timers('solve'):
+            ...
+
+    Nothing is measured unless ``config['profiling']['timers']`` is True.
+    """
+    def __init__(self):
+        self.elapsed = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._stack = []
+
+    def __call__(self, name):
+        if config['profiling']['timers']:
+            return _Phase(self, name)
+        return _nocontext
+
+    def count(self, name, n=1):
+        """Add n to counter name
+
+        Parameters
+        ----------
+        name : str
+        n : int, optional
+        """
+        if config['profiling']['timers']:
+            self.counters[name] += n
+
+    def reset(self):
+        """Reset all timers and counters"""
+        self.elapsed.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self._stack.clear()
+
+    def summary(self, comm=MPI.COMM_WORLD):
+        """Return timings reduced over all processes in comm
+
+        Parameters
+        ----------
+        comm : MPI communicator, optional
+
+        Returns
+        -------
+        dict
+            For each timer name a tuple (calls, min, avg, max), where the
+            number of calls is for this process, and the times are reduced
+            over all processes in comm. Counters are included, with names
+            prefixed by '#', and their totals over all processes in place
+            of the times.
+        """
+        names = sorted(set().union(*comm.allgather(set(self.elapsed))))
+        local = np.array([self.elapsed.get(name, 0.0) for name in names])
+        tmin = np.zeros_like(local)
+        tmax = np.zeros_like(local)
+        tsum = np.zeros_like(local)
+        comm.Allreduce(local, tmin, op=MPI.MIN)
+        comm.Allreduce(local, tmax, op=MPI.MAX)
+        comm.Allreduce(local, tsum, op=MPI.SUM)
+        size = comm.Get_size()
+        result = {}
+        for i, name in enumerate(names):
+            result[name] = (self.calls.get(name, 0), tmin[i], tsum[i]/size, tmax[i])
+        counters = sorted(set().union(*comm.allgather(set(self.counters))))
+        local = np.array([self.counters.get(name, 0) for name in counters], dtype=np.int64)
+        total = np.zeros_like(local)
+        comm.Allreduce(local, total, op=MPI.SUM)
+        for name, n in zip(counters, total):
+            result['#'+name] = (int(n),)*4
+        return result
+
+    def report(self, comm=MPI.COMM_WORLD, per_rank=False, file=None):
+        """Print report of all timers and counters
+
+        Parameters
+        ----------
+        comm : MPI communicator, optional
+        per_rank : bool, optional
+            Print the local timings of each process, in turn, in addition
+            to the reduced timings.
+        file : file object, optional
+            Print to this file instead of stdout
+
+        Returns
+        -------
+        str
+            The reduced report on rank 0 of comm, and an empty string
+            on the other ranks
+        """
+        summary = self.summary(comm)
+        rank = comm.Get_rank()
+        if per_rank:
+            for i in range(comm.Get_size()):
+                if i == rank:
+                    lines = ['Rank %d' % rank]
+                    for name in sorted(self.elapsed):
+                        lines.append('%-40s %10d %12.4e' % (name, self.calls[name], self.elapsed[name]))
+                    print('\n'.join(lines), file=file, flush=True)
+                comm.Barrier()
+        if rank > 0:
+            return ''
+        lines = ['%-40s %10s %12s %12s %12s' % ('Timer', 'Calls', 'Min', 'Avg', 'Max')]
+        for name, (calls, tmin, tavg, tmax) in summary.items():
+            if name.startswith('#'):
+                lines.append('%-40s %10d' % (name, calls))
+            else:
+                lines.append('%-40s %10d %12.4e %12.4e %12.4e' % (name, calls, tmin, tavg, tmax))
+        s = '\n'.join(lines)
+        print(s, file=file)
+        return s
+
+timers = Timers()
+
+def timed(name=None):
+    """Decorator for timing a function or method with :data:`.timers`
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of timer. If None, then use the name of the function, or, for
+        methods, the name of the class and the method. The method name is
+        dropped for ``__call__``.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            if not config['profiling']['timers']:
+                return func(*args, **kwargs)
+            label = name
+            if label is None:
+                label = func.__name__
+                if '.' in func.__qualname__ and len(args) > 0:
+                    cls = type(args[0]).__name__
+                    label = cls if label == '__call__' else cls+'.'+label
+            with timers(label):
+                return func(*args, **kwargs)
+        return wrapped
+    return decorator
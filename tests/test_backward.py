@@ -107,6 +107,27 @@ def test_backward_uniform(family):
     fj = sp.lambdify(x, f)(xj)
     assert np.linalg.norm(fj-ub) < 1e-8
 
+@pytest.mark.parametrize('family', 'CLUJ')
+def test_backward_resample(family):
+    from shenfun.config import config
+    B = FunctionSpace(2*N, family, domain=(-2, 2))
+    F = FunctionSpace(N, 'F', dtype='d')
+    T = TensorProductSpace(comm, (B, F))
+    uT = Function(T, buffer=ff)
+    method = config['transforms']['resample']['method']
+    try:
+        config['transforms']['resample']['method'] = 'vandermonde'
+        u0 = uT.backward(mesh='uniform').copy()
+        config['transforms']['resample']['method'] = 'interpolate'
+        u1 = uT.backward(mesh='uniform').copy()
+    finally:
+        config['transforms']['resample']['method'] = method
+    xj, yj = T.local_mesh(bcast=True, kind='uniform')
+    fj = sp.lambdify((x, y), ff)(xj, yj)
+    assert np.linalg.norm(u1-u0) < 1e-8
+    assert np.linalg.norm(fj-u1) < 1e-8
+    T.destroy()
+
 @pytest.mark.parametrize('family', 'CL')
 def test_padding(family):
     N = 8
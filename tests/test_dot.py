@@ -59,6 +59,74 @@ def test_dot_curvilinear():
     T.destroy()
     config['basisvectors'] = basisvectors
 
+def test_cross_curvilinear():
+    from shenfun import cross
+    from shenfun.utilities import get_contraction, contract
+    basisvectors = config['basisvectors']
+    config['basisvectors'] = 'covariant'
+    r, theta, z = psi = sp.symbols('x,y,z', real=True, positive=True)
+    rv = (r*sp.cos(theta), r*sp.sin(theta), z)
+    D0 = FunctionSpace(8, 'L', domain=(0.5, 1))
+    F1 = FunctionSpace(8, 'F', dtype='D')
+    F2 = FunctionSpace(8, 'F', dtype='d')
+    T = TensorProductSpace(comm, (D0, F1, F2), coordinates=(psi, rv))
+    V = VectorSpace(T)
+    a = Array(V, buffer=np.random.random(Array(V).shape))
+    b = Array(V, buffer=np.random.random(Array(V).shape))
+    c = Array(V)
+    c = cross(c, a, b)
+    rr = T.local_mesh(True)[0]
+    assert np.allclose(c[0], rr*(a[1]*b[2]-a[2]*b[1]))
+    assert np.allclose(c[1], (a[2]*b[0]-a[0]*b[2])/rr)
+    assert np.allclose(c[2], rr*(a[0]*b[1]-a[1]*b[0]))
+    g, terms, coef = get_contraction(V, 'cross')
+    assert get_contraction(V, 'cross')[0] is g
+    c1 = np.zeros((3, g.shape[1]))
+    c1 = contract.func(c1, a.reshape((3, -1)), b.reshape((3, -1)), g, terms, coef)
+    assert np.allclose(c1, c.reshape((3, -1)))
+    threads = config['optimization']['num_threads']
+    config['optimization']['num_threads'] = 2
+    c2 = cross(Array(V), a, b)
+    assert np.allclose(c2, c)
+    config['optimization']['num_threads'] = threads
+    config['basisvectors'] = basisvectors
+    T.destroy()
+
+@pytest.mark.parametrize('dim', (2, 3))
+def test_outer(dim):
+    from shenfun import outer
+    from shenfun.utilities import get_contraction, fused_product, contract, \
+        outer2D, outer3D
+    bases = [FunctionSpace(6, 'C')] + [FunctionSpace(6, 'F', dtype='D')]*(dim-2) + [FunctionSpace(6, 'F', dtype='d')]
+    T = TensorProductSpace(comm, bases)
+    V = VectorSpace(T)
+    S = TensorSpace(T)
+    a = Array(V, buffer=np.random.random(Array(V).shape))
+    b = Array(V, buffer=np.random.random(Array(V).shape))
+    ab = np.einsum('i...,j...->ij...', a, b).reshape(Array(S).shape)
+    assert np.allclose(outer(a, b, Array(S)), ab)
+    assert np.allclose(outer(a, a, Array(S)), np.einsum('i...,j...->ij...', a, a).reshape(ab.shape))
+    # Non-contiguous output
+    g, terms, coef = get_contraction(V, 'outer')
+    c = np.zeros(ab.shape[:1]+(2,)+ab.shape[1:])[:, 1]
+    assert not c.flags.c_contiguous
+    c = fused_product(c, a, b, g, terms, coef)
+    assert np.allclose(c, ab)
+    # Python kernels
+    outerND = outer2D if dim == 2 else outer3D
+    for u in (a, b):
+        c = np.zeros_like(ab)
+        outerND.func(a.v, u.v, c, u is a)
+        assert np.allclose(c, np.einsum('i...,j...->ij...', a, u).reshape(ab.shape))
+    # Components without terms are zero for all backends
+    sub = terms[:, 0] % (dim+1) == 0 # the diagonal
+    cf = np.ones((dim*dim, g.shape[1]))
+    cf = contract(cf, a.reshape((dim, -1)), b.reshape((dim, -1)), g, terms[sub].copy(), coef[sub].copy())
+    c0 = contract.func(np.ones_like(cf), a.reshape((dim, -1)), b.reshape((dim, -1)), g, terms[sub], coef[sub])
+    assert np.allclose(cf, c0)
+    assert np.allclose(cf[1], 0)
+    T.destroy()
+
 if __name__ == '__main__':
     import sys
     #test_dot()
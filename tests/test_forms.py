@@ -162,6 +162,85 @@ def test_inner():
     inner(curl(h), curl(w))
     inner(h, grad(div(w)))
 
+@pytest.mark.parametrize('family', ('C', 'L'))
+def test_Inner(family):
+    from shenfun.forms.inner import Inner
+    D = shenfun.FunctionSpace(N, family, bc=(-1, 1))
+    F = shenfun.FunctionSpace(N, 'F', dtype='d')
+    C = shenfun.FunctionSpace(N, 'F', dtype='D')
+    for S in (shenfun.TensorProductSpace(comm, (D, F)),
+              shenfun.TensorProductSpace(comm, (C, D, F))):
+        W = shenfun.VectorSpace(S)
+        for v, uh in ((shenfun.TestFunction(S), shenfun.Function(S)),
+                      (shenfun.TestFunction(W), shenfun.Function(W))):
+            uh[:] = np.random.random(uh.shape)
+            expr = div(grad(uh)) + shenfun.Dx(uh, 0, 1) + shenfun.Dx(uh, 1, 2)
+            c = Inner(v, expr)()
+            c0 = np.zeros_like(c)
+            w0 = np.zeros_like(c)
+            ub = uh.base if uh.base is not None else uh
+            for mat in inner(v, expr, return_matrices=True):
+                if uh.rank == 1:
+                    i, j = mat.global_index
+                    w0[i] = mat.matvec(ub.v[j], w0[i])
+                    c0[i] += w0[i]
+                else:
+                    w0 = mat.matvec(ub, w0)
+                    c0 += w0
+            assert np.linalg.norm(c-c0) < 1e-8
+
+@pytest.mark.parametrize('family', ('C', 'L', 'F'))
+def test_Inner_4D(family):
+    from shenfun.forms.inner import Inner
+    from shenfun.forms.project import Project
+    B = shenfun.FunctionSpace(6, family, dtype='D') if family == 'F' else shenfun.FunctionSpace(6, family)
+    C = shenfun.FunctionSpace(5, 'F', dtype='D')
+    F = shenfun.FunctionSpace(4, 'F', dtype='d')
+    S = shenfun.TensorProductSpace(comm, (B, C, C, F))
+    uh = shenfun.Function(S)
+    uh[:] = np.random.random(uh.shape)
+    v = shenfun.TestFunction(S)
+    expr = div(grad(uh)) + shenfun.Dx(uh, 0, 1)
+    assert np.linalg.norm(Inner(v, expr)()-inner(v, expr)) < 1e-8
+    if family == 'F':
+        assert np.linalg.norm(Project(expr, S)()-shenfun.project(expr, S)) < 1e-8
+    S.destroy()
+
+def test_FusedMatvec():
+    from shenfun.matrixbase import FusedMatvec, SparseMatrix
+    def check(mats, u, kinds):
+        fused = FusedMatvec(mats)
+        c = np.zeros_like(u)
+        assert [g[2] for g in fused.assemble(u, c)] == kinds
+        c0 = np.zeros_like(u)
+        w0 = np.zeros_like(u)
+        for mat in mats:
+            c0 += mat.matvec(u, w0)
+        assert np.allclose(fused(u, c), c0)
+    u = np.random.random(12)
+    banded = SparseMatrix({-2: 1., 0: 2., 2: 3.}, (12, 12))
+    check([banded, banded*2], u, [0])
+    # Dense matrix with more than maxdiags diagonals
+    dense = SparseMatrix({k: 1. for k in range(12)}, (12, 12))
+    check([banded, dense], u, [0, 'other'])
+    # Matrices of different shapes
+    check([banded, SparseMatrix({0: 1.}, (10, 12))], u, [0, 0])
+    # Matrix with its own matvec
+    SD = shenfun.FunctionSpace(12, 'C', bc=(0, 0))
+    A = inner(shenfun.TestFunction(SD), div(grad(shenfun.TrialFunction(SD))))
+    check([A], u[:10].copy(), ['other'])
+    # Operand distributed along the axis of the matrix, holding fewer columns
+    assert FusedMatvec([banded]).assemble(u[:6], u[:6])[0][2] == 'other'
+    # 4D
+    C = shenfun.FunctionSpace(4, 'F', dtype='D')
+    F = shenfun.FunctionSpace(4, 'F', dtype='d')
+    S = shenfun.TensorProductSpace(comm, (shenfun.FunctionSpace(6, 'L'), C, C, F))
+    uh = shenfun.Function(S)
+    uh[:] = np.random.random(uh.shape)
+    M = inner(shenfun.TestFunction(S), shenfun.TrialFunction(S))
+    check([M], uh, ['other'])
+    S.destroy()
+
 def test_tensor2():
     B0 = shenfun.FunctionSpace(8, 'C')
     T = shenfun.TensorProductSpace(comm, (B0, B0))
@@ -179,6 +258,20 @@ def test_tensor2():
     #assert np.allclose(g.v[2], 0)
     #assert np.allclose(g.v[3], 2)
 
+def test_exports():
+    import importlib
+    for mod, names in shenfun._exports.items():
+        module = importlib.import_module('shenfun.'+mod)
+        if hasattr(module, '__all__'):
+            assert sorted(names) == sorted(module.__all__), mod
+        for name in names:
+            assert getattr(shenfun, name) is getattr(module, name)
+    assert shenfun.arguments is shenfun.forms.arguments
+    assert shenfun.operators is shenfun.forms.operators
+    ns = {}
+    exec('from shenfun import *', ns)
+    assert 'arguments' in ns and 'operators' in ns and 'Inner' in ns
+
 if __name__ == '__main__':
     # test_mul(u2)
     #test_imul(u2)
@@ -0,0 +1,210 @@
+import pytest
+import numpy as np
+import sympy as sp
+from mpi4py import MPI
+from shenfun import FunctionSpace, TensorProductSpace, Function, Array, \
+    TestFunction, Expr, div, grad, IMEXRK111, IMEXRK222, IMEXRK443, IMEXRK3, \
+    IMEXARK324L2SA, RK4, ETD, ETDRK4, PIController, error_norm, CNAB2, \
+    SBDF2, SBDF3, SBDF4
+from shenfun.utilities.integrators import DenseAxisOperator
+
+comm = MPI.COMM_WORLD
+x, y, t = sp.symbols('x,y,t', real=True)
+
+def convergence_order(errors, dts):
+    return np.log(errors[0]/errors[1])/np.log(dts[0]/dts[1])
+
+def solve_imex(integrator, T, ue, g, dt, end_time, dt_change=1):
+    # Solve u_t = div(grad(u)) - u + g. Multiply dt by dt_change half way
+    u = Function(T, buffer=ue.subs(t, 0))
+    N = [-Expr(u)] + ([Function(T, buffer=g)] if g != 0 else [])
+    v = TestFunction(T)
+    pde = integrator(v, u, lambda f: div(grad(f)), N, dt)
+    pde.assemble()
+    time = 0
+    while time < end_time-1e-12:
+        if time > end_time/2-1e-12:
+            pde.dt = dt*dt_change
+        for rk in range(pde.steps()):
+            pde.compute_rhs(rk)
+            pde.solve_step(rk)
+        time += pde.dt
+    return np.abs(u.backward()-Array(T, buffer=ue.subs(t, end_time))).max()
+
+imex = [(IMEXRK111, 1), (IMEXRK222, 2), (IMEXRK443, 3), (IMEXRK3, 2)]
+
+@pytest.mark.parametrize('integrator,order', imex)
+@pytest.mark.parametrize('family', ('C', 'L'))
+def test_imex_1D(integrator, order, family):
+    s = 1.5+0.5*x
+    ue = sp.exp(-(sp.pi**2+1)*t)*sp.sin(sp.pi*x) + s
+    D = FunctionSpace(24, family, bc=(1, 2))
+    dts = (0.01, 0.005)
+    errors = [solve_imex(integrator, D, ue, s, dt, 0.1) for dt in dts]
+    assert convergence_order(errors, dts) > order-0.2
+    assert errors[1] < 0.1**order
+
+@pytest.mark.parametrize('integrator,order', imex)
+@pytest.mark.parametrize('family', ('C', 'L'))
+def test_imex_2D(integrator, order, family):
+    ue = sp.exp(-(sp.pi**2+2)*t)*sp.sin(sp.pi*x)*sp.cos(y)
+    D = FunctionSpace(24, family, bc=(0, 0))
+    F = FunctionSpace(8, 'F', dtype='d')
+    T = TensorProductSpace(comm, (D, F))
+    dts = (0.01, 0.005)
+    errors = [solve_imex(integrator, T, ue, 0, dt, 0.1) for dt in dts]
+    assert convergence_order(errors, dts) > order-0.2
+    assert errors[1] < 0.1**order
+    T.destroy()
+
+def test_stage_matrices(monkeypatch):
+    # New time steps use the operators assembled once, also for boundary matrices
+    from shenfun.utilities import integrators
+    s = 1.5+0.5*x
+    D = FunctionSpace(24, 'C', bc=(1, 2))
+    dts = (0.01, 0.02, 0.01, 0.02)
+    def solve(reassemble):
+        u = Function(D, buffer=sp.sin(sp.pi*x) + s)
+        N = Function(D, buffer=s)
+        L = lambda f: div(grad(f)) - f # with boundary matrices
+        pde = IMEXRK222(TestFunction(D), u, L, N, dts[0])
+        pde.assemble()
+        if not reassemble:
+            monkeypatch.setattr(integrators, 'inner', inner)
+        for dt in dts:
+            if reassemble:
+                pde = IMEXRK222(TestFunction(D), u, L, N, dt)
+                pde.assemble()
+            pde.dt = dt
+            for rk in range(pde.steps()):
+                pde.compute_rhs(rk)
+                pde.solve_step(rk)
+        return u, pde
+    def inner(*args, **kw):
+        raise AssertionError('forms assembled after assemble')
+    u0 = solve(True)[0]
+    u1, pde = solve(False)
+    assert len(pde.solvers) == 2
+    assert np.allclose(u0, u1)
+
+def test_error_norm():
+    e = np.full(4, 1e-3)
+    u0 = np.array([0, 1, 2, 3.])
+    assert np.isclose(error_norm(e, u0, atol=1e-3, rtol=0), 1)
+    # Scaled with 1e-3*(1, 3, 5, 7)
+    assert np.isclose(error_norm(e, u0, 2*u0, atol=1e-3, rtol=1e-3),
+                      np.sqrt(np.mean(1/np.array([1, 3, 5, 7])**2)))
+
+def test_pi_controller():
+    c = PIController(2)
+    accepted, dt = c(8, 0.1)
+    assert not accepted
+    assert np.isclose(dt, 0.1*0.9*8**(-1/3))
+    accepted, dt = c(0.5, 0.1)
+    assert accepted and dt == 0.1 # within deadband
+    accepted, dt = c(1e-12, 0.1)
+    assert accepted and np.isclose(dt, 0.5) # facmax
+    c = PIController(2, dtmin=0.1, dtmax=0.3)
+    assert c(10, 0.1) == (True, 0.1)
+    assert c(1e-12, 0.1) == (True, 0.3)
+
+def LinearRHS(self, u, **params):
+    return div(grad(u))
+
+def NonlinearRHS(self, u, u_hat, rhs, **params):
+    u = u_hat.backward(u)
+    return (-u*u).forward(rhs)
+
+@pytest.mark.parametrize('integrator', (RK4, ETDRK4))
+def test_solve_adaptive(integrator):
+    # u_t = -u**2 with solution 1/(1+t)
+    F = FunctionSpace(8, 'F', dtype='d')
+    errors = []
+    for tol in (1e-5, 1e-8):
+        u = Array(F)
+        u[:] = 1
+        u_hat = u.forward()
+        solver = integrator(F, L=LinearRHS, N=NonlinearRHS)
+        solver.solve_adaptive(u, u_hat, 0.5, (0, 2), atol=tol, rtol=tol)
+        errors.append(np.abs(u_hat.backward()-1/3).max())
+        assert errors[-1] < tol
+        assert solver.nrejected > 0 # the first step is too long
+        assert np.isclose(sum(solver.dts), 2)
+    assert errors[1] < errors[0]/100
+
+@pytest.mark.parametrize('family', ('C', 'L'))
+def test_imexark324(family):
+    s = 1.5+0.5*x
+    ue = sp.exp(-(sp.pi**2+1)*t)*sp.sin(sp.pi*x) + s
+    D = FunctionSpace(24, family, bc=(1, 2))
+    dts = (0.01, 0.005)
+    errors = [solve_imex(IMEXARK324L2SA, D, ue, s, dt, 0.1) for dt in dts]
+    assert convergence_order(errors, dts) > 2.8
+
+    # Adaptive time steps
+    errors = []
+    for tol in (1e-4, 1e-6):
+        u = Function(D, buffer=ue.subs(t, 0))
+        pde = IMEXARK324L2SA(TestFunction(D), u, lambda f: div(grad(f)),
+                             [-Expr(u), Function(D, buffer=s)], 0.5)
+        pde.assemble()
+        controller = PIController(IMEXARK324L2SA.embedded_order)
+        time, end_time, nrejected = 0, 0.5, 0
+        while time < end_time-1e-12:
+            pde.dt = min(pde.dt, end_time-time)
+            for rk in range(pde.steps()):
+                pde.compute_rhs(rk)
+                pde.solve_step(rk)
+            accepted, dt = controller(pde.error_norm(tol, tol), pde.dt)
+            if accepted:
+                time += pde.dt
+            else:
+                pde.reject()
+                nrejected += 1
+            pde.dt = dt
+        assert nrejected > 0
+        errors.append(np.abs(u.backward()-Array(D, buffer=ue.subs(t, end_time))).max())
+        assert errors[-1] < 10*tol
+    assert errors[1] < errors[0]/10
+
+def LinearDecay(self, u, u_hat, rhs, **params):
+    rhs[:] = -u_hat
+    return rhs
+
+@pytest.mark.parametrize('integrator,order,dts', ((ETD, 1, (0.02, 0.01)),
+                                                  (ETDRK4, 4, (0.1, 0.05))))
+@pytest.mark.parametrize('family', ('C', 'L'))
+@pytest.mark.parametrize('dim', (1, 2))
+def test_etd_dense(integrator, order, dts, family, dim):
+    # u_t = div(grad(u)) - u, with the linear operator dense along x
+    D = FunctionSpace(24, family, bc=(0, 0))
+    if dim == 1:
+        T = D
+        ue = sp.exp(-(sp.pi**2+1)*t)*sp.sin(sp.pi*x)
+    else:
+        T = TensorProductSpace(comm, (D, FunctionSpace(8, 'F', dtype='d')))
+        ue = sp.exp(-(sp.pi**2+2)*t)*sp.sin(sp.pi*x)*sp.cos(y)
+    errors = []
+    for dt in dts:
+        u_hat = Function(T, buffer=ue.subs(t, 0))
+        solver = integrator(T, L=LinearRHS, N=LinearDecay)
+        solver.solve(Array(T), u_hat, dt, (0, 0.4))
+        assert isinstance(solver.L, DenseAxisOperator)
+        errors.append(np.abs(u_hat.backward()-Array(T, buffer=ue.subs(t, 0.4))).max())
+    assert convergence_order(errors, dts) > order-0.2
+    if dim == 2:
+        T.destroy()
+
+@pytest.mark.parametrize('integrator,order', ((CNAB2, 2), (SBDF2, 2), (SBDF3, 3), (SBDF4, 4)))
+@pytest.mark.parametrize('dt_change', (1, 0.5))
+def test_imex_multistep(integrator, order, dt_change):
+    s = 1.5+0.5*x
+    ue = sp.exp(-(sp.pi**2+1)*t)*sp.sin(sp.pi*x) + s
+    D = FunctionSpace(24, 'C', bc=(1, 2))
+    dts = (0.01, 0.005)
+    errors = [solve_imex(integrator, D, ue, s, dt, 0.2, dt_change) for dt in dts]
+    assert convergence_order(errors, dts) > order-0.2
+
+if __name__ == '__main__':
+    test_imex_1D(IMEXRK443, 3, 'C')
+    test_imex_2D(IMEXRK222, 2, 'C')
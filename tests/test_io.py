@@ -5,7 +5,7 @@ from mpi4py import MPI
 import pytest
 #from mpi4py_fft import generate_xdmf
 from shenfun import FunctionSpace, TensorProductSpace, ShenfunFile, Function,\
-    Array, CompositeSpace, VectorSpace, generate_xdmf
+    Array, CompositeSpace, VectorSpace, generate_xdmf, Checkpoint, read_refined
 
 N = (12, 13, 14, 15)
 comm = MPI.COMM_WORLD
@@ -162,6 +162,54 @@ def test_mixed_3D(backend, forward_output, as_scalar):
     T.destroy()
     cleanup()
 
+def get_global(u):
+    g = np.zeros(u.global_shape, dtype=u.dtype)
+    g[u.local_slice()] = u
+    comm.Allreduce(MPI.IN_PLACE, g)
+    return g
+
+@pytest.mark.parametrize('family', ('C', 'L'))
+def test_read_refined(family):
+    bases = lambda N: (FunctionSpace(N[0], 'F', dtype='D'),
+                       FunctionSpace(N[1], family, bc=(1, 2)),
+                       FunctionSpace(N[2], 'F', dtype='d'))
+    N0, N1 = (12, 14, 13), (16, 19, 17)
+    T0 = TensorProductSpace(comm, bases(N0))
+    T1 = TensorProductSpace(comm, bases(N1))
+    u = Function(T0)
+    u[:] = np.random.random(u.shape) + 1j*np.random.random(u.shape)
+    u = u.backward().forward()
+    # Pad, as Function.refine, and truncate back
+    u1 = read_refined(get_global(u), Function(T1), N=N0)
+    assert np.allclose(u1, u.refine(N1))
+    u0 = read_refined(get_global(u1), Function(T0), N=N1)
+    assert np.allclose(u0, u)
+
+    V0, V1 = VectorSpace(T0), VectorSpace(T1)
+    uv = Function(V0)
+    uv[0] = u
+    uv[1] = 2*u
+    uv1 = read_refined(get_global(uv), Function(V1), N=N0)
+    assert np.allclose(uv1[1], 2*u1)
+    T0.destroy()
+    T1.destroy()
+
+def test_checkpoint_refined():
+    if skip['hdf5']:
+        return
+    T0 = TensorProductSpace(comm, (FunctionSpace(12, 'C', bc=(0, 0)),
+                                   FunctionSpace(12, 'F', dtype='d')))
+    T1 = TensorProductSpace(comm, (FunctionSpace(16, 'C', bc=(0, 0)),
+                                   FunctionSpace(16, 'F', dtype='d')))
+    u = Function(T0, buffer='(1-x**2)*cos(y)')
+    chk = Checkpoint('refined', checkevery=1, data={'0': {'u': [u]}})
+    chk.update(0.0, 0)
+    u1 = Function(T1)
+    chk.read(u1, 'u', step=0)
+    assert np.allclose(u1, u.refine((16, 16)))
+    T0.destroy()
+    T1.destroy()
+    cleanup()
 
 if __name__ == '__main__':
     for bnd in ('hdf5', 'netcdf4'):
@@ -1,3 +1,4 @@
+from io import StringIO
 import numpy as np
 import pytest
 from shenfun import SparseMatrix, la
@@ -47,6 +48,255 @@ def test_XDMA(di):
     assert np.allclose(uh2, uh)
     assert np.allclose(uh[:, 0], u_hat)
 
+@pytest.mark.parametrize('solver', ('CG', 'MINRES', 'GMRES', 'BiCGStab'))
+def test_krylov(solver):
+    from shenfun import FunctionSpace, TensorProductSpace, TrialFunction, \
+        TestFunction, Function, Array, inner, grad, comm
+    D = FunctionSpace(12, 'L', bc=(0, 0))
+    T = TensorProductSpace(comm, (D, D))
+    u = TrialFunction(T)
+    v = TestFunction(T)
+    A = inner(grad(v), grad(u))
+    b = inner(v, Array(T, val=1))
+    ue = la.SolverGeneric2ND(A)(b.copy(), Function(T))
+    sol = getattr(la, solver)(A, tol=1e-12)
+    uh = sol(b)
+    assert sol.converged
+    assert 0 < sol.niter < len(sol.residuals)
+    assert np.allclose(uh, ue)
+
+@pytest.mark.parametrize('solver', ('MINRES', 'GMRES'))
+def test_krylov_block(solver):
+    from shenfun import FunctionSpace, TensorProductSpace, VectorSpace, \
+        CompositeSpace, TrialFunction, TestFunction, Function, Array, inner, \
+        grad, div, comm
+    K0 = FunctionSpace(8, 'F', dtype='d')
+    SD = FunctionSpace(10, 'L', bc=(0, 0))
+    ST = FunctionSpace(10, 'L')
+    TD = TensorProductSpace(comm, (K0, SD))
+    TT = TensorProductSpace(comm, (K0, ST))
+    VT = VectorSpace(TD)
+    Q = CompositeSpace([VT, TT])
+    u, p = TrialFunction(Q)
+    v, q = TestFunction(Q)
+    A = inner(grad(v), grad(u)) + inner(div(v), p) + inner(q, div(u))
+    f = Array(VT)
+    f[0] = 1
+    f[1] = TD.local_mesh(True)[1]
+    b = Function(Q)
+    b[0] = inner(v, f)
+    # Block-diagonal preconditioner with Helmholtz for velocity and mass
+    # matrix for pressure
+    H = la.SolverGeneric1ND(inner(grad(TestFunction(TD)), grad(TrialFunction(TD))))
+    def Hv(r, z):
+        for i in range(2):
+            z[i] = H(r[i], z[i])
+        return z
+    M = la.SolverGeneric1ND([inner(TestFunction(TT), TrialFunction(TT))])
+    P = la.BlockDiagonalPreconditioner([Hv, M])
+    sol = getattr(la, solver)(A, M=P, tol=1e-10)
+    uh = sol(b)
+    assert sol.converged
+    r = sol.residual(b, uh, Function(Q))
+    assert sol.norm(r) < 1e-8*sol.norm(b)
+
+def test_block_lu():
+    from shenfun import FunctionSpace, TensorProductSpace, VectorSpace, \
+        CompositeSpace, TrialFunction, TestFunction, Function, Array, inner, \
+        grad, div, comm, config
+    N = 10
+    K0 = FunctionSpace(N, 'F', dtype='d')
+    SD = FunctionSpace(N, 'L', bc=(0, 0))
+    ST = FunctionSpace(N, 'L')
+    TD = TensorProductSpace(comm, (K0, SD), axes=(1, 0))
+    TT = TensorProductSpace(comm, (K0, ST), axes=(1, 0))
+    Q = CompositeSpace([VectorSpace(TD), TT])
+    u, p = TrialFunction(Q)
+    v, q = TestFunction(Q)
+    A = inner(grad(v), grad(u)) + inner(div(v), p) + inner(q, div(u))
+    f = Array(VectorSpace(TD))
+    f[0] = 1
+    f[1] = TD.local_mesh(True)[1]
+    b = Function(Q)
+    b[0] = inner(v, f)
+    b.mask_nyquist()
+    con = ((2, 0, 0), (2, N-1, 0))
+    block = config['matrix']['block'].copy()
+    try:
+        sol = la.BlockMatrixSolver(A)
+        config['matrix']['block']['reuse_ordering'] = False
+        u0 = sol(b.copy(), constraints=con)
+        config['matrix']['block']['reuse_ordering'] = True
+        sol = la.BlockMatrixSolver(A)
+        u1 = sol(b.copy(), constraints=con)
+        assert np.allclose(u0, u1)
+        nbytes = sol.nbytes
+        assert len(sol._lu) == len(sol.mat._Ai)
+        config['matrix']['block']['lu_maxbytes'] = nbytes // 2
+        sol = la.BlockMatrixSolver(A)
+        u2 = sol(b.copy(), constraints=con)
+        assert sol.nbytes <= nbytes // 2
+        u3 = sol(b.copy(), constraints=con)
+    finally:
+        config['matrix']['block'].update(block)
+    assert np.allclose(u0, u2)
+    assert np.allclose(u0, u3)
+
+    # The reused ordering gives the same fill as the ordering of SuperLU
+    A1, A2 = [sol.mat._Ai[key].tocsc() for key in (1, 2)]
+    lu1 = la.SharedOrderingLU(A1)
+    lu2 = la.SharedOrderingLU(A2, lu1.perm_c)
+    lu3 = la.SharedOrderingLU(A2)
+    assert lu2.lu.L.nnz + lu2.lu.U.nnz == lu3.lu.L.nnz + lu3.lu.U.nnz
+    x = np.random.random(A2.shape[0])
+    assert np.allclose(lu2.solve(A2 @ x), x)
+
+@pytest.mark.parametrize('family', ('L', 'C'))
+def test_fast_diagonalization(family):
+    from shenfun import FunctionSpace, TensorProductSpace, TrialFunction, \
+        TestFunction, Function, Array, inner, div, grad, comm
+    N = (8, 9, 10)
+    D = [FunctionSpace(n, family, bc=(0, 0)) for n in N]
+    T = TensorProductSpace(comm, D)
+    u = TrialFunction(T)
+    v = TestFunction(T)
+    A = inner(v, -div(grad(u))+2*u)
+    assert la.SolverFastDiagonalization.is_separable(A)
+    f = Array(T)
+    f[:] = np.random.random(f.shape)
+    b = inner(v, f)
+    ue = la.SolverND(A)(b.copy(), Function(T))
+    uh = la.SolverFastDiagonalization(A)(b.copy(), Function(T))
+    assert np.allclose(uh, ue)
+    K = FunctionSpace(8, 'F', dtype='d')
+    T2 = TensorProductSpace(comm, (D[0], K, D[2]))
+    u = TrialFunction(T2)
+    v = TestFunction(T2)
+    A = inner(v, -div(grad(u)))
+    b = inner(v, Array(T2, val=1))
+    ue = la.SolverGeneric2ND(A)(b.copy(), Function(T2))
+    uh = la.SolverFastDiagonalization(A)(b.copy(), Function(T2))
+    assert np.allclose(uh, ue)
+    B = FunctionSpace(10, family, bc=(0, 0, 0, 0))
+    T3 = TensorProductSpace(comm, (B, B))
+    u = TrialFunction(T3)
+    v = TestFunction(T3)
+    assert not la.SolverFastDiagonalization.is_separable(inner(v, div(grad(div(grad(u))))))
+    # Mass matrices are inverted with banded solvers
+    u = TrialFunction(T)
+    v = TestFunction(T)
+    sol = la.SolverFastDiagonalization([inner(v, 2*u)])
+    assert np.all([isinstance(W, SparseMatrix) for W in sol.W])
+    uh = Function(T)
+    uh[:-2, :-2, :-2] = np.random.random((N[0]-2, N[1]-2, N[2]-2))
+    b = inner(v, 2*uh.backward())
+    assert np.allclose(sol(b, Function(T)), uh)
+    # Warn if the right hand side has a component in a singular mode
+    B = FunctionSpace(10, family, bc={'left': {'N': 0}, 'right': {'N': 0}})
+    T4 = TensorProductSpace(comm, (B, K, B))
+    u = TrialFunction(T4)
+    v = TestFunction(T4)
+    A = inner(v, div(grad(u)))
+    sol = la.SolverFastDiagonalization(A)
+    ue = Function(T4)
+    ue[:-2, :, :-2] = np.random.random(ue[:-2, :, :-2].shape)
+    ue.mask_nyquist()
+    b = Function(T4)
+    for m in A:
+        b += m.matvec(ue, Function(T4))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        sol(b.copy(), Function(T4))
+    b[0, 0, 0] += 1
+    with pytest.warns(RuntimeWarning):
+        sol(b.copy(), Function(T4))
+    T.destroy()
+    T2.destroy()
+    T3.destroy()
+    T4.destroy()
+
+@pytest.mark.parametrize('family', ('L', 'C'))
+def test_schur(family):
+    from shenfun import FunctionSpace, TensorProductSpace, VectorSpace, \
+        CompositeSpace, TrialFunction, TestFunction, Function, inner, grad, \
+        div, comm
+    N = 12
+    K0 = FunctionSpace(8, 'F', dtype='D')
+    K1 = FunctionSpace(8, 'F', dtype='d')
+    SD = FunctionSpace(N, family, bc=(0, 0))
+    ST = FunctionSpace(N, family)
+    TD = TensorProductSpace(comm, (K0, K1, SD))
+    TT = TensorProductSpace(comm, (K0, K1, ST))
+    VQ = CompositeSpace([VectorSpace(TD), TT])
+    u, p = TrialFunction(VQ)
+    v, q = TestFunction(VQ)
+    A = inner(v, -div(grad(u))) + inner(v, grad(p)) + inner(q, div(u))
+    b = Function(VQ)
+    b.v[:3] = np.random.random(b.v[:3].shape)
+    b.mask_nyquist()
+    b.v[:3, ..., -2:] = 0
+    con = ((3, 0, 0), (3, N-1, 0))
+    ue = la.BlockMatrixSolver(A)(b.copy(), constraints=con)
+    sol = la.SchurComplementSolver(A)
+    uh = sol(b.copy(), constraints=con)
+    assert np.allclose(uh, ue)
+    uh = sol(b.copy(), constraints=con)
+    assert np.allclose(uh, ue)
+    # New constraints are applied also after the first call
+    con = ((3, 0, 0), (3, 1, 0.5), (3, N-1, 0))
+    ue = la.BlockMatrixSolver(A)(b.copy(), constraints=con)
+    uh = sol(b.copy(), constraints=con)
+    assert np.allclose(uh, ue)
+
+def test_eigs():
+    from shenfun import FunctionSpace, TensorProductSpace, TrialFunction, \
+        TestFunction, inner, div, grad, comm
+    import scipy.linalg
+    D = FunctionSpace(40, 'C', bc=(0, 0))
+    u = TrialFunction(D)
+    v = TestFunction(D)
+    A = inner(v, -div(grad(u)))
+    B = inner(v, u)
+    w, V = la.eigs(A, B, k=4, sigma=1)
+    we = scipy.linalg.eig(A.diags().toarray(), B.diags().toarray())[0]
+    we = we[np.argsort(abs(we-1))][:4]
+    assert np.allclose(w, we)
+    assert np.allclose(A.diags() @ V, B.diags() @ V * w[None])
+    K = FunctionSpace(6, 'F', dtype='d')
+    T = TensorProductSpace(comm, (K, D))
+    u = TrialFunction(T)
+    v = TestFunction(T)
+    ev = la.eigs(inner(v, -div(grad(u))), inner(v, u), k=2, sigma=0,
+                 return_eigenvectors=False)
+    k = K.wavenumbers(bcast=False, scaled=True)[T.local_slice(True)[0]]
+    for key, w in ev.items():
+        assert np.allclose(w, k[key]**2+(np.pi/2)**2*np.array([1, 4]))
+    T.destroy()
+
+def test_optimizer_dispatch():
+    from shenfun import config
+    from shenfun.optimization import resolve, report
+    mode = config['optimization']['mode']
+    kernel = resolve(la.TDMA.Solve.func)
+    assert kernel is not None
+    M = SparseMatrix(d[3], (N, N))
+    sol = la.Solver(M)
+    b = np.ones(N)
+    u0 = sol(b, np.zeros_like(b))
+    assert la.TDMA.Solve._fun is kernel
+    try:
+        config['optimization']['mode'] = 'python'
+        u1 = sol(b, np.zeros_like(b))
+        assert la.TDMA.Solve._fun is la.TDMA.Solve.func
+        unoptimized = report(file=StringIO())
+        assert 'shenfun.la.TDMA.Solve' in unoptimized
+    finally:
+        config['optimization']['mode'] = mode
+    assert np.allclose(u0, u1)
+    sol(b, np.zeros_like(b))
+    assert la.TDMA.Solve._fun is kernel
+    assert 'shenfun.la.TDMA.Solve' not in report(file=StringIO())
+
 
 if __name__ == "__main__":
     #test_solve('GC')
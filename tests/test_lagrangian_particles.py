@@ -38,5 +38,40 @@ def test_lagrangian_particles():
     assert np.allclose(lp.up, np.array([[0.99115526], [-0.09409196]]), 1e-6)
     T.destroy()
 
+@pytest.mark.parametrize('scheme', ('RK4', 'RK2'))
+def test_distributed_particles(scheme):
+    F0 = FunctionSpace(24, 'F', dtype='d')
+    C1 = FunctionSpace(24, 'C')
+    T = TensorProductSpace(comm, (F0, C1))
+    TV = VectorSpace(T)
+    x, y = sp.symbols("x,y", real=True)
+    uv = Function(TV, buffer=(0.3*sp.sin(y)+0.5, 0.2*sp.cos(x)*(1-y**2)))
+    points = np.random.random((2, 50))
+    points[0] *= 2*np.pi
+    points[1] = 1.6*points[1]-0.8
+    points = comm.bcast(points)
+    X = []
+    for interpolation in ('local', 'spectral'):
+        lp = DistributedParticles(points, 0.02, uv, scheme=scheme,
+                                  interpolation=interpolation, order=6)
+        for i in range(10):
+            lp.step()
+        xp, ids = lp.gather()
+        assert np.all(ids == np.arange(50))
+        X.append(xp)
+    assert np.allclose(X[0], X[1], atol=1e-6)
+
+    # Each rank starts with a different share of the particles
+    n = comm.Get_size()
+    rank = comm.Get_rank()
+    lp = DistributedParticles(points[:, rank::n], 0.02, uv, scheme=scheme,
+                              order=6, replicated=False)
+    for i in range(10):
+        lp.step()
+    xp, ids = lp.gather()
+    assert np.allclose(np.sort(xp[0]), np.sort(X[0][0]), atol=1e-6)
+    T.destroy()
+
 if __name__ == '__main__':
     test_lagrangian_particles()
+    test_distributed_particles('RK4')
@@ -284,6 +284,32 @@ def test_jmatvec(b0, b1, quad, format, k0, k1):
             d1 = mat.matvec(b, d1, format=format, axis=axis)
             assert np.allclose(d, d1)
 
+@pytest.mark.parametrize('dim', (1, 2, 3))
+@pytest.mark.parametrize('dtype', ('d', 'D'))
+def test_fused_matvec(dim, dtype):
+    from shenfun.matrixbase import fused_matvec
+    N = 8
+    offsets = np.array([-2, 0, 1, 3])
+    data = np.random.random((2, len(offsets), N))
+    for axis in range(dim):
+        shape = (N,)+(4,)*(dim-1)
+        v = np.random.random(shape).astype(dtype)
+        sshape = [4]*dim
+        sshape[axis] = 1
+        scales = np.random.random((2,)+tuple(sshape)).astype(dtype)
+        v = np.moveaxis(v, 0, axis).copy()
+        c0 = np.zeros_like(v)
+        c1 = np.zeros_like(v)
+        c0 = fused_matvec.func(v, c0, offsets, data, scales, axis)
+        c1 = fused_matvec(v, c1, offsets, data, scales, axis)
+        c2 = np.zeros_like(v)
+        for k in range(2):
+            A = SparseMatrix({o: data[k, i, max(0, o):N+min(0, o)] for i, o in enumerate(offsets)}, (N, N))
+            w = np.zeros_like(v)
+            c2 += scales[k]*A.matvec(v, w, format='csr', axis=axis)
+        assert np.allclose(c0, c2)
+        assert np.allclose(c1, c2)
+
 def test_eq():
     m0 = SparseMatrix({0: 1, 2: 2}, (6, 6))
     m1 = SparseMatrix({0: 1., 2: 2.}, (6, 6))
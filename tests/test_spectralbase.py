@@ -1,3 +1,5 @@
+import subprocess
+import sys
 from itertools import product
 import pytest
 from shenfun import FunctionSpace, TrialFunction, inner, Array, \
@@ -119,3 +121,26 @@ def test_constant_inner(family):
     for quad in quads[D.family()]:
         q = inner(1, Array(D, buffer=x**2))
         assert abs(q-2/3) < 1e-8
+
+def test_import_time():
+    # import shenfun should only load the configuration, the families and
+    # everything else are loaded on first access
+    code = ("import sys, shenfun; "
+            "print(*[m for m in ('sympy', 'scipy', 'numba', 'h5py', 'shenfun.forms', "
+            "'shenfun.legendre', 'shenfun.la') if m in sys.modules])")
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+    # Time for shenfun itself, excluding numpy and mpi4py, is less than the
+    # time for numpy in the same process, to be robust against machine load
+    cumulative = {}
+    for line in out.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cum, name = line.split('|')
+            if name.strip() in ('shenfun', 'numpy', 'mpi4py', 'mpi4py.MPI'):
+                cumulative[name.strip()] = int(cum)
+    own = cumulative['shenfun'] - sum(cumulative.get(m, 0) for m in ('numpy', 'mpi4py', 'mpi4py.MPI'))
+    assert own < cumulative['numpy'], (own, cumulative['numpy'])
+    import shenfun
+    assert 'TensorProductSpace' in dir(shenfun)
+    assert shenfun.inner is inner
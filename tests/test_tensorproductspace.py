@@ -478,6 +478,108 @@ def test_eval_fourier(typecode, dim):
     print('method=1', t_1)
     print('method=2', t_2)
 
+@pytest.mark.parametrize('dim', (2, 3, 4))
+def test_eval_numba(dim):
+    pytest.importorskip('numba')
+    bases = [FunctionSpace(9, 'C')]
+    bases += [FunctionSpace(8, 'F', dtype='D') for i in range(dim-2)]
+    bases.append(FunctionSpace(8, 'F', dtype='d'))
+    fft = TensorProductSpace(comm, bases)
+    u = Array(fft, buffer=np.random.random(fft.shape(False)))
+    u_hat = u.forward()
+    points = None
+    if comm.Get_rank() == 0:
+        points = np.random.random((dim, 6))
+    points = comm.bcast(points)
+    mode = config['optimization']['mode']
+    config['optimization']['mode'] = 'numba'
+    try:
+        result = fft.eval(points, u_hat, method=1)
+    finally:
+        config['optimization']['mode'] = mode
+    assert allclose(result, fft.eval(points, u_hat, method=2))
+    fft.destroy()
+
+@pytest.mark.parametrize('num_threads', (1, 2))
+def test_eval_4D(num_threads):
+    x, y, z, r = symbols("x,y,z,r", real=True)
+    ue = sin(x)*cos(2*y)*(1-z**2)*cos(r)
+    bases = (FunctionSpace(8, 'F', dtype='D'), FunctionSpace(8, 'F', dtype='D'),
+             FunctionSpace(10, 'C'), FunctionSpace(8, 'F', dtype='d'))
+    T = TensorProductSpace(comm, bases)
+    u_hat = Array(T, buffer=ue).forward()
+    points = None
+    if comm.Get_rank() == 0:
+        points = np.random.random((4, 10))*np.array([[2*np.pi], [2*np.pi], [2], [2*np.pi]])
+        points[2] -= 1
+    points = comm.bcast(points)
+    threads = config['optimization']['num_threads']
+    config['optimization']['num_threads'] = num_threads
+    try:
+        result = u_hat.eval(points)
+    finally:
+        config['optimization']['num_threads'] = threads
+    assert allclose(result, lambdify((x, y, z, r), ue)(*points))
+    T.destroy()
+
+def test_warmup(monkeypatch):
+    pytest.importorskip('numba')
+    from shenfun.optimization.numba import aot, evaluate
+    T = TensorProductSpace(comm, (FunctionSpace(9, 'C', bc=(0, 0)), FunctionSpace(8, 'F', dtype='d')))
+    lookup = aot.lookup
+    kernels = set()
+    def record(fun, array):
+        kernels.add(fun.__name__)
+        return lookup(fun, array)
+    monkeypatch.setattr(aot, 'lookup', record)
+    mode = config['optimization']['mode']
+    config['optimization']['mode'] = 'numba'
+    try:
+        aot.warmup(T)
+        aot.warmup(VectorSpace(T))
+    finally:
+        config['optimization']['mode'] = mode
+    assert len(evaluate._evaluate_2D.signatures) > 0
+    # Line kernels of the mass matrix (matvec and solve) and stiffness matrix
+    assert {'Tridiagonal_matvec', 'TDMA_inner_solve', 'ADD_matvec'} <= kernels
+    assert lookup(np.sin, np.zeros((3, 4))) is None
+    T.destroy()
+
+@pytest.mark.parametrize('dtype', ('d', 'D'))
+@pytest.mark.parametrize('ndim', (2, 3))
+def test_aot_lookup(dtype, ndim):
+    nb = pytest.importorskip('numba')
+    pytest.importorskip('shenfun.optimization.numba._aot')
+    from shenfun.optimization.numba import aot, tdma, Matvec
+    N = 10
+    shape = (3, 4, N)[-ndim:]
+    u = np.random.random(shape).astype(dtype)
+    data = np.random.random((3, N))
+    data[1] += 2
+    diags = [np.random.random(N-2), np.random.random(N), np.random.random(N-2)]
+    matvec = Matvec.Tridiagonal_matvec
+    while not isinstance(matvec, nb.core.dispatcher.Dispatcher):
+        matvec = matvec.__wrapped__
+    threads = nb.get_num_threads()
+    nb.set_num_threads(1)
+    try:
+        solve = aot.lookup(tdma.TDMA_inner_solve, u)
+        mult = aot.lookup(matvec, u)
+    finally:
+        nb.set_num_threads(threads)
+    assert solve is not None and mult is not None
+    u0 = u.copy()
+    u1 = u.copy()
+    b0 = np.zeros_like(u)
+    b1 = np.zeros_like(u)
+    solve(u0, data)
+    mult(u, b0, *diags)
+    for i in np.ndindex(shape[:-1]):
+        tdma.TDMA_inner_solve(u1[i], data)
+        matvec(u[i], b1[i], *diags)
+    assert np.allclose(u0, u1)
+    assert np.allclose(b0, b1)
+
 @pytest.mark.parametrize('f0,f1', product(*([('C', 'L', 'F')])*2))
 def test_inner(f0, f1):
     if f0 == 'F' and f1 == 'F':
@@ -569,6 +671,137 @@ def test_refine():
     T.destroy()
     Tp.destroy()
 
+def test_convolve():
+    from shenfun import Convolve
+    F0 = FunctionSpace(8, 'F', dtype='D')
+    F1 = FunctionSpace(8, 'F', dtype='d')
+    T = TensorProductSpace(comm, (F0, F1))
+    Tp = T.get_dealiased(padding_factor=(1.5, 1.5))
+    u_hat = Array(T, buffer=np.random.random(Array(T).shape)).forward()
+    v_hat = Array(T, buffer=np.random.random(Array(T).shape)).forward()
+    up = Tp.backward(u_hat).copy()
+    vp = Tp.backward(v_hat).copy()
+    for truncate in (False, True):
+        conv = Convolve(Tp, truncate=truncate)
+        uv_hat = conv(u_hat, v_hat).copy()
+        assert np.allclose(uv_hat, conv.newspace.forward(up*vp))
+        uu, uv, vv = conv.products([(u_hat, u_hat), (u_hat, v_hat), (v_hat, v_hat)])
+        assert len(conv._padded) == 2
+        assert np.allclose(uv, uv_hat)
+        assert np.allclose(uu, conv.newspace.forward(up*up))
+        assert np.allclose(vv, conv.newspace.forward(vp*vp))
+    uv_hat = Tp.convolve(u_hat, v_hat, Function(T))
+    assert np.allclose(uv_hat, Tp.forward(up*vp))
+    T.destroy()
+    Tp.destroy()
+
+def test_timers():
+    from shenfun import timers, TestFunction, TrialFunction, div, grad, la
+    config['profiling']['timers'] = True
+    timers.reset()
+    D = FunctionSpace(8, 'C', bc=(0, 0))
+    F = FunctionSpace(8, 'F', dtype='d')
+    T = TensorProductSpace(comm, (D, F))
+    u = TrialFunction(T)
+    v = TestFunction(T)
+    sol = la.SolverGeneric1ND(inner(v, div(grad(u))))
+    f = Array(T)
+    f[:] = 1
+    with timers('step'):
+        f_hat = inner(v, f)
+        u_hat = sol(f_hat)
+        u_hat.backward()
+    config['profiling']['timers'] = False
+    u_hat.backward()
+    s = timers.summary()
+    assert s['step'][0] == 1
+    assert s['step/inner'][0] == 1
+    assert s['step/SolverGeneric1ND'][0] == 1
+    assert s['step/backward'][0] == 1
+    assert 'step/backward/transform' in s
+    assert s['step/inner/scalar_product'][0] == 1
+    assert s['step'][1] <= s['step'][2] <= s['step'][3]
+    assert 'SolverGeneric1ND' in timers.report(per_rank=True)
+    timers.reset()
+    T.destroy()
+
+def test_work_memory():
+    from shenfun.utilities import CachedArrayDict
+    a = np.zeros((10, 10))
+    work = CachedArrayDict(maxbytes=2*a.nbytes)
+    w0 = work[(a, 0, True)]
+    w1 = work[(a, 1, True)]
+    assert work.nbytes == 2*a.nbytes
+    assert work[(a, 0, True)] is w0
+    w2 = work[(a, 2, True)] # evicts least recently used w1
+    assert work.nbytes == 2*a.nbytes
+    assert work[(a, 0, True)] is w0
+    assert work[(a, 1, True)] is not w1
+    work.clear()
+    assert work.nbytes == 0
+    F0 = FunctionSpace(8, 'F', dtype='D')
+    F1 = FunctionSpace(8, 'F', dtype='d')
+    T = TensorProductSpace(comm, (F0, F1))
+    Tp = T.get_dealiased()
+    assert T.get_dealiased((1.5, 1.5)) is Tp
+    assert T.get_refined(2) is T.get_refined((16, 16))
+    n0 = T.nbytes(derived=False)
+    assert n0 > 0
+    assert T.nbytes() > n0 + Tp.nbytes()
+    Tp.destroy()
+    assert T.get_dealiased() is not Tp
+    V = VectorSpace(T)
+    assert V.nbytes() == T.nbytes()
+    T.destroy()
+
+@pytest.mark.parametrize('fam', ('F', 'C', 'L'))
+def test_work_transforms(fam):
+    # Internal arrays of planned transforms are shared between spaces
+    spaces, u_hat, ref = [], [], []
+    for i in range(2):
+        B0 = FunctionSpace(12, fam, dtype='D') if fam == 'F' else FunctionSpace(12, fam)
+        T = TensorProductSpace(comm, (B0, FunctionSpace(8, 'F', dtype='d')))
+        Tp = T.get_dealiased()
+        u = Array(T)
+        u[:] = np.random.random(u.shape)
+        u_hat.append(u.forward())
+        ref.append(Tp.backward(u_hat[-1], Array(Tp)).copy())
+        spaces.append((T, Tp))
+    b0, b1 = [Tp.bases[0].backward.tmp_array for T, Tp in spaces]
+    assert b0 is b1
+    if fam in ('C', 'L'):
+        d0, d1 = [T.bases[0].forward.xfftn for T, Tp in spaces]
+        assert d0.input_array is not d1.input_array
+        assert d0.dct.input_array is d1.dct.input_array
+    up = [Array(Tp) for T, Tp in spaces]
+    for i in (1, 0):
+        spaces[i][1].backward(u_hat[i], up[i])
+    for i in range(2):
+        assert np.allclose(up[i], ref[i])
+        assert np.allclose(spaces[i][1].forward(up[i], Function(spaces[i][1])), u_hat[i])
+    for T, Tp in spaces:
+        T.destroy()
+
+@pytest.mark.parametrize('fam', ('F', 'C', 'L'))
+def test_ensemble(fam):
+    from shenfun import EnsembleSpace
+    M = 3
+    F0 = FunctionSpace(8, 'F', dtype='d')
+    B0 = FunctionSpace(12, fam, dtype='D') if fam == 'F' else FunctionSpace(12, fam, bc=(0, 1))
+    T = TensorProductSpace(comm, (B0, F0))
+    for space in (B0, T, T.get_dealiased()):
+        E = EnsembleSpace(space, M)
+        u = Array(E)
+        assert u.shape == (M,)+Array(space).shape
+        u[:] = np.random.random(u.shape)
+        u_hat = u.forward()
+        ub = u_hat.backward()
+        for i in range(M):
+            ui_hat = Array(space, buffer=np.array(u[i])).forward()
+            assert np.allclose(u_hat[i], ui_hat)
+            assert np.allclose(ub[i], ui_hat.backward())
+    T.destroy()
+
 def test_eval_expression():
     import sympy as sp
     from shenfun import div, grad
@@ -622,6 +855,71 @@ def test_eval_expression2(fam):
     assert np.allclose(f1, f2, 1e-7)
     T.destroy()
 
+def test_probe():
+    import sympy as sp
+    from shenfun import curl, div, grad, Probe
+    x, y, z = sp.symbols('x,y,z', real=True)
+    T = TensorProductSpace(comm, (FunctionSpace(20, 'C'),
+                                  FunctionSpace(16, 'F', dtype='D'),
+                                  FunctionSpace(16, 'F', dtype='d')))
+    V = VectorSpace(T)
+    ue = (sp.sin(y)*(1-x**2), sp.cos(z)*x, sp.sin(y+z)*x**2)
+    u = Function(V, buffer=ue)
+    points = None
+    if comm.Get_rank() == 0:
+        points = np.random.random((3, 6))*np.array([[2], [2*np.pi], [2*np.pi]])
+        points[0] -= 1
+    points = comm.bcast(points)
+    ce = (ue[2].diff(y)-ue[1].diff(z), ue[0].diff(z)-ue[2].diff(x), ue[1].diff(x)-ue[0].diff(y))
+    f0 = np.array([lambdify((x, y, z), c)(*points)*np.ones(6) for c in ce])
+    probe = Probe(points, curl(u))
+    assert np.allclose(probe(), f0)
+    u *= 2
+    assert np.allclose(probe(), 2*f0)
+    probe = Probe(points, div(grad(u[0])))
+    f1 = lambdify((x, y, z), 2*(ue[0].diff(x, 2)+ue[0].diff(y, 2)+ue[0].diff(z, 2)))(*points)
+    assert np.allclose(probe(), f1)
+    T.destroy()
+
+def test_statistics():
+    from shenfun import Moments, Spectrum
+    T = TensorProductSpace(comm, (FunctionSpace(12, 'C'),
+                                  FunctionSpace(8, 'F', dtype='D'),
+                                  FunctionSpace(10, 'F', dtype='d')))
+    V = VectorSpace(T)
+    u_hat = Function(V)
+    a, b = Array(T), Array(T)
+    m = Moments([a, b], axes=(1, 2))
+    mv = Moments(u_hat, axes=(1, 2))
+    m0 = Moments(a)
+    spectra = [Spectrum(u_hat, axes=axes) for axes in ((1,), (2,), (1, 2))]
+    samples = []
+    for s in range(4):
+        a[:] = np.random.random(a.shape)
+        b[:] = np.random.random(b.shape) + a
+        u_hat[0] = a.forward()
+        u_hat[1] = b.forward()
+        for acc in [m, mv, m0] + spectra:
+            acc.update()
+        ab = np.zeros((2,)+T.global_shape(False))
+        ab[(slice(None),)+T.local_slice(False)] = (a, b)
+        samples.append(comm.allreduce(ab))
+    A, B = np.array(samples).transpose((1, 0, 2, 3, 4))
+    Am, Bm = [np.mean(c, axis=(0, 2, 3), keepdims=True) for c in (A, B)]
+    s0 = T.local_slice(False)[0]
+    assert np.allclose(m.mean[0, :, 0, 0], Am[0, s0, 0, 0])
+    uv = np.mean((A-Am)*(B-Bm), axis=(0, 2, 3))
+    assert np.allclose(m.covariance[0, 1, :, 0, 0], uv[s0])
+    assert np.allclose(mv.covariance[0, 1, :, 0, 0], uv[s0])
+    assert np.allclose(m0.covariance[0, 0], A.var(axis=0)[T.local_slice(False)])
+    uu = np.mean(A**2+B**2, axis=(0, 2, 3))
+    for sp in spectra:
+        assert np.allclose(sp.spectrum.sum(axis=tuple(range(1, sp.spectrum.ndim))), uu)
+    R = np.array([np.mean(A*np.roll(A, -j, axis=3)+B*np.roll(B, -j, axis=3), axis=(0, 2, 3))
+                  for j in range(10)]).T
+    assert np.allclose(spectra[1].correlation(), R)
+    T.destroy()
+
 
 if __name__ == '__main__':
     test_transform('F', 2)